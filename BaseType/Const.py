@@ -50,6 +50,7 @@ CONST["RESAMPLE"] = "1min"
 # FILL_PATH（Fill事件记录地址）：/log/FillLog.csv
 # PORTFOLIO_PATH（Portfolio信息记录地址）：/log/PortfolioLog.csv
 # STRATEGY_PATH（Strategy信息记录地址）：/log/StrategyLog.csv
+# JOURNAL_PATH（事件日志地址）：/log/EventJournal.bin
 CONST["THIS_PATH"] = os.getcwd()
 CONST["QUEUE_PATH"] = CONST["THIS_PATH"] + "/log/QueueLog.csv"
 CONST["DEFAULT_PATH"] = CONST["THIS_PATH"] + "/log/DefaultLog.csv"
@@ -61,6 +62,7 @@ CONST["CANCEL_PATH"] = CONST["THIS_PATH"] + "/log/CancelLog.csv"
 CONST["FILL_PATH"] = CONST["THIS_PATH"] + "/log/FillLog.csv"
 CONST["PORTFOLIO_PATH"] = CONST["THIS_PATH"] + "/log/PortfolioLog.csv"
 CONST["STRATEGY_PATH"] = CONST["THIS_PATH"] + "/log/StrategyLog.csv"
+CONST["JOURNAL_PATH"] = CONST["THIS_PATH"] + "/log/EventJournal.bin"
 
 # SYMBOL（默认标的代码）：NULL
 # EXCHANGE（默认交易所）：NULL
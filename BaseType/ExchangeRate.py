@@ -1,16 +1,236 @@
+from BaseType.Const import CONST
+from pandas import Timestamp
+import numpy
+import pandas
 
-# FROM_CNY：记录各个货币的购汇汇率的全局变量
-# TO_CNY：记录各个货币的结汇汇率的全局变量
+# FROM_CNY：记录各个货币的当前购汇汇率的全局变量
+# TO_CNY：记录各个货币的当前结汇汇率的全局变量
+# 两者由FX_RATES维护，随汇率历史的推进而更新
 FROM_CNY = dict()
 TO_CNY = dict()
 
+# FX_COLUMN：汇率历史表的列名
+FX_COLUMN = {
+    "datetime": "datetime",
+    "currency": "currency",
+    "from_cny": "from_cny",
+    "to_cny": "to_cny",
+}
+
+# 汇率历史全部推进完成后的下一次更新时间
+_NEVER = numpy.iinfo(numpy.int64).max
+
+
+class ExchangeRateTable(object):
+    """
+    ExchangeRateTable(object)：回测框架中，按时间序列维护各个货币购汇、结汇汇率的模块
+    每个货币分配一个整数编号，当前汇率保存在以编号为下标的numpy.ndarray中，并同步到FROM_CNY、TO_CNY；
+    汇率历史以numpy.ndarray保存，只在Clear或时间戳推进到下一个汇率日期时查找一次，单次换汇只需读取当前汇率；
+    当前汇率每次更新时版本号version加1，各投资组合比较自身记录的版本号判断是否需要重新计算持仓金额
+    """
+
+    __slots__ = ["index", "currencies", "from_rates", "to_rates", "history", "next_change", "version"]
+
+    def __init__(self):
+        # index：货币代码到编号的映射；currencies：编号到货币代码的映射
+        self.index = dict()
+        self.currencies = list()
+
+        # from_rates、to_rates：以货币编号为下标的当前购汇、结汇汇率
+        self.from_rates = numpy.zeros(0, dtype=numpy.float64)
+        self.to_rates = numpy.zeros(0, dtype=numpy.float64)
+
+        # history：货币编号到（汇率日期[int64纳秒], 购汇汇率, 结汇汇率）的映射
+        self.history = dict()
+
+        # next_change：下一个汇率日期（int64纳秒），时间戳早于该日期时无需查找
+        self.next_change = _NEVER
+
+        # version：当前汇率的版本号，当前汇率每次更新时加1
+        self.version = 0
+
+    def currency_id(self, currency_: str) -> int:
+        """
+        currency_id：查询给定货币的编号
+        @currency_(str)：货币代码
+        @return(int)：货币编号
+        """
+
+        if currency_ not in self.index:
+            raise RuntimeError("currency {:s} not defined".format(str(currency_)))
+        return self.index[currency_]
+
+    def _add_currency(self, currency_: str) -> int:
+        """
+        _add_currency：登记新的货币，汇率初始为NaN，需要通过set_rate或load_history设置
+        @currency_(str)：货币代码
+        @return(int)：货币编号
+        """
+
+        if currency_ in self.index:
+            return self.index[currency_]
+
+        id_ = len(self.currencies)
+        self.index[currency_] = id_
+        self.currencies.append(currency_)
+        self.from_rates = numpy.append(self.from_rates, numpy.nan)
+        self.to_rates = numpy.append(self.to_rates, numpy.nan)
+        return id_
+
+    def _write(self, id_: int, from_cny_: float, to_cny_: float) -> None:
+        """
+        _write：写入给定货币编号的当前汇率，并同步到FROM_CNY、TO_CNY
+        @id_(int)：货币编号
+        @from_cny_(float)：购汇汇率
+        @to_cny_(float)：结汇汇率
+        @return(None)
+        """
+
+        currency_ = self.currencies[id_]
+        self.from_rates[id_] = from_cny_
+        self.to_rates[id_] = to_cny_
+        FROM_CNY[currency_] = float(from_cny_)
+        TO_CNY[currency_] = float(to_cny_)
+
+    def set_rate(self, currency_: str, from_cny_: float = None, to_cny_: float = None) -> None:
+        """
+        set_rate：设置给定货币的当前购汇和/或结汇汇率，该汇率在汇率历史推进到下一个汇率日期前有效
+        @currency_(str)：货币代码
+        @from_cny_(float)：购汇汇率，默认为None
+        @to_cny_(float)：结汇汇率，默认为None
+        @return(None)
+        """
+
+        id_ = self._add_currency(currency_)
+
+        if from_cny_ is not None:
+            self.from_rates[id_] = from_cny_
+            FROM_CNY[currency_] = from_cny_
+
+        if to_cny_ is not None:
+            self.to_rates[id_] = to_cny_
+            TO_CNY[currency_] = to_cny_
+
+        self.version += 1
+
+    def load_history(self, currency_: str, datetimes_, from_cny_, to_cny_) -> None:
+        """
+        load_history：载入给定货币的汇率历史，每个汇率自其日期起生效，至下一个汇率日期止；
+        第一个汇率日期之前沿用当前汇率
+        @currency_(str)：货币代码
+        @datetimes_(array-like)：汇率日期
+        @from_cny_(array-like)：购汇汇率
+        @to_cny_(array-like)：结汇汇率
+        @return(None)
+        """
+
+        dates = pandas.to_datetime(numpy.asarray(datetimes_)).values.astype(numpy.int64)
+        from_cny_ = numpy.asarray(from_cny_, dtype=numpy.float64)
+        to_cny_ = numpy.asarray(to_cny_, dtype=numpy.float64)
+        if not (len(dates) == len(from_cny_) == len(to_cny_)):
+            raise ValueError("exchange rate history length mismatch")
+        if len(dates) == 0:
+            return
+
+        order = numpy.argsort(dates, kind="stable")
+        id_ = self._add_currency(currency_)
+        self.history[id_] = (dates[order], from_cny_[order], to_cny_[order])
+
+        # 新的汇率历史在下一次advance时查找
+        self.next_change = min(self.next_change, int(dates[order[0]]))
+
+    def load_frame(self, frame_: pandas.DataFrame) -> None:
+        """
+        load_frame：根据给定的pandas.DataFrame，按货币分组载入汇率历史
+        @frame_(pandas.DataFrame)：给定的汇率历史表，包含datetime、currency、from_cny、to_cny列（不区分大小写）
+        @return(None)
+        """
+
+        frame_ = frame_.rename(columns=lambda name: str(name).strip().lower())
+        for name in FX_COLUMN.values():
+            if name not in frame_.columns:
+                raise ValueError("{:s} column not found".format(name))
+
+        for currency_, group in frame_.groupby(FX_COLUMN["currency"], sort=False):
+            self.load_history(currency_=str(currency_), datetimes_=group[FX_COLUMN["datetime"]].values,
+                              from_cny_=group[FX_COLUMN["from_cny"]].values,
+                              to_cny_=group[FX_COLUMN["to_cny"]].values)
+
+    def load_file(self, file_: str, encoding: str = CONST["ENCODING"]) -> None:
+        """
+        load_file：根据给定的.csv或.parquet文件路径，读取汇率历史表
+        @file_(str)：给定文件地址，.parquet文件需要安装pyarrow或fastparquet
+        @encoding(str)：给定.csv文件编码方式，默认为CONST["ENCODING"]
+        @return(None)
+        """
+
+        if file_.endswith((".parquet", ".pq")):
+            self.load_frame(pandas.read_parquet(path=file_))
+        else:
+            self.load_frame(pandas.read_csv(filepath_or_buffer=file_, encoding=encoding))
+
+    def advance(self, datetime_: Timestamp) -> bool:
+        """
+        advance：将汇率历史推进到给定时间戳，更新各个货币的当前汇率；时间戳早于下一个汇率日期时直接返回
+        汇率历史只向后推进，开始新的回测前需要调用rewind
+        @datetime_(pandas.Timestamp)：给定时间戳
+        @return(bool)：是否推进了汇率历史；多个投资组合共用FX_RATES时，只有第一个调用者得到True，
+        判断当前汇率是否变化应当比较version
+        """
+
+        value = datetime_.value
+        if value < self.next_change:
+            return False
+
+        next_change = _NEVER
+        for id_, (dates, from_cny_, to_cny_) in self.history.items():
+            i = int(numpy.searchsorted(dates, value, side="right"))
+            if i > 0:
+                self._write(id_=id_, from_cny_=from_cny_[i - 1], to_cny_=to_cny_[i - 1])
+            if i < len(dates):
+                next_change = min(next_change, int(dates[i]))
+
+        self.next_change = next_change
+        self.version += 1
+        return True
+
+    def rewind(self) -> None:
+        """
+        rewind：重置汇率历史的推进位置，用于在同一进程中开始新的回测；当前汇率保持不变，直到下一次advance
+        @return(None)
+        """
+
+        self.next_change = min((int(dates[0]) for dates, _, _ in self.history.values()), default=_NEVER)
+
+    def to_cny_amounts(self, currency_ids_, amounts_) -> numpy.ndarray:
+        """
+        to_cny_amounts：对于给定货币编号和给定金额的数组，按当前汇率批量计算结汇所得的人民币（CNY）金额
+        @currency_ids_(array-like)：货币编号
+        @amounts_(array-like)：给定金额
+        @return(numpy.ndarray)：结汇所得的人民币（CNY）金额，保留2位小数
+        """
+
+        return numpy.round(numpy.asarray(amounts_, dtype=numpy.float64) * self.to_rates[currency_ids_], 2)
+
+    def from_cny_amounts(self, currency_ids_, amounts_) -> numpy.ndarray:
+        """
+        from_cny_amounts：对于给定货币编号和给定金额的数组，按当前汇率批量计算购汇所需的人民币（CNY）金额
+        @currency_ids_(array-like)：货币编号
+        @amounts_(array-like)：给定金额
+        @return(numpy.ndarray)：购汇所需的人民币（CNY）金额，保留2位小数
+        """
+
+        return numpy.round(numpy.asarray(amounts_, dtype=numpy.float64) * self.from_rates[currency_ids_], 2)
+
+
+# FX_RATES：回测框架使用的全局汇率模块
+FX_RATES = ExchangeRateTable()
+
 # 默认人民币（CNY）汇率为1
-FROM_CNY["CNY"] = 1
-TO_CNY["CNY"] = 1
+FX_RATES.set_rate("CNY", from_cny_=1, to_cny_=1)
 
 # 设置默认港币（HKD）汇率
-FROM_CNY["HKD"] = 0.82510
-TO_CNY["HKD"] = 0.82490
+FX_RATES.set_rate("HKD", from_cny_=0.82510, to_cny_=0.82490)
 
 
 def set_exchange_rate(currency_: str, from_cny_: float = None, to_cny_: float = None) -> None:
@@ -22,11 +242,7 @@ def set_exchange_rate(currency_: str, from_cny_: float = None, to_cny_: float =
     return(None)
     """
 
-    if from_cny_ is not None:
-        FROM_CNY[currency_] = from_cny_
-
-    if to_cny_ is not None:
-        TO_CNY[currency_] = to_cny_
+    FX_RATES.set_rate(currency_=currency_, from_cny_=from_cny_, to_cny_=to_cny_)
 
 
 def is_valid_currency(currency_: str) -> bool:
@@ -47,10 +263,10 @@ def amount_from_cny(currency_: str, amount_: float) -> float:
     return(float)：购汇所需的人民币（CNY）金额，保留2位小数
     """
 
-    if currency_ not in FROM_CNY:
+    rate = FROM_CNY.get(currency_)
+    if rate is None:
         raise RuntimeError("FROM_CNY {:s} not defined".format(currency_))
-    else:
-        return round(amount_ * FROM_CNY[currency_], ndigits=2)
+    return round(amount_ * rate, ndigits=2)
 
 
 def from_amount_of_cny(currency_: str, amount_: float) -> float:
@@ -61,10 +277,10 @@ def from_amount_of_cny(currency_: str, amount_: float) -> float:
     return(float)：购汇所得的给定货币金额，保留2位小数
     """
 
-    if currency_ not in FROM_CNY:
+    rate = FROM_CNY.get(currency_)
+    if rate is None:
         raise RuntimeError("FROM_CNY {:s} not defined".format(currency_))
-    else:
-        return round(amount_ / FROM_CNY[currency_], ndigits=2)
+    return round(amount_ / rate, ndigits=2)
 
 
 def amount_to_cny(currency_: str, amount_: float) -> float:
@@ -75,10 +291,10 @@ def amount_to_cny(currency_: str, amount_: float) -> float:
     return(float)：结汇所得的人民币（CNY）金额，保留2位小数
     """
 
-    if currency_ not in TO_CNY:
+    rate = TO_CNY.get(currency_)
+    if rate is None:
         raise RuntimeError("TO_CNY {:s} not defined".format(currency_))
-    else:
-        return round(amount_ * TO_CNY[currency_], ndigits=2)
+    return round(amount_ * rate, ndigits=2)
 
 
 def to_amount_of_cny(currency_: str, amount_: float) -> float:
@@ -88,9 +304,8 @@ def to_amount_of_cny(currency_: str, amount_: float) -> float:
     @amount_(float)：给定金额
     return(float)：结汇所需的给定货币金额，保留2位小数
     """
-    
-    if currency_ not in TO_CNY:
-        raise RuntimeError("TO_CNY {:s} not defined".format(currency_))
-    else:
-        return round(amount_ / TO_CNY[currency_], ndigits=2)
 
+    rate = TO_CNY.get(currency_)
+    if rate is None:
+        raise RuntimeError("TO_CNY {:s} not defined".format(currency_))
+    return round(amount_ / rate, ndigits=2)
@@ -1,9 +1,28 @@
 from abc import (ABCMeta)
 from BaseType.Const import CONST
 from pandas.tseries.offsets import DateOffset
-from pandas import Timestamp
+from pandas import (Timestamp, Timedelta)
 from BaseType.CashFlow import CashFlow
-from BaseType.ExchangeRate import (from_amount_of_cny, amount_to_cny)
+from BaseType.ExchangeRate import (from_amount_of_cny, amount_to_cny, FX_RATES)
+from functools import lru_cache
+import numpy
+
+# 固定长度的时间流逝单位，可以用pandas.Timedelta代替pandas.tseries.offsets.DateOffset
+FIXED_OFFSET = {"weeks", "days", "hours", "minutes", "seconds", "milliseconds", "microseconds", "nanoseconds"}
+
+
+@lru_cache(maxsize=None)
+def time_delta(offset: str, times: int):
+    """
+    time_delta：给定时间流逝单位和颗粒数量对应的时间间隔，结果被缓存，避免每次时间流逝都重新构造
+    @offset(str)：时间流逝的单位颗粒
+    @times(int)：时间流逝的颗粒数量
+    @return(pandas.Timedelta或pandas.tseries.offsets.DateOffset)：固定长度的单位为Timedelta，否则为DateOffset
+    """
+
+    if offset in FIXED_OFFSET:
+        return Timedelta(**{offset: times})
+    return DateOffset(**{offset: times})
 
 
 class Subject(object):
@@ -76,6 +95,9 @@ class Subject(object):
 
         self.currency = currency_
 
+        # currency_id：货币编号，用于直接读取FX_RATES中以编号为下标的当前汇率
+        self.currency_id = FX_RATES.currency_id(currency_=currency_)
+
         self.refresh()
 
     def refresh(self) -> None:
@@ -84,12 +106,35 @@ class Subject(object):
         @return(None)
         """
 
-        self.crt_amount = amount_to_cny(currency_=self.currency,
-                                        amount_=self.crt_price * self.volume * self.multiplier)
-        self.net_amount = amount_to_cny(currency_=self.currency,
-                                        amount_=self.net_price * self.volume * self.multiplier)
-        self.book_amount = amount_to_cny(currency_=self.currency,
-                                         amount_=self.book_value * self.volume * self.multiplier)
+        # 每次更新只按货币编号读取一次当前结汇汇率，汇率随FX_RATES推进而更新
+        rate = float(FX_RATES.to_rates[self.currency_id])
+        if rate != rate:
+            raise RuntimeError("TO_CNY {:s} not defined".format(str(self.currency)))
+
+        # 当前数量为0时，各金额均为0，无需进行换汇计算
+        if self.volume == 0:
+            self.crt_amount = 0.0
+            self.net_amount = 0.0
+            self.book_amount = 0.0
+            return
+
+        self.crt_amount = round(self.crt_price * self.volume * self.multiplier * rate, ndigits=2)
+        self.net_amount = round(self.net_price * self.volume * self.multiplier * rate, ndigits=2)
+        self.book_amount = round(self.book_value * self.volume * self.multiplier * rate, ndigits=2)
+
+    def refresh_price(self) -> None:
+        """
+        refresh_price：仅更新以人民币（CNY）为单位的对象现值（crt_amount），用于只有现价变化的情形
+        净值（net_amount）、面值（book_amount）不随现价变化，无需重新计算
+        @return(None)
+        """
+
+        if self.volume == 0:
+            self.crt_amount = 0.0
+            return
+
+        rate = float(FX_RATES.to_rates[self.currency_id])
+        self.crt_amount = round(self.crt_price * self.volume * self.multiplier * rate, ndigits=2)
 
     def amount_to_volume(self, amount_: float, price_: float, direction_: int) -> float:
         """
@@ -193,6 +238,25 @@ class Subject(object):
 
         return CashFlow(currency_=self.currency, amount_=max(ret, 0))
 
+    def volumes_to_amounts(self, volumes_, prices_, direction_: int) -> numpy.ndarray:
+        """
+        volumes_to_amounts：对于给定的一组交易数量、交易价格和给定交易方向，批量计算以人民币（CNY）为单位的交易金额
+        计算方式与逐笔调用volume_to_cash_flow再结汇（to_cny）相同，每笔均计入定额费用
+        @volumes_(numpy.ndarray)：给定的交易数量
+        @prices_(numpy.ndarray)：给定的交易价格
+        @direction_(int)：给定交易方向
+        @return(numpy.ndarray)：以人民币（CNY）为单位的交易金额，保留2位小数
+        """
+
+        ret = numpy.asarray(volumes_, dtype=numpy.float64) * numpy.asarray(prices_, dtype=numpy.float64)
+
+        if direction_ == 1:
+            ret = ret * (1 + self.bid_commission_rate + self.bid_tax_rate) + (self.bid_commission + self.bid_tax)
+        else:
+            ret = ret / (1 - self.ask_commission_rate - self.ask_tax_rate) - (self.ask_commission + self.ask_tax)
+
+        return FX_RATES.to_cny_amounts(self.currency_id, numpy.maximum(ret, 0))
+
     def set(self, args: dict) -> None:
         """
         set：设置对象的属性
@@ -202,6 +266,7 @@ class Subject(object):
 
         for name, value in args.items():
             super().__setattr__(name=name, value=value)
+        self.currency_id = FX_RATES.currency_id(currency_=self.currency)
         self.refresh()
 
     def time_offset(self, offset: str = CONST["TIME_OFFSET"], times: int = CONST["TIME_OFFSET_TIMES"]) -> None:
@@ -212,5 +277,5 @@ class Subject(object):
         @return(None)
         """
 
-        # 调用pandas.tseries.offsets.DateOffset方法
-        self.last_datetime = self.last_datetime + DateOffset(**{offset: times})
+        # 使用缓存的时间间隔
+        self.last_datetime = self.last_datetime + time_delta(offset, times)
@@ -0,0 +1,85 @@
+from Event.Event import Event
+from Event.EventQueue import EVENT_QUEUE
+from Exchange.Exchange import (ExchangeUnion, PseudoExchangeUnit, day_bar_slicer)
+from Portfolio.Holding import (HoldingUnion, PseudoHoldingUnit)
+from Strategy.Strategy import StrategyUnion
+from Benchmark.RoutingBenchmark import NullStrategyUnit
+from BaseType.Const import CONST
+from Logger.LogPolicy import (LOG_POLICY, OFF)
+import Information.Info as Info
+from pandas.tseries.offsets import DateOffset
+import contextlib
+import io
+import random
+import sys
+import time
+
+
+def benchmark(bar_matching_: bool = False, n_symbols_: int = 50, n_days_: int = 120, n_orders_: int = 20):
+    """
+    benchmark：测量日线回测中，逐个处理切片Price事件与Bar撮合方式的耗时
+    由于EVENT_QUEUE为全局变量，每次测量应当在新的进程中运行：python -m Benchmark.BarMatchingBenchmark [bar|slice]
+    @bar_matching_(bool)：是否采用Bar撮合方式，默认为False
+    @n_symbols_(int)：交易标的数量，默认为50
+    @n_days_(int)：交易日数量，默认为120
+    @n_orders_(int)：每个标的预先放入的买入、卖出委托数量，默认为20
+    @return(float, int)：运行事件队列的耗时（秒），以及成交数量
+    """
+
+    random.seed(0)
+    symbols = ["{:06d}.SH".format(600000 + i) for i in range(n_symbols_)]
+
+    executor = ExchangeUnion(bar_matching_=bar_matching_)
+    portfolio = HoldingUnion()
+    strategy = StrategyUnion(factory_=NullStrategyUnit)
+    portfolio.subscribe(amount_=1000000.00)
+
+    fills = list()
+    EVENT_QUEUE.register("Fill", fills.append)
+    EVENT_QUEUE.register("FillBatch", lambda event_: fills.extend(event_.info))
+
+    for symbol_ in symbols:
+        executor.register(PseudoExchangeUnit(symbol_=symbol_, crt_price_=10.0, last_datetime_=executor.last_datetime,
+                                             bar_slicer_=day_bar_slicer))
+        portfolio.register(PseudoHoldingUnit(symbol_=symbol_, crt_price_=10.0,
+                                             last_datetime_=executor.last_datetime))
+        strategy.register(NullStrategyUnit(symbol_=symbol_, crt_price_=10.0))
+
+    # 每个标的以随机游走生成日线数据，并在价格区间内预先放入若干买入、卖出委托
+    datetime_ = CONST["START_TIME"]
+    for symbol_ in symbols:
+        for i in range(n_orders_):
+            direction_ = 1 if i % 2 == 0 else -1
+            EVENT_QUEUE.put(Event(type_="Order", datetime_=datetime_,
+                                  info_=Info.OrderInfo(symbol_=symbol_, datetime_=datetime_, direction_=direction_,
+                                                       open_or_close_=direction_,
+                                                       price_=round(10.0 - direction_ * random.random() * 3, 2),
+                                                       volume_=100)))
+
+        close_ = 10.0
+        day_ = datetime_
+        for _ in range(n_days_):
+            day_ += DateOffset(days=1)
+            open_ = close_ * (1 + random.gauss(0, 0.01))
+            close_ = open_ * (1 + random.gauss(0, 0.02))
+            high_ = max(open_, close_) * (1 + abs(random.gauss(0, 0.01)))
+            low_ = min(open_, close_) * (1 - abs(random.gauss(0, 0.01)))
+            EVENT_QUEUE.put(Event(type_="Bar", datetime_=day_,
+                                  info_=Info.BarInfo(symbol_=symbol_, datetime_=day_,
+                                                     open_=round(open_, 2), high_=round(high_, 2),
+                                                     low_=round(low_, 2), close_=round(close_, 2),
+                                                     volume_=0, turnover_=0)))
+
+    # 事件记录和投资组合在Clear事件中输出的净值信息不计入测量
+    for type_ in ("Bar", "Order", "Fill", "FillBatch", "Cancel", "Clear"):
+        LOG_POLICY.set(type_, OFF)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        EVENT_QUEUE.run()
+    return time.perf_counter() - start, len(fills)
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "slice"
+    seconds, n_fills = benchmark(bar_matching_=(mode == "bar"))
+    print("{:s}: {:.3f}s, {:d} fills".format(mode, seconds, n_fills))
@@ -0,0 +1,91 @@
+from Event.Event import Event
+from Event.EventQueue import EVENT_QUEUE
+from Exchange.Exchange import (ExchangeUnion, PseudoExchangeUnit)
+from MovingAverage.MAStrategy import (MAStrategyUnit, MABatchStrategyUnit)
+from Strategy.Strategy import StrategyUnion
+from BaseType.Const import CONST
+from Logger.LogPolicy import (LOG_POLICY, OFF)
+import Information.Info as Info
+from pandas.tseries.offsets import DateOffset
+import contextlib
+import io
+import numpy
+import random
+import subprocess
+import sys
+import time
+
+
+def benchmark(n_params_: int = 0, n_symbols_: int = 20, n_days_: int = 10, n_bars_: int = 60) -> float:
+    """
+    benchmark：测量同一数据事件流驱动移动均线策略时，运行事件队列的耗时
+    n_params_为0时每个标的使用一个MAStrategyUnit，否则每个标的使用一个评估n_params_个参数组合的MABatchStrategyUnit
+    由于EVENT_QUEUE为全局变量，每次测量应当在新的进程中运行：python -m Benchmark.BatchGridBenchmark
+    @n_params_(int)：参数组合数量，默认为0
+    @n_symbols_(int)：交易标的数量，默认为20
+    @n_days_(int)：交易日数量，默认为10
+    @n_bars_(int)：每个交易日每个标的的1分钟Bar数量，默认为60
+    @return(float)：运行事件队列的耗时（秒）
+    """
+
+    random.seed(0)
+    symbols = ["{:06d}.SH".format(600000 + i) for i in range(n_symbols_)]
+
+    executor = ExchangeUnion()
+    for symbol_ in symbols:
+        executor.register(PseudoExchangeUnit(symbol_=symbol_, crt_price_=10.0, last_datetime_=executor.last_datetime))
+
+    # 参数网格：短周期3, 4, ...，长周期取短周期的2至4倍
+    shorts = numpy.arange(n_params_) % 10 + 3
+    longs = shorts * (2 + numpy.arange(n_params_) // 10 % 3) + 1
+
+    if n_params_ == 0:
+        strategy = StrategyUnion(factory_=MAStrategyUnit)
+        for symbol_ in symbols:
+            strategy.register(MAStrategyUnit(symbol_=symbol_, short_=7, long_=23, volume_=1000))
+    else:
+        strategy = StrategyUnion(factory_=MABatchStrategyUnit)
+        for symbol_ in symbols:
+            strategy.register(MABatchStrategyUnit(shorts_=shorts, longs_=longs, init_cash_=1000000.00,
+                                                  symbol_=symbol_, volume_=1000))
+
+    # 事件记录不计入测量
+    for type_ in ("Bar", "Price", "Signal", "Order", "Fill", "FillBatch", "Cancel", "Expire"):
+        LOG_POLICY.set(type_, OFF)
+
+    # 生成每个标的在每个交易日的1分钟Bar事件
+    events = list()
+    prices = {symbol_: 10.0 for symbol_ in symbols}
+    for day in range(n_days_):
+        datetime_ = CONST["START_TIME"] + DateOffset(days=day, hours=9, minutes=30)
+        for _ in range(n_bars_):
+            for symbol_ in symbols:
+                open_ = prices[symbol_]
+                close_ = round(open_ * (1 + random.gauss(0, 0.003)), 2)
+                events.append(Event(type_="Bar", datetime_=datetime_,
+                                    info_=Info.BarInfo(symbol_=symbol_, datetime_=datetime_, open_=open_,
+                                                       high_=max(open_, close_) + 0.01,
+                                                       low_=min(open_, close_) - 0.01, close_=close_,
+                                                       volume_=10000, turnover_=10000 * close_)))
+                prices[symbol_] = close_
+            datetime_ += DateOffset(minutes=1)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        EVENT_QUEUE.run(iter(events))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # 指定参数组合数量时，在当前进程中测量一次；否则在新的进程中依次测量单一参数和不同数量的参数组合
+    if len(sys.argv) > 1:
+        print(benchmark(n_params_=int(sys.argv[1])))
+    else:
+        base = None
+        for n_params in (0, 1, 10, 100):
+            seconds = float(subprocess.run([sys.executable, "-m", "Benchmark.BatchGridBenchmark", str(n_params)],
+                                           capture_output=True, text=True, check=True).stdout.strip())
+            if base is None:
+                base = seconds
+            print("{:s}: {:.3f}s, {:.2f}x of one MAStrategyUnit run".format(
+                "MAStrategyUnit" if n_params == 0 else "{:d} params".format(n_params), seconds, seconds / base))
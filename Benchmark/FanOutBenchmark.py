@@ -0,0 +1,90 @@
+from Event.Event import Event
+from Event.EventQueue import EVENT_QUEUE
+from Exchange.Exchange import (ExchangeUnion, PseudoExchangeUnit)
+from Portfolio.Holding import (HoldingUnion, PseudoHoldingUnit)
+from MovingAverage.MAStrategy import MAStrategyUnit
+from Strategy.Strategy import StrategyUnion
+from Logger.Logger import LoggerStringUnit
+from BaseType.Const import CONST
+from Logger.LogPolicy import (LOG_POLICY, OFF)
+import Information.Info as Info
+from pandas.tseries.offsets import DateOffset
+import contextlib
+import io
+import random
+import subprocess
+import sys
+import time
+
+
+def benchmark(n_books_: int = 1, n_symbols_: int = 20, n_days_: int = 10, n_bars_: int = 60) -> float:
+    """
+    benchmark：测量同一数据、策略事件流驱动给定数量的投资组合（各自与一个交易所模块配对）时，运行事件队列的耗时
+    Bar切片和策略计算仅进行一次，每增加一个投资组合，增加的耗时为其撮合、持仓和资金处理的开销
+    由于EVENT_QUEUE为全局变量，每次测量应当在新的进程中运行：python -m Benchmark.FanOutBenchmark
+    @n_books_(int)：投资组合数量，默认为1
+    @n_symbols_(int)：交易标的数量，默认为20
+    @n_days_(int)：交易日数量，默认为10
+    @n_bars_(int)：每个交易日每个标的的1分钟Bar数量，默认为60
+    @return(float)：运行事件队列的耗时（秒）
+    """
+
+    random.seed(0)
+    symbols = ["{:06d}.SH".format(600000 + i) for i in range(n_symbols_)]
+
+    strategy = StrategyUnion(factory_=MAStrategyUnit)
+    for symbol_ in symbols:
+        strategy.register(MAStrategyUnit(symbol_=symbol_, short_=7, long_=23, volume_=1000))
+
+    for book_ in range(n_books_):
+        executor = ExchangeUnion(book_=book_)
+        portfolio = HoldingUnion(book_=book_, logger_=LoggerStringUnit(head_="cash,amount,asset,debt,net_asset,"
+                                                                             "share,net_price"))
+        portfolio.subscribe(amount_=1000000.00 * (book_ + 1))
+        for symbol_ in symbols:
+            executor.register(PseudoExchangeUnit(symbol_=symbol_, crt_price_=10.0,
+                                                 last_datetime_=executor.last_datetime))
+            portfolio.register(PseudoHoldingUnit(symbol_=symbol_, crt_price_=10.0,
+                                                 last_datetime_=executor.last_datetime))
+
+    # 事件记录不计入测量
+    for type_ in ("Bar", "Price", "Signal", "Order", "Fill", "FillBatch", "Cancel", "Expire"):
+        LOG_POLICY.set(type_, OFF)
+
+    # 生成每个标的在每个交易日的1分钟Bar事件
+    events = list()
+    prices = {symbol_: 10.0 for symbol_ in symbols}
+    for day in range(n_days_):
+        datetime_ = CONST["START_TIME"] + DateOffset(days=day, hours=9, minutes=30)
+        for _ in range(n_bars_):
+            for symbol_ in symbols:
+                open_ = prices[symbol_]
+                close_ = round(open_ * (1 + random.gauss(0, 0.003)), 2)
+                events.append(Event(type_="Bar", datetime_=datetime_,
+                                    info_=Info.BarInfo(symbol_=symbol_, datetime_=datetime_, open_=open_,
+                                                       high_=max(open_, close_) + 0.01,
+                                                       low_=min(open_, close_) - 0.01, close_=close_,
+                                                       volume_=10000, turnover_=10000 * close_)))
+                prices[symbol_] = close_
+            datetime_ += DateOffset(minutes=1)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        EVENT_QUEUE.run(iter(events))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # 指定投资组合数量时，在当前进程中测量一次；否则在新的进程中依次测量不同数量的投资组合，每个数量取3次测量的最小值
+    if len(sys.argv) > 1:
+        print(benchmark(n_books_=int(sys.argv[1])))
+    else:
+        base = None
+        for n_books in (1, 2, 4, 8):
+            seconds = min(float(subprocess.run([sys.executable, "-m", "Benchmark.FanOutBenchmark", str(n_books)],
+                                               capture_output=True, text=True, check=True).stdout.strip())
+                          for _ in range(3))
+            if base is None:
+                base = seconds
+            print("{:d} books: {:.3f}s, {:.2f}x of 1 book, {:.1%} of 1 book per extra book".format(
+                n_books, seconds, seconds / base, (seconds - base) / base / max(n_books - 1, 1)))
@@ -0,0 +1,73 @@
+from Event.Event import Event
+from Event.EventQueue import EVENT_QUEUE
+from Exchange.Exchange import (ExchangeUnion, PseudoExchangeUnit)
+from Portfolio.Holding import (HoldingUnion, PseudoHoldingUnit)
+from BaseType.Const import CONST
+from Logger.LogPolicy import (LOG_POLICY, OFF)
+import Information.Info as Info
+from pandas.tseries.offsets import DateOffset
+import contextlib
+import io
+import random
+import time
+
+
+def benchmark(n_symbols_: int = 20, n_ticks_: int = 500, n_signals_: int = 6) -> (float, int):
+    """
+    benchmark：测量投资组合与交易所之间处理大量交易信号、委托、成交和撤回的耗时
+    信号在测量过程中生成，因此测量结果包含信号ID、委托ID的生成开销
+    由于EVENT_QUEUE为全局变量，每次测量应当在新的进程中运行：python -m Benchmark.OrderThroughputBenchmark
+    @n_symbols_(int)：交易标的数量，默认为20
+    @n_ticks_(int)：每个标的的Price事件数量，默认为500
+    @n_signals_(int)：每个Price事件之后放入的交易信号数量，买入、卖出交替，默认为6
+    @return(float, int)：运行事件队列的耗时（秒），以及处理的委托数量
+    """
+
+    random.seed(0)
+    symbols = ["{:06d}.SH".format(600000 + i) for i in range(n_symbols_)]
+
+    executor = ExchangeUnion()
+    portfolio = HoldingUnion()
+    portfolio.subscribe(amount_=100000000.00)
+
+    for symbol_ in symbols:
+        executor.register(PseudoExchangeUnit(symbol_=symbol_, crt_price_=10.0, last_datetime_=executor.last_datetime))
+        portfolio.register(PseudoHoldingUnit(symbol_=symbol_, crt_price_=10.0,
+                                             last_datetime_=executor.last_datetime))
+
+    orders = list()
+    EVENT_QUEUE.register("Order", orders.append)
+
+    # 事件记录不计入测量
+    for type_ in ("Price", "Signal", "Order", "Fill", "FillBatch", "Cancel", "Expire"):
+        LOG_POLICY.set(type_, OFF)
+
+    prices = {symbol_: 10.0 for symbol_ in symbols}
+    datetime_ = CONST["START_TIME"] + DateOffset(hours=9, minutes=30)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(n_ticks_):
+            # 每个标的放入一个Price事件，并在现价附近放入若干买入、卖出信号，部分即时成交，其余进入委托队列
+            for symbol_ in symbols:
+                prices[symbol_] = round(prices[symbol_] * (1 + random.gauss(0, 0.002)), 2)
+                EVENT_QUEUE.put(Event(type_="Price", datetime_=datetime_,
+                                      info_=Info.PriceInfo(symbol_=symbol_, datetime_=datetime_,
+                                                           crt_price_=prices[symbol_])))
+                for i in range(n_signals_):
+                    direction_ = 1 if i % 2 == 0 else -1
+                    EVENT_QUEUE.put(Event(type_="Signal", datetime_=datetime_,
+                                          info_=Info.SignalInfo(symbol_=symbol_, datetime_=datetime_,
+                                                                direction_=direction_, open_or_close_=direction_,
+                                                                price_=round(prices[symbol_] + direction_ *
+                                                                             random.uniform(-0.05, 0.02), 2),
+                                                                volume_=100, signal_type_="TBF")))
+            EVENT_QUEUE.process_through()
+            datetime_ += DateOffset(seconds=3)
+
+    return time.perf_counter() - start, len(orders)
+
+
+if __name__ == "__main__":
+    seconds, n_orders = benchmark()
+    print("{:.3f}s, {:d} orders, {:.0f} orders/s".format(seconds, n_orders, n_orders / seconds))
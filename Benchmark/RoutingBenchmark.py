@@ -0,0 +1,81 @@
+from Event.Event import Event
+from Event.EventQueue import EVENT_QUEUE
+from Exchange.Exchange import (ExchangeUnion, PseudoExchangeUnit)
+from Portfolio.Holding import (HoldingUnion, PseudoHoldingUnit)
+from Strategy.Strategy import (StrategyUnion, PseudoStrategyUnit)
+from BaseType.Const import CONST
+import Information.Info as Info
+from pandas.tseries.offsets import DateOffset
+import random
+import time
+
+
+class NullStrategyUnit(PseudoStrategyUnit):
+    """
+    NullStrategyUnit(PseudoStrategyUnit)：不生成信号的单位策略模块，仅用于测量事件分发的开销
+    """
+
+    def on_bar(self, event: Event) -> None:
+        pass
+
+    def on_price(self, event: Event) -> None:
+        self.crt_price = event.info.crt_price
+
+    def on_fill(self, event: Event) -> None:
+        pass
+
+    def on_clear(self, event: Event) -> None:
+        pass
+
+    def on_end(self, event: Event) -> None:
+        pass
+
+    def put_signals(self) -> None:
+        pass
+
+
+def benchmark(n_symbols_: int = 500, n_strategies_: int = 10, n_ticks_: int = 200) -> float:
+    """
+    benchmark：测量在给定数量的交易标的中，交易策略仅覆盖少数标的时，事件队列分发Price事件的耗时
+    由于EVENT_QUEUE为全局变量，每次测量应当在新的进程中运行：python -m Benchmark.RoutingBenchmark
+    @n_symbols_(int)：交易标的数量，默认为500
+    @n_strategies_(int)：交易策略及持仓覆盖的标的数量，默认为10
+    @n_ticks_(int)：每个标的的Price事件数量，默认为200
+    @return(float)：事件队列分发Price事件的耗时（秒）
+    """
+
+    random.seed(0)
+    symbols = ["{:06d}.SH".format(600000 + i) for i in range(n_symbols_)]
+
+    executor = ExchangeUnion()
+    portfolio = HoldingUnion()
+    strategy = StrategyUnion(factory_=NullStrategyUnit)
+    portfolio.subscribe(amount_=1000000.00)
+
+    for symbol_ in symbols:
+        executor.register(PseudoExchangeUnit(symbol_=symbol_, crt_price_=10.0,
+                                             last_datetime_=executor.last_datetime))
+    for symbol_ in symbols[:n_strategies_]:
+        portfolio.register(PseudoHoldingUnit(symbol_=symbol_, crt_price_=10.0,
+                                             last_datetime_=executor.last_datetime))
+        strategy.register(NullStrategyUnit(symbol_=symbol_, crt_price_=10.0))
+
+    # 生成每个标的在每个时刻的Price事件，逐个放入事件队列并处理，使得测量结果仅包含事件分发的开销
+    events = list()
+    datetime_ = CONST["START_TIME"] + DateOffset(hours=9, minutes=30)
+    for _ in range(n_ticks_):
+        for symbol_ in symbols:
+            events.append(Event(type_="Price", datetime_=datetime_,
+                                info_=Info.PriceInfo(symbol_=symbol_, datetime_=datetime_,
+                                                     crt_price_=10.0 + random.random())))
+        datetime_ += DateOffset(seconds=3)
+
+    start = time.perf_counter()
+    for event_ in events:
+        EVENT_QUEUE.put(event_)
+        EVENT_QUEUE.process_next()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print("{:.3f}s".format(benchmark()))
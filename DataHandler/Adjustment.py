@@ -0,0 +1,204 @@
+from BaseType.Const import CONST
+import hashlib
+import numpy
+import os
+import pandas
+
+# ADJUST_PATH：复权价格缓存文件的默认目录
+CONST["ADJUST_PATH"] = CONST["THIS_PATH"] + "/log/adjust"
+
+# ACTION_COLUMN：除权除息表的列及缺失时使用的默认值
+# dividend为每股现金分红，split为每股送转后的股数（如10送5为1.5），ratio为除权除息参考价与前收盘价之比，
+# 提供ratio时不再根据dividend、split计算
+ACTION_COLUMN = {
+    "dividend": 0.0,
+    "split": 1.0,
+    "ratio": numpy.nan,
+}
+
+# ADJUST_METHOD：复权方式，forward（前复权，最新价格不变）、backward（后复权，最早价格不变）
+ADJUST_METHOD = {"forward", "backward"}
+
+# ADJUST_PREFIX：复权后保留的原始价格列的前缀
+ADJUST_PREFIX = "Raw"
+
+
+class CorporateActions:
+    """
+    CorporateActions：回测框架中，读取除权除息表（symbol、ex_date、每股分红、送转比例或除权比例），
+    以向量化方式计算复权因子并整体调整行情数据的模块
+    复权后的价格按(标的代码, 复权方式, 除权除息表和价格列的摘要)缓存为.npz文件，缓存中记录原始行情（时间戳和价格）的摘要，
+    除权除息表、价格列和原始行情均不变时重复运行直接读取缓存
+    """
+
+    __slots__ = ["dataframe", "digest"]
+
+    def __init__(self):
+        self.dataframe = pandas.DataFrame(columns=["symbol", "ex_date"] + list(ACTION_COLUMN.keys()))
+        self.digest = ""
+
+    def load_file(self, file_: str, encoding: str = CONST["ENCODING"]) -> None:
+        """
+        load_file：根据给定的.csv或.parquet文件路径，读取除权除息表，以文件内容的摘要作为缓存键
+        @file_(str)：给定文件地址，.parquet文件需要安装pyarrow或fastparquet
+        @encoding(str)：给定.csv文件编码方式，默认为CONST["ENCODING"]
+        @return(None)
+        """
+
+        if file_.endswith((".parquet", ".pq")):
+            self.load_frame(pandas.read_parquet(path=file_))
+        else:
+            self.load_frame(pandas.read_csv(filepath_or_buffer=file_, encoding=encoding))
+
+        with open(file_, "rb") as file:
+            self.digest = hashlib.sha1(file.read()).hexdigest()
+
+    def load_frame(self, frame_: pandas.DataFrame) -> None:
+        """
+        load_frame：根据给定的pandas.DataFrame，按列一次性整理除权除息表，以表内容的摘要作为缓存键
+        @frame_(pandas.DataFrame)：给定的除权除息表，至少包含symbol、ex_date列
+        @return(None)
+        """
+
+        frame_ = frame_.rename(columns=lambda name: str(name).strip().lower())
+        for name in ("symbol", "ex_date"):
+            if name not in frame_.columns:
+                raise ValueError("{:s} column not found".format(name))
+
+        frame_ = frame_.copy()
+        frame_["symbol"] = frame_["symbol"].astype(str)
+        frame_["ex_date"] = pandas.to_datetime(frame_["ex_date"]).dt.normalize()
+        for name, default in ACTION_COLUMN.items():
+            if name not in frame_.columns:
+                frame_[name] = default
+            else:
+                frame_[name] = frame_[name].astype(float).fillna(default)
+
+        self.dataframe = frame_[["symbol", "ex_date"] + list(ACTION_COLUMN.keys())]\
+            .sort_values(["symbol", "ex_date"], kind="stable").reset_index(drop=True)
+        self.digest = hashlib.sha1(pandas.util.hash_pandas_object(self.dataframe, index=False).values).hexdigest()
+
+    def __len__(self):
+        return len(self.dataframe)
+
+    def factors(self, symbol_: str, datetimes_: numpy.ndarray, closes_: numpy.ndarray,
+                method_: str = "forward") -> numpy.ndarray:
+        """
+        factors：以向量化方式计算给定标的每个时间戳的复权因子，复权价格为原始价格乘以复权因子
+        除权除息日及之后的首个时间戳处，价格按除权比例（除权除息参考价 / 前收盘价）跳变；
+        后复权因子为除权比例倒数的累积乘积，前复权因子为后复权因子除以其最后一个值
+        @symbol_(str)：标的代码
+        @datetimes_(numpy.ndarray)：按顺序排列的时间戳
+        @closes_(numpy.ndarray)：原始收盘价，用于计算除权比例
+        @method_(str)：复权方式，forward或backward，默认为forward
+        @return(numpy.ndarray)：复权因子
+        """
+
+        if method_ not in ADJUST_METHOD:
+            raise ValueError("adjust method {:s} not supported".format(str(method_)))
+
+        datetimes_ = numpy.asarray(datetimes_, dtype="datetime64[ns]")
+        closes_ = numpy.asarray(closes_, dtype=numpy.float64)
+        actions = self.dataframe[self.dataframe["symbol"] == symbol_]
+
+        # 除权除息日对应的首个时间戳下标，早于首个或晚于最后一个时间戳的除权除息不影响样例内的相对价格
+        pos = numpy.searchsorted(datetimes_, actions["ex_date"].to_numpy(dtype="datetime64[ns]"), side="left")
+        valid = (pos > 0) & (pos < len(datetimes_))
+        pos = pos[valid]
+
+        prev_close = closes_[pos - 1]
+        ratio = actions["ratio"].to_numpy()[valid]
+        computed = (prev_close - actions["dividend"].to_numpy()[valid]) / actions["split"].to_numpy()[valid] \
+            / prev_close
+        ratio = numpy.where(numpy.isnan(ratio), computed, ratio)
+
+        step = numpy.ones(len(datetimes_))
+        numpy.multiply.at(step, pos, 1 / ratio)
+        factor = numpy.cumprod(step)
+        if method_ == "forward" and len(factor) > 0:
+            factor /= factor[-1]
+        return factor
+
+    def cache_file(self, symbol_: str, method_: str, columns_: tuple = ("Open", "High", "Low", "Close"),
+                   cache_path_: str = CONST["ADJUST_PATH"]) -> str:
+        """
+        cache_file：给定标的、复权方式和价格列的缓存文件地址
+        @symbol_(str)：标的代码
+        @method_(str)：复权方式
+        @columns_(tuple)：需要复权的价格列，默认为("Open", "High", "Low", "Close")
+        @cache_path_(str)：缓存文件目录，默认为CONST["ADJUST_PATH"]
+        @return(str)：缓存文件地址
+        """
+
+        key = hashlib.sha1("{:s}|{:s}".format(self.digest, ",".join(columns_)).encode("utf-8")).hexdigest()
+        return "{:s}/{:s}_{:s}_{:s}.npz".format(cache_path_, symbol_, method_, key[:16])
+
+    @staticmethod
+    def source_digest(datetimes_: numpy.ndarray, raw_: numpy.ndarray) -> str:
+        """
+        source_digest：原始行情（时间戳和复权前的价格）的摘要，用于校验缓存
+        @datetimes_(numpy.ndarray)：时间戳
+        @raw_(numpy.ndarray)：复权前的价格，每列对应一个价格列
+        @return(str)：摘要
+        """
+
+        digest = hashlib.sha1(numpy.ascontiguousarray(datetimes_, dtype="datetime64[ns]").tobytes())
+        digest.update(numpy.ascontiguousarray(raw_, dtype=numpy.float64).tobytes())
+        return digest.hexdigest()
+
+    def adjust(self, frame_: pandas.DataFrame, method_: str = "forward",
+               columns_: tuple = ("Open", "High", "Low", "Close"), symbol_column_: str = "Symbol",
+               datetime_column_: str = "UpdateDateTime", cache_path_: str = CONST["ADJUST_PATH"]) -> pandas.DataFrame:
+        """
+        adjust：将给定行情数据的价格列整体替换为复权价格，原始价格保留在增加前缀ADJUST_PREFIX的列中（如RawClose），
+        复权因子保留在AdjFactor列中，原始价格为复权价格除以复权因子；
+        AdjFactor随Bar、Price事件传递（BarInfo.adj_factor、PriceInfo.adj_factor），但交易所和投资组合模块仍以复权价格撮合和计算现金收付；
+        缓存文件存在且原始行情的摘要相同时直接读取，否则计算并写入缓存，cache_path_为None时不使用缓存
+        @frame_(pandas.DataFrame)：给定的行情数据，按时间戳顺序排列
+        @method_(str)：复权方式，forward或backward，默认为forward
+        @columns_(tuple)：需要复权的价格列，最后一列为计算除权比例使用的收盘价，默认为("Open", "High", "Low", "Close")
+        @symbol_column_(str)：标的代码列，默认为Symbol
+        @datetime_column_(str)：时间戳列，默认为UpdateDateTime
+        @cache_path_(str)：缓存文件目录，默认为CONST["ADJUST_PATH"]
+        @return(pandas.DataFrame)：复权后的行情数据
+        """
+
+        frame_ = frame_.copy()
+        columns_ = list(columns_)
+        for name in columns_:
+            frame_[ADJUST_PREFIX + name] = frame_[name]
+        frame_["AdjFactor"] = 1.0
+
+        if cache_path_ is not None:
+            os.makedirs(cache_path_, exist_ok=True)
+
+        all_datetimes = frame_[datetime_column_].to_numpy(dtype="datetime64[ns]")
+        all_raw = frame_[columns_].to_numpy(dtype=numpy.float64)
+        for symbol_, rows in frame_.groupby(symbol_column_, sort=False).indices.items():
+            symbol_ = str(symbol_)
+            datetimes = all_datetimes[rows]
+            raw = all_raw[rows]
+            file_ = None if cache_path_ is None else self.cache_file(symbol_, method_, columns_, cache_path_)
+            source = None if file_ is None else self.source_digest(datetimes_=datetimes, raw_=raw)
+
+            # 读取缓存：原始行情的摘要与缓存相同，且缓存包含全部价格列时，直接使用缓存的复权价格
+            adjusted = None
+            if file_ is not None and os.path.exists(file_):
+                with numpy.load(file_) as cache:
+                    names = columns_ + ["AdjFactor"]
+                    if "source" in cache.files and str(cache["source"]) == source and \
+                            all(name in cache.files for name in names):
+                        adjusted = {name: cache[name] for name in names}
+
+            if adjusted is None:
+                factor = self.factors(symbol_=symbol_, datetimes_=datetimes, closes_=raw[:, -1], method_=method_)
+                values = raw * factor[:, None]
+                adjusted = {name: values[:, i] for i, name in enumerate(columns_)}
+                adjusted["AdjFactor"] = factor
+                if file_ is not None:
+                    numpy.savez(file_, source=numpy.array(source), **adjusted)
+
+            for name, values in adjusted.items():
+                frame_.iloc[rows, frame_.columns.get_loc(name)] = values
+
+        return frame_
@@ -0,0 +1,135 @@
+from BaseType.Const import CONST
+from BaseType.ExchangeRate import is_valid_currency
+import pandas
+
+# INSTRUMENT_COLUMN：标的信息表的列与单位模块初始化参数的对应关系，以及缺失时使用的默认值和数据类型
+INSTRUMENT_COLUMN = {
+    "exchange": ("exchange_", CONST["EXCHANGE"], str),
+    "per_hand": ("per_hand_", CONST["PER_HAND"], int),
+    "per_price": ("per_price_", CONST["PER_PRICE"], float),
+    "bid_commission": ("bid_commission_", CONST["BID_COMMISSION"], float),
+    "bid_commission_rate": ("bid_commission_rate_", CONST["BID_COMMISSION_RATE"], float),
+    "ask_commission": ("ask_commission_", CONST["ASK_COMMISSION"], float),
+    "ask_commission_rate": ("ask_commission_rate_", CONST["ASK_COMMISSION_RATE"], float),
+    "bid_tax": ("bid_tax_", CONST["BID_TAX"], float),
+    "bid_tax_rate": ("bid_tax_rate_", CONST["BID_TAX_RATE"], float),
+    "ask_tax": ("ask_tax_", CONST["ASK_TAX"], float),
+    "ask_tax_rate": ("ask_tax_rate_", CONST["ASK_TAX_RATE"], float),
+    "crt_price": ("crt_price_", CONST["CRT_PRICE"], float),
+    "multiplier": ("multiplier_", CONST["MULTIPLIER"], int),
+    "margin_rate": ("margin_rate_", CONST["MARGIN_RATE"], float),
+    "currency": ("currency_", CONST["CURRENCY"], str),
+}
+
+# INSTRUMENT_ALIAS：标的信息表的列名别称
+INSTRUMENT_ALIAS = {
+    "lot_size": "per_hand",
+    "tick_size": "per_price",
+}
+
+
+class InstrumentMaster:
+    """
+    InstrumentMaster：回测框架中，读取标的信息表（symbol、exchange、每手数量、报价单位、费用税率、乘数、货币代码等），
+    并在回测运行前批量生成和注册交易所、投资组合、投资顾问的单位模块的模块
+    """
+
+    __slots__ = ["dataframe"]
+
+    def __init__(self):
+        self.dataframe = pandas.DataFrame()
+
+    def load_file(self, file_: str, encoding: str = CONST["ENCODING"]) -> None:
+        """
+        load_file：根据给定的.csv或.parquet文件路径，读取标的信息表
+        @file_(str)：给定文件地址，.parquet文件需要安装pyarrow或fastparquet
+        @encoding(str)：给定.csv文件编码方式，默认为CONST["ENCODING"]
+        @return(None)
+        """
+
+        if file_.endswith((".parquet", ".pq")):
+            self.load_frame(pandas.read_parquet(path=file_))
+        else:
+            self.load_frame(pandas.read_csv(filepath_or_buffer=file_, encoding=encoding))
+
+    def load_frame(self, frame_: pandas.DataFrame) -> None:
+        """
+        load_frame：根据给定的pandas.DataFrame，按列一次性整理标的信息表，缺失的列或数值使用CONST中的默认值
+        @frame_(pandas.DataFrame)：给定的标的信息表，至少包含symbol列
+        @return(None)
+        """
+
+        frame_ = frame_.rename(columns=lambda name: str(name).strip().lower())
+        frame_ = frame_.rename(columns=INSTRUMENT_ALIAS)
+        if "symbol" not in frame_.columns:
+            raise ValueError("symbol column not found")
+
+        frame_ = frame_.drop_duplicates(subset="symbol", keep="last").reset_index(drop=True)
+        frame_["symbol"] = frame_["symbol"].astype(str)
+
+        # 交易所默认与根据Bar、Price、Order信息初始化单位模块时相同，取标的代码的后2位
+        if "exchange" not in frame_.columns:
+            frame_["exchange"] = frame_["symbol"].str[-2:]
+        else:
+            frame_["exchange"] = frame_["exchange"].fillna(frame_["symbol"].str[-2:])
+
+        for name, (_, default, dtype) in INSTRUMENT_COLUMN.items():
+            if name not in frame_.columns:
+                frame_[name] = default
+            else:
+                frame_[name] = frame_[name].fillna(default)
+            frame_[name] = frame_[name].astype(dtype)
+
+        # 货币代码必须已在回测框架中设置
+        for currency_ in frame_["currency"].unique():
+            if not is_valid_currency(currency_=currency_):
+                raise ValueError("{:s} not valid currency".format(str(currency_)))
+
+        self.dataframe = frame_[["symbol"] + list(INSTRUMENT_COLUMN.keys())]
+
+    def __len__(self):
+        return len(self.dataframe)
+
+    def iter_kwargs(self):
+        """
+        iter_kwargs：按行返回单位模块的初始化参数
+        @return(Generator)：包含(标的代码, 初始化参数字典)的生成器
+        """
+
+        names = [INSTRUMENT_COLUMN[name][0] for name in INSTRUMENT_COLUMN.keys()]
+        columns = [self.dataframe[name].tolist() for name in INSTRUMENT_COLUMN.keys()]
+        for symbol_, values in zip(self.dataframe["symbol"].tolist(), zip(*columns)):
+            kwargs = dict(zip(names, values))
+            kwargs["symbol_"] = symbol_
+            yield symbol_, kwargs
+
+    def register(self, exchange_=None, portfolio_=None, strategy_=None, last_datetime_=CONST["START_TIME"],
+                 exchange_kwargs_: dict = None, portfolio_kwargs_: dict = None, strategy_kwargs_: dict = None) -> None:
+        """
+        register：根据标的信息表，使用各模块的单位模块初始化方法，批量生成并注册单位模块，已注册的标的代码不作处理
+        @exchange_(ExchangeUnion)：交易所模块，默认为None即不注册
+        @portfolio_(HoldingUnion)：投资组合模块，默认为None即不注册
+        @strategy_(StrategyUnion)：投资顾问模块，默认为None即不注册
+        @last_datetime_(pandas.Timestamp)：单位模块的最新时间戳，默认为CONST["START_TIME"]
+        @exchange_kwargs_(dict)：单位交易模块的其他初始化参数（如bar_slicer_），默认为None
+        @portfolio_kwargs_(dict)：单位持仓模块的其他初始化参数，默认为None
+        @strategy_kwargs_(dict)：单位策略模块的其他初始化参数（如short_、long_），默认为None
+        @return(None)
+        """
+
+        targets = list()
+        if exchange_ is not None:
+            targets.append((exchange_.units, exchange_.unit_factory, exchange_.register, exchange_kwargs_))
+        if portfolio_ is not None:
+            targets.append((portfolio_.holdings, portfolio_.unit_factory, portfolio_.register, portfolio_kwargs_))
+        if strategy_ is not None:
+            targets.append((strategy_.strategies, strategy_.strategy_factory, strategy_.register, strategy_kwargs_))
+
+        for symbol_, kwargs in self.iter_kwargs():
+            kwargs["last_datetime_"] = last_datetime_
+            for units, factory, register, extra in targets:
+                if symbol_ not in units:
+                    if extra:
+                        register(factory(**kwargs, **extra))
+                    else:
+                        register(factory(**kwargs))
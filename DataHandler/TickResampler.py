@@ -0,0 +1,177 @@
+from DataHandler.DataHandler import DataHandler
+from Event.EventQueue import EVENT_QUEUE
+from Event.Event import Event
+from BaseType.Const import CONST
+import Information.Info as Info
+import numpy
+import pandas
+
+# TICK_COLUMN：tick数据文件中各字段默认使用的列名，turnover列缺失时以价格乘以成交数量代替
+TICK_COLUMN = {
+    "symbol": "Symbol",
+    "datetime": "DateTime",
+    "price": "Price",
+    "volume": "Volume",
+    "turnover": "Turnover",
+}
+
+# TICK_CHUNK_SIZE：每次从tick数据文件中读取的行数
+TICK_CHUNK_SIZE = 1000000
+
+
+class TickResampler(DataHandler):
+    """
+    TickResampler(DataHandler)：回测框架中，分块读取tick数据文件（.csv或.parquet），
+    按给定时间周期合并为各标的的Bar事件的输入数据处理模块
+    tick数据文件应当按时间戳顺序排列，不同标的的数据可以交错；
+    每块数据中最后一个时间周期的数据可能在下一块中继续，因此暂存至下一块数据一并合并
+    Bar事件的时间戳为时间周期的起始时间，按时间戳、标的代码的顺序生成
+    """
+
+    __slots__ = ["file", "encoding", "step", "chunk_size", "columns", "datetime_format"]
+
+    def __init__(self, resample_: str = CONST["RESAMPLE"], chunk_size_: int = TICK_CHUNK_SIZE,
+                 columns_: dict = None, datetime_format_: str = None):
+        """
+        @resample_(str)：合并tick的时间周期，默认为CONST["RESAMPLE"]
+        @chunk_size_(int)：每次读取的行数，默认为TICK_CHUNK_SIZE
+        @columns_(dict)：各字段使用的列名，未提供的字段使用TICK_COLUMN中的列名，默认为None
+        @datetime_format_(str)：时间戳列为字符串时的格式，默认为None（由pandas推断）
+        """
+
+        self.file = None
+        self.encoding = CONST["ENCODING"]
+        self.step = pandas.Timedelta(resample_).value
+        self.chunk_size = chunk_size_
+        self.columns = dict(TICK_COLUMN)
+        if columns_ is not None:
+            self.columns.update(columns_)
+        self.datetime_format = datetime_format_
+
+    def load_file(self, file_: str, encoding: str = CONST["ENCODING"]) -> None:
+        """
+        load_file：记录给定的tick数据文件路径和文件编码方式，数据在生成Bar事件时分块读取
+        @file_(str)：给定文件地址，.parquet文件需要安装pyarrow
+        @encoding(str)：给定.csv文件编码方式，默认为CONST["ENCODING"]
+        @return(None)
+        """
+
+        self.file = file_
+        self.encoding = encoding
+
+    def read_chunks(self):
+        """
+        read_chunks：分块读取tick数据文件
+        @return(Generator)：包含每块数据（pandas.DataFrame）的生成器
+        """
+
+        if self.file.endswith((".parquet", ".pq")):
+            import pyarrow.parquet
+            for batch in pyarrow.parquet.ParquetFile(self.file).iter_batches(batch_size=self.chunk_size):
+                yield batch.to_pandas()
+        else:
+            yield from pandas.read_csv(filepath_or_buffer=self.file, encoding=self.encoding,
+                                       chunksize=self.chunk_size)
+
+    def chunk_to_arrays(self, chunk_: pandas.DataFrame) -> dict:
+        """
+        chunk_to_arrays：将一块tick数据整理为各字段的numpy数组
+        @chunk_(pandas.DataFrame)：给定的一块tick数据
+        @return(dict)：字段名称到numpy数组的映射，时间戳为纳秒整数
+        """
+
+        datetime_ = chunk_[self.columns["datetime"]]
+        if not pandas.api.types.is_datetime64_any_dtype(datetime_):
+            datetime_ = pandas.to_datetime(datetime_, format=self.datetime_format)
+
+        price = chunk_[self.columns["price"]].to_numpy(dtype=numpy.float64)
+        volume = chunk_[self.columns["volume"]].to_numpy(dtype=numpy.float64)
+        if self.columns["turnover"] in chunk_.columns:
+            turnover = chunk_[self.columns["turnover"]].to_numpy(dtype=numpy.float64)
+        else:
+            turnover = price * volume
+
+        return {
+            "symbol": chunk_[self.columns["symbol"]].to_numpy(dtype=object),
+            "datetime": datetime_.to_numpy(dtype="datetime64[ns]").view(numpy.int64),
+            "price": price,
+            "volume": volume,
+            "turnover": turnover,
+        }
+
+    def aggregate(self, arrays_: dict):
+        """
+        aggregate：将给定的tick数据按标的代码和时间周期合并为Bar事件
+        同一标的、同一时间周期内的tick保持文件中的先后顺序，首个价格为开盘价，最后一个价格为收盘价
+        @arrays_(dict)：字段名称到numpy数组的映射
+        @return(Generator)：包含Bar事件的生成器，按时间戳、标的代码的顺序排列
+        """
+
+        if len(arrays_["price"]) == 0:
+            return
+
+        bins = arrays_["datetime"] // self.step * self.step
+        codes, symbols = pandas.factorize(arrays_["symbol"], sort=True)
+
+        # 按标的代码、时间周期稳定排序，使得每组tick连续且保持原有的先后顺序
+        order = numpy.lexsort((bins, codes))
+        bins = bins[order]
+        codes = codes[order]
+        price = arrays_["price"][order]
+
+        # 每组tick的起始下标和结束下标
+        change = (codes[1:] != codes[:-1]) | (bins[1:] != bins[:-1])
+        starts = numpy.concatenate(([0], numpy.flatnonzero(change) + 1))
+        ends = numpy.concatenate((starts[1:], [len(price)])) - 1
+
+        group_bins = bins[starts]
+        group_codes = codes[starts]
+        open_ = price[starts]
+        high = numpy.maximum.reduceat(price, starts)
+        low = numpy.minimum.reduceat(price, starts)
+        close = price[ends]
+        volume = numpy.add.reduceat(arrays_["volume"][order], starts)
+        turnover = numpy.add.reduceat(arrays_["turnover"][order], starts)
+
+        # 按时间戳、标的代码的顺序生成Bar事件
+        for i in numpy.lexsort((group_codes, group_bins)):
+            datetime_ = pandas.Timestamp(int(group_bins[i]))
+            yield Event(type_="Bar", datetime_=datetime_,
+                        info_=Info.BarInfo(symbol_=symbols[group_codes[i]], datetime_=datetime_,
+                                           open_=float(open_[i]), high_=float(high[i]),
+                                           low_=float(low[i]), close_=float(close[i]),
+                                           volume_=float(volume[i]), turnover_=float(turnover[i])))
+
+    def bar_iterator(self):
+        """
+        bar_iterator：分块读取tick数据文件，按时间周期合并后依次返回Bar事件
+        每块数据中最后一个时间周期的tick暂存，与下一块数据合并后处理，读取结束后处理剩余的tick
+        @return(Generator)：包含Bar事件的生成器，按时间戳顺序排列
+        """
+
+        carry = None
+        for chunk_ in self.read_chunks():
+            arrays_ = self.chunk_to_arrays(chunk_)
+            if carry is not None:
+                arrays_ = {key: numpy.concatenate((carry[key], value)) for key, value in arrays_.items()}
+            if len(arrays_["price"]) == 0:
+                continue
+
+            # 最后一个时间周期可能在下一块数据中继续，暂存该时间周期的tick
+            bins = arrays_["datetime"] // self.step
+            pending = bins == bins.max()
+            carry = {key: value[pending] for key, value in arrays_.items()}
+            yield from self.aggregate({key: value[~pending] for key, value in arrays_.items()})
+
+        if carry is not None:
+            yield from self.aggregate(carry)
+
+    def publish_bar(self) -> None:
+        """
+        publish_bar：将合并得到的Bar事件全部放入事件队列
+        tick数据文件较大时，建议使用EVENT_QUEUE.run(iter_=...)逐个处理Bar事件
+        @return(None)
+        """
+
+        for bar in self.bar_iterator():
+            EVENT_QUEUE.put(bar)
@@ -11,7 +11,11 @@ EVENT_PRIORITY["DEFAULT"] = -1
 EVENT_PRIORITY["Bar"] = 10
 EVENT_PRIORITY["Price"] = 20
 EVENT_PRIORITY["Cancel"] = 30
+EVENT_PRIORITY["CancelSymbol"] = 30
+EVENT_PRIORITY["CancelAll"] = 30
+EVENT_PRIORITY["Expire"] = 30
 EVENT_PRIORITY["Fill"] = 40
+EVENT_PRIORITY["FillBatch"] = 40
 EVENT_PRIORITY["Order"] = 50
 EVENT_PRIORITY["Signal"] = 60
 EVENT_PRIORITY["Clear"] = 70
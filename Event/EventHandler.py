@@ -138,6 +138,57 @@ class CancelHandler:
         raise NotImplementedError("on_cancel not implemented")
 
 
+class CancelSymbolHandler:
+    """
+    针对处理CancelSymbol事件的接口类
+    """
+
+    __metaclass__ = ABCMeta
+    _name = "CancelSymbolHandler"
+
+    @abstractmethod
+    def on_cancel_symbol(self, event: Event) -> None:
+        """
+        强制要求包含CancelSymbolHandler接口的子类实现on_cancel_symbol方法
+        """
+
+        raise NotImplementedError("on_cancel_symbol not implemented")
+
+
+class CancelAllHandler:
+    """
+    针对处理CancelAll事件的接口类
+    """
+
+    __metaclass__ = ABCMeta
+    _name = "CancelAllHandler"
+
+    @abstractmethod
+    def on_cancel_all(self, event: Event) -> None:
+        """
+        强制要求包含CancelAllHandler接口的子类实现on_cancel_all方法
+        """
+
+        raise NotImplementedError("on_cancel_all not implemented")
+
+
+class ExpireHandler:
+    """
+    针对处理Expire事件的接口类
+    """
+
+    __metaclass__ = ABCMeta
+    _name = "ExpireHandler"
+
+    @abstractmethod
+    def on_expire(self, event: Event) -> None:
+        """
+        强制要求包含ExpireHandler接口的子类实现on_expire方法
+        """
+
+        raise NotImplementedError("on_expire not implemented")
+
+
 class FillHandler:
     """
     针对处理Fill事件的接口类
@@ -153,3 +204,20 @@ class FillHandler:
         """
 
         raise NotImplementedError("on_fill not implemented")
+
+
+class FillBatchHandler:
+    """
+    针对处理FillBatch事件的接口类
+    """
+
+    __metaclass__ = ABCMeta
+    _name = "FillBatchHandler"
+
+    @abstractmethod
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        强制要求包含FillBatchHandler接口的子类实现on_fill_batch方法
+        """
+
+        raise NotImplementedError("on_fill_batch not implemented")
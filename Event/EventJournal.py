@@ -0,0 +1,266 @@
+from Event.Event import Event
+from Event.EventHandler import (PriceHandler, SignalHandler, ClearHandler, ENDHandler)
+from Event.EventQueue import (EVENT_QUEUE, EventQueue)
+from BaseType.Const import CONST
+import Information.Info as Info
+from Information.IdAllocator import ID_ALLOCATOR
+import pandas
+import struct
+
+# JOURNAL_MAGIC：事件日志文件的文件头标识
+JOURNAL_MAGIC = b"BTJ4"
+
+# 事件日志中各类记录的分类标签
+RECORD_STRING = 0
+RECORD_PRICE = 1
+RECORD_SIGNAL = 2
+RECORD_CLEAR = 3
+
+# HEADER_RECORD：文件头标识之后的文件头，记录事件日志中最大的信号ID，在END事件时写入（小端序）
+HEADER_RECORD = struct.Struct("<q")
+
+# 事件日志中各类记录的二进制格式（小端序，不含1字节的分类标签）：
+# STRING_RECORD：字符串长度
+# PRICE_RECORD：时间戳（纳秒）、标的代码编号、现价、上一个价格、成交数量、复权因子
+# SIGNAL_RECORD：时间戳（纳秒）、标的代码编号、交易方向、开平仓标志、交易价格、交易数量、预算交易金额、货币代码编号、信号分类编号、信号ID
+# CLEAR_RECORD：时间戳（纳秒）
+KIND_RECORD = struct.Struct("<B")
+STRING_RECORD = struct.Struct("<H")
+PRICE_RECORD = struct.Struct("<qHdddd")
+SIGNAL_RECORD = struct.Struct("<qHbbdddHHq")
+CLEAR_RECORD = struct.Struct("<q")
+
+# JOURNAL_BUFFER_SIZE：事件日志写入文件前的缓冲区大小：1MB
+JOURNAL_BUFFER_SIZE = 1 << 20
+
+
+class EventJournalWriter(PriceHandler, SignalHandler, ClearHandler, ENDHandler):
+    """
+    EventJournalWriter(PriceHandler, SignalHandler, ClearHandler, ENDHandler)：
+    回测框架中，将Price事件、Signal事件和Clear事件按处理顺序记录为紧凑二进制事件日志的模块
+    可处理事件：Price、Signal、Clear、END
+    由于投资组合（Portfolio）会修改Signal信息，需要在初始化投资组合模块之前初始化当前模块
+    """
+
+    _name = "EventJournalWriter"
+
+    def __init__(self, path_: str = CONST["JOURNAL_PATH"], queue_: EventQueue = EVENT_QUEUE):
+        """
+        @path_(str)：事件日志文件地址，默认为CONST["JOURNAL_PATH"]
+        @queue_(EventQueue)：记录的事件队列，默认为EVENT_QUEUE
+        """
+
+        # 在事件队列中注册事件日志的事件处理方法
+        queue_.register("Price", self.on_price)
+        queue_.register("Signal", self.on_signal)
+        queue_.register("Clear", self.on_clear)
+        queue_.register("END", self.on_end)
+
+        self.file = open(file=path_, mode="wb")
+        self.file.write(JOURNAL_MAGIC)
+        self.file.write(HEADER_RECORD.pack(0))
+        self.buffer = bytearray()
+        self.strings = dict()
+
+        # max_uid：已记录的最大信号ID
+        self.max_uid = 0
+
+    def string_id(self, string_: str) -> int:
+        """
+        string_id：获取给定字符串在事件日志中的编号，首次出现时写入字符串记录
+        @string_(str)：给定的字符串
+        @return(int)：字符串编号
+        """
+
+        if string_ not in self.strings:
+            raw = string_.encode("utf-8")
+            self.append(kind_=RECORD_STRING, record_=STRING_RECORD.pack(len(raw)) + raw)
+            self.strings[string_] = len(self.strings)
+        return self.strings[string_]
+
+    def append(self, kind_: int, record_: bytes) -> None:
+        """
+        append：将一条记录写入缓冲区，缓冲区达到JOURNAL_BUFFER_SIZE时写入事件日志文件
+        @kind_(int)：记录的分类标签
+        @record_(bytes)：不含分类标签的记录
+        @return(None)
+        """
+
+        self.buffer += KIND_RECORD.pack(kind_)
+        self.buffer += record_
+        if len(self.buffer) >= JOURNAL_BUFFER_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        flush：将缓冲区中的记录写入事件日志文件
+        @return(None)
+        """
+
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def on_price(self, event: Event) -> None:
+        """
+        on_price：接收并记录Price事件
+        @event(Event)：接收的Price事件
+        @return(None)
+        """
+
+        if self.file is None:
+            return
+
+        price: Info.PriceInfo = event.info
+        symbol_id = self.string_id(price.symbol)
+        self.append(kind_=RECORD_PRICE,
+                    record_=PRICE_RECORD.pack(event.datetime.value, symbol_id,
+                                              price.crt_price, price.last_price, price.volume, price.adj_factor))
+
+    def on_signal(self, event: Event) -> None:
+        """
+        on_signal：接收并记录Signal事件
+        @event(Event)：接收的Signal事件
+        @return(None)
+        """
+
+        if self.file is None:
+            return
+
+        signal: Info.SignalInfo = event.info
+        symbol_id = self.string_id(signal.symbol)
+        currency_id = self.string_id(signal.currency)
+        signal_type_id = self.string_id(signal.signal_type)
+        self.append(kind_=RECORD_SIGNAL,
+                    record_=SIGNAL_RECORD.pack(event.datetime.value, symbol_id, signal.direction,
+                                               signal.open_or_close, signal.price, signal.volume, signal.amount,
+                                               currency_id, signal_type_id, signal.uid))
+        if signal.uid > self.max_uid:
+            self.max_uid = signal.uid
+
+    def on_clear(self, event: Event) -> None:
+        """
+        on_clear：接收并记录Clear事件
+        @event(Event)：接收的Clear事件
+        @return(None)
+        """
+
+        if self.file is None:
+            return
+
+        self.append(kind_=RECORD_CLEAR, record_=CLEAR_RECORD.pack(event.datetime.value))
+
+    def on_end(self, event: Event) -> None:
+        """
+        on_end：接收END事件，写入剩余记录和文件头中的最大信号ID，并关闭事件日志文件
+        由END事件生成的最后一个Clear事件，在回放时由交易所模块重新生成，因此不作记录
+        @event(Event)：接收的END事件
+        @return(None)
+        """
+
+        if self.file is not None:
+            self.flush()
+            self.file.seek(len(JOURNAL_MAGIC))
+            self.file.write(HEADER_RECORD.pack(self.max_uid))
+            self.file.close()
+            self.file = None
+
+
+class EventJournalReader:
+    """
+    EventJournalReader：回测框架中，读取二进制事件日志并按记录顺序生成事件的模块
+    """
+
+    __slots__ = ["path"]
+
+    def __init__(self, path_: str = CONST["JOURNAL_PATH"]):
+        """
+        @path_(str)：事件日志文件地址，默认为CONST["JOURNAL_PATH"]
+        """
+
+        self.path = path_
+
+    def __iter__(self):
+        """
+        按记录顺序返回事件日志中的Price事件、Signal事件和Clear事件
+        返回第一个事件之前，先在ID_ALLOCATOR中登记文件头记录的最大信号ID，回放时新分配的ID不会与日志中的信号ID重复
+        @return(Generator)：事件的生成器
+        """
+
+        with open(file=self.path, mode="rb") as file:
+            data = file.read()
+
+        if data[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+            raise ValueError("{:s} not valid journal".format(self.path))
+
+        max_uid, = HEADER_RECORD.unpack_from(data, len(JOURNAL_MAGIC))
+        ID_ALLOCATOR.reserve(max_uid)
+
+        strings = list()
+        pos = len(JOURNAL_MAGIC) + HEADER_RECORD.size
+        end = len(data)
+        while pos < end:
+            kind = data[pos]
+            pos += KIND_RECORD.size
+
+            if kind == RECORD_PRICE:
+                datetime_, symbol_id, crt_price, last_price, volume, adj_factor = PRICE_RECORD.unpack_from(data, pos)
+                pos += PRICE_RECORD.size
+                datetime_ = pandas.Timestamp(datetime_)
+                yield Event(type_="Price", datetime_=datetime_,
+                            info_=Info.PriceInfo(symbol_=strings[symbol_id], datetime_=datetime_,
+                                                 crt_price_=crt_price, last_price_=last_price, volume_=volume,
+                                                 adj_factor_=adj_factor))
+
+            elif kind == RECORD_SIGNAL:
+                (datetime_, symbol_id, direction, open_or_close, price, volume, amount,
+                 currency_id, signal_type_id, uid_) = SIGNAL_RECORD.unpack_from(data, pos)
+                pos += SIGNAL_RECORD.size
+                datetime_ = pandas.Timestamp(datetime_)
+                yield Event(type_="Signal", datetime_=datetime_,
+                            info_=Info.SignalInfo(symbol_=strings[symbol_id], datetime_=datetime_,
+                                                  direction_=direction, open_or_close_=open_or_close,
+                                                  price_=price, volume_=volume, amount_=amount,
+                                                  currency_=strings[currency_id],
+                                                  signal_type_=strings[signal_type_id],
+                                                  uid_=uid_))
+
+            elif kind == RECORD_CLEAR:
+                datetime_, = CLEAR_RECORD.unpack_from(data, pos)
+                pos += CLEAR_RECORD.size
+                yield Event(type_="Clear", datetime_=pandas.Timestamp(datetime_))
+
+            elif kind == RECORD_STRING:
+                length, = STRING_RECORD.unpack_from(data, pos)
+                pos += STRING_RECORD.size
+                strings.append(data[pos:pos + length].decode("utf-8"))
+                pos += length
+
+            else:
+                raise ValueError("{:d} not valid record".format(kind))
+
+
+def replay(path_: str = CONST["JOURNAL_PATH"], queue_: EventQueue = EVENT_QUEUE) -> None:
+    """
+    replay：将事件日志中的事件按记录顺序放入事件队列并运行，用于跳过数据读取和交易策略计算，仅回放投资组合和交易所的处理
+    事件队列中应仅注册投资组合（Portfolio）和交易所（Exchange）体系的模块
+    @path_(str)：事件日志文件地址，默认为CONST["JOURNAL_PATH"]
+    @queue_(EventQueue)：运行的事件队列，默认为EVENT_QUEUE
+    @return(None)
+    """
+
+    for event_ in EventJournalReader(path_=path_):
+
+        # Signal事件由交易策略在处理Price事件时生成，应当先于该Price事件引发的其他事件处理
+        # 因此Price事件仅处理自身，随后的Signal事件放入事件队列后与其余事件一并处理
+        if event_.type == "Signal":
+            queue_.put(event_)
+        else:
+            queue_.process_through()
+            queue_.put(event_)
+            if event_.type == "Price":
+                queue_.process_next()
+            else:
+                queue_.process_through()
+
+    # 事件日志处理完后，按照常规方式结束运行
+    queue_.run()
@@ -5,15 +5,13 @@ from collections import defaultdict
 from Event.EventHandler import (DEFAULTHandler, ENDHandler)
 from BaseType.Const import CONST
 from Event.EventLogger import EVENT_LOGGER
+from Logger.LogPolicy import LOG_POLICY
 import time
 
 
 # HANDLER_TYPE(Event -> None)：对于事件处理接口所实现的函数类型的定义
 HANDLER_TYPE = Callable[[Event], None]
 
-# IGNORE_LIST：忽略记录的事件标签
-IGNORE_LIST = {"Price"}
-
 
 class EventQueue(PriorityQueue, DEFAULTHandler, ENDHandler):
     """
@@ -21,7 +19,7 @@ class EventQueue(PriorityQueue, DEFAULTHandler, ENDHandler):
     可处理事件：DEFAULT、END
     """
 
-    __slots__ = ["handlers"]
+    __slots__ = ["handlers", "topics", "trackers"]
     _name = "EVENT_QUEUE"
 
     def __init__(self, default_handler: HANDLER_TYPE = None, end_handler: HANDLER_TYPE = None):
@@ -31,7 +29,13 @@ class EventQueue(PriorityQueue, DEFAULTHandler, ENDHandler):
         """
 
         super().__init__(factory_=Event)
+
+        # handlers：不区分标的代码的事件处理方法，接收给定事件分类标签的所有事件
+        # topics：按照(事件分类标签, 标的代码)订阅的事件处理方法，仅接收给定标的代码的事件
+        # trackers：按照(事件分类标签, 标的代码)登记的标的代码集合，订阅的事件发生时将标的代码加入集合
         self.handlers = defaultdict(list)
+        self.topics = defaultdict(dict)
+        self.trackers = defaultdict(dict)
 
         # 如果未提供自定义DEFAULT事件处理方法，则使用self.on_default方法
         if default_handler is not None:
@@ -45,18 +49,52 @@ class EventQueue(PriorityQueue, DEFAULTHandler, ENDHandler):
         else:
             self.register("END", self.on_end)
 
-    def register(self, event_type_: str, handler_: HANDLER_TYPE) -> None:
+    def register(self, event_type_: str, handler_: HANDLER_TYPE, symbol_: str = None) -> None:
         """
-        register：将给定事件处理方法，加入给定事件分类标签的处理方法列表中
+        register：将给定事件处理方法，加入给定事件分类标签（及给定标的代码）的处理方法列表中
         @event_type_(str)：给定事件分类标签
         @handler_(HANDLER_TYPE)：给定事件处理方法
+        @symbol_(str)：给定标的代码，默认为None，即接收给定事件分类标签的所有事件
         @return(None)
         """
 
-        handler_list = self.handlers[event_type_]
+        if symbol_ is None:
+            handler_list = self.handlers[event_type_]
+        else:
+            handler_list = self.topics[event_type_].setdefault(symbol_, [])
         if handler_ not in handler_list:
             handler_list.append(handler_)
 
+    def unregister(self, event_type_: str, handler_: HANDLER_TYPE, symbol_: str = None) -> None:
+        """
+        unregister：将给定事件处理方法，从给定事件分类标签（及给定标的代码）的处理方法列表中移除
+        @event_type_(str)：给定事件分类标签
+        @handler_(HANDLER_TYPE)：给定事件处理方法
+        @symbol_(str)：给定标的代码，默认为None，即不区分标的代码的处理方法列表
+        @return(None)
+        """
+
+        if symbol_ is None:
+            handler_list = self.handlers.get(event_type_, [])
+        else:
+            handler_list = self.topics.get(event_type_, {}).get(symbol_, [])
+        if handler_ in handler_list:
+            handler_list.remove(handler_)
+
+    def track(self, event_type_: str, symbol_: str, symbols_: set) -> None:
+        """
+        track：登记给定的标的代码集合，当给定事件分类标签、给定标的代码的事件被订阅者处理时，将标的代码加入集合
+        用于各模块在不接收事件的情况下，记录发生变动的标的代码
+        @event_type_(str)：给定事件分类标签
+        @symbol_(str)：给定标的代码
+        @symbols_(set)：给定的标的代码集合
+        @return(None)
+        """
+
+        tracker_list = self.trackers[event_type_].setdefault(symbol_, [])
+        if all(tracker is not symbols_ for tracker in tracker_list):
+            tracker_list.append(symbols_)
+
     def process_next(self) -> None:
         """
         process_next：处理下一事件，根据事件的分类标签，依次应用于标签对应的处理方法列表中的方法
@@ -66,8 +104,8 @@ class EventQueue(PriorityQueue, DEFAULTHandler, ENDHandler):
         # if not self.is_empty():
         next_event: Event = self.get()
 
-        # 如果下一事件的分类不在忽略记录的列表中，则在事件记录模块中记录事件
-        if next_event.type not in IGNORE_LIST:
+        # 如果记录规则允许记录下一事件的分类，则在事件记录模块中记录事件
+        if LOG_POLICY.allow(next_event.type, next_event.datetime):
             EVENT_LOGGER.log(obj=next_event, committer=self._name,
                              datetime_=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()))
 
@@ -76,6 +114,21 @@ class EventQueue(PriorityQueue, DEFAULTHandler, ENDHandler):
         for handler in handler_list:
             handler(next_event)
 
+        # 不区分标的代码的处理方法之后，再由订阅了事件所含标的代码的处理方法依次处理
+        # 订阅列表在前述处理方法之后获取，使得其中新注册的订阅（如新生成的单位模块）同样能处理当前事件
+        topic = self.topics.get(next_event.type)
+        if topic is not None:
+            symbol_ = next_event.info.symbol
+            handler_list = topic.get(symbol_)
+            if handler_list is not None:
+                for handler in handler_list:
+                    handler(next_event)
+
+            tracker_list = self.trackers[next_event.type].get(symbol_)
+            if tracker_list is not None:
+                for tracker in tracker_list:
+                    tracker.add(symbol_)
+
     def process_through(self) -> None:
         """
         process_through：处理事件，直至事件队列为空
@@ -1,11 +1,20 @@
 from BaseType.Subject import Subject
 from Event.Event import Event
-from Event.EventHandler import (BarHandler, PriceHandler, OrderHandler, CancelHandler, ClearHandler, ENDHandler)
+from Event.EventHandler import (BarHandler, PriceHandler, OrderHandler, CancelHandler, CancelSymbolHandler,
+                                CancelAllHandler, ClearHandler, ENDHandler)
 from Event.EventQueue import EVENT_QUEUE
-from Exchange.OrderQueue import OrderQueue
+from Exchange.OrderQueue import (OrderQueue, lot_volume)
+from Exchange.SymbolTable import SymbolTable
+from Information.OrderState import (ORDER_STATE, RESTING, FILLED, CANCELLED)
 from pandas.tseries.offsets import DateOffset
+from pandas import Timedelta
 from BaseType.Const import CONST
 import Information.Info as Info
+from collections import defaultdict
+import numpy
+
+# IMMEDIATE_ORDER：即时有效的委托分类，未能即时成交的部分作废
+IMMEDIATE_ORDER = {"FOK", "IOC"}
 
 
 def day_bar_slicer(bar: Info.BarInfo):
@@ -21,28 +30,35 @@ def day_bar_slicer(bar: Info.BarInfo):
     # 如果开盘价不高于收盘价，则采用开盘价、最低价、最高价、收盘价的顺序
     # 如果开盘价高于收盘价，则采用开盘价、最高价、最低价、收盘价的顺序
     if bar.open <= bar.close:
-        datetime_ += DateOffset(minutes=570)
+        datetime_ += Timedelta(minutes=570)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open))
-        datetime_ += DateOffset(minutes=120)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(minutes=120)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low))
-        datetime_ += DateOffset(minutes=90)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(minutes=90)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high))
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high,
+                                         adj_factor_=bar.adj_factor))
     else:
-        datetime_ += DateOffset(minutes=570)
+        datetime_ += Timedelta(minutes=570)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open))
-        datetime_ += DateOffset(minutes=120)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(minutes=120)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high))
-        datetime_ += DateOffset(minutes=90)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(minutes=90)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low))
-    datetime_ += DateOffset(minutes=120)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low,
+                                         adj_factor_=bar.adj_factor))
+    datetime_ += Timedelta(minutes=120)
     yield Event(type_="Price", datetime_=datetime_,
-                info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.close))
+                info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.close,
+                                     adj_factor_=bar.adj_factor))
 
 
 def minute_bar_slicer(bar: Info.BarInfo):
@@ -58,38 +74,46 @@ def minute_bar_slicer(bar: Info.BarInfo):
     # 如果开盘价不高于收盘价，则采用开盘价、最低价、最高价、收盘价的顺序
     # 如果开盘价高于收盘价，则采用开盘价、最高价、最低价、收盘价的顺序
     if bar.open <= bar.close:
-        datetime_ += DateOffset(seconds=0)
+        datetime_ += Timedelta(seconds=0)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open))
-        datetime_ += DateOffset(seconds=15)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(seconds=15)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low))
-        datetime_ += DateOffset(seconds=15)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(seconds=15)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high))
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high,
+                                         adj_factor_=bar.adj_factor))
     else:
-        datetime_ += DateOffset(seconds=0)
+        datetime_ += Timedelta(seconds=0)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open))
-        datetime_ += DateOffset(seconds=15)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.open,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(seconds=15)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high))
-        datetime_ += DateOffset(seconds=15)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.high,
+                                         adj_factor_=bar.adj_factor))
+        datetime_ += Timedelta(seconds=15)
         yield Event(type_="Price", datetime_=datetime_,
-                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low))
-    datetime_ += DateOffset(seconds=15)
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.low,
+                                         adj_factor_=bar.adj_factor))
+    datetime_ += Timedelta(seconds=15)
     yield Event(type_="Price", datetime_=datetime_,
-                info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.close))
+                info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=bar.close,
+                                     adj_factor_=bar.adj_factor))
 
 
 def order_to_fill(order_: Info.OrderInfo, datetime_,
-                  filled_price_: float = None, volume_: float = None) -> Info.FillInfo:
+                  filled_price_: float = None, volume_: float = None, partial_: bool = False) -> Info.FillInfo:
     """
     order_to_fill：根据给定的交易委托信息（OrderInfo）、成交时间、成交价格、成交数量，生成委托成交信息（FillInfo）
     @order_(Info.OrderInfo)：给定的交易委托信息（OrderInfo）
     @datetime_(pandas.Timestamp)：给定的成交时间
     @filled_price_(float)：给定的成交价格，默认为None
     @volume_(float)：给定的成交数量，默认为None
+    @partial_(bool)：是否部分成交，默认为False
     @return(Info.FillInfo)：生成委托成交信息（FillInfo）
     """
 
@@ -101,20 +125,25 @@ def order_to_fill(order_: Info.OrderInfo, datetime_,
 
     return Info.FillInfo(uid_=order_.uid, symbol_=order_.symbol, datetime_=datetime_,
                          direction_=order_.direction, open_or_close_=order_.open_or_close,
-                         filled_price_=filled_price_, volume_=volume_)
+                         filled_price_=filled_price_, volume_=volume_, partial_=partial_, book_=order_.book)
 
 
-class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, CancelHandler, ClearHandler, ENDHandler):
+class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, CancelHandler, CancelSymbolHandler,
+                         ClearHandler, ENDHandler):
     """
-    PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, CancelHandler, ClearHandler, ENDHandler)：
+    PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, CancelHandler, CancelSymbolHandler,
+    ClearHandler, ENDHandler)：
     回测框架中，交易所（Exchange）体系中使用的以标的为单位的交易模块
-    可处理事件：Bar、Price、Order、Cancel、Clear、END
+    可处理事件：Bar、Price、Order、Cancel、CancelSymbol、Clear、END
     除了常规的通过参数进行初始化的方式外，提供了三种简化的初始化方式：
     分别通过BarInfo、PriceInfo、OrderInfo进行初始化
+    提供了参与率（participation rate）撮合方式：每个Bar内累计成交数量不超过Bar成交数量的给定比例，超出部分部分成交
+    提供了Bar撮合方式：接收Bar事件时直接沿切片价格路径撮合，仅向事件队列放入最后一个（收盘）Price事件
     """
 
     _name = "PseudoExchangeUnit"
-    __slots__ = ["crt_price", "last_price", "last_datetime", "last_bar", "bar_slicer"]
+    __slots__ = ["crt_price", "last_price", "last_datetime", "price_datetime", "last_bar", "bar_slicer",
+                 "participation_rate", "table", "symbol_id", "bar_matching", "bar_close", "book"]
 
     def __init__(self, bar: Info.BarInfo = None, price: Info.PriceInfo = None, order: Info.OrderInfo = None,
                  symbol_: str = CONST["SYMBOL"], exchange_: str = CONST["EXCHANGE"],
@@ -129,7 +158,8 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
                  crt_price_: float = CONST["CRT_PRICE"], net_price_: float = CONST["NET_PRICE"],
                  book_value_: float = CONST["BOOK_VALUE"], volume_: float = CONST["VOLUME"],
                  multiplier_: int = CONST["MULTIPLIER"], margin_rate_: float = CONST["MARGIN_RATE"],
-                 currency_: str = CONST["CURRENCY"], bar_slicer_=minute_bar_slicer):
+                 currency_: str = CONST["CURRENCY"], bar_slicer_=minute_bar_slicer,
+                 participation_rate_: float = None, bar_matching_: bool = False):
         """
         @bar(Info.BarInfo)：用于初始化的Bar信息，默认为None
         @price(Info.PriceInfo)：用于初始化的Price信息，默认为None
@@ -160,10 +190,27 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
         @currency_(str)：货币代码，默认为CONST["CURRENCY"]
 
         @bar_slicer_(BarInfo->Iterable[Event])：Bar信息到Price事件的切片器，默认为minute_bar_slicer
+        @participation_rate_(float)：参与率，每个Bar内累计成交数量占Bar成交数量的上限比例，默认为None（不限制成交数量）
+        @bar_matching_(bool)：是否采用Bar撮合方式，默认为False
         """
 
         self.bar_slicer = bar_slicer_
 
+        # 参与率撮合方式下，可成交数量保存在交易所模块的标的代码表（SymbolTable）中，由交易所模块注册时指定
+        self.participation_rate = participation_rate_
+        self.table = None
+        self.symbol_id = -1
+
+        # Bar撮合方式下，记录已完成撮合、仅需转发给其他模块的收盘价格信息
+        self.bar_matching = bar_matching_
+        self.bar_close = None
+
+        # 所属交易所模块对应的投资组合编号，由交易所模块注册时指定
+        self.book = 0
+
+        # 最近一次更新现价的时间戳，用于判断GFD委托是否已经历委托之后的价格
+        self.price_datetime = None
+
         # 如果提供了Bar信息，则通过Bar信息初始化
         if bar is not None:
             super().__init__(symbol_=bar.symbol, exchange_=bar.symbol[-2:], last_datetime_=bar.datetime,
@@ -229,10 +276,11 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
                 self.bid_queue.put(order)
             else:
                 self.ask_queue.put(order)
+            self.record_state(uid_=order.uid, direction_=order.direction, state_=RESTING)
 
     def cross(self) -> None:
         """
-        cross：当前交易模块进行交易撮合，成交结果作为Fill事件放入事件队列
+        cross：当前交易模块进行交易撮合，成交结果作为Fill事件或FillBatch事件放入事件队列
         @return(None)
         """
 
@@ -240,19 +288,88 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
         if self.crt_price == 0:
             return
 
+        # 参与率撮合方式下，按可成交数量进行撮合
+        if self.is_capped():
+            self.cross_capped()
+            return
+
         # 如果现价（crt_price）低于前一价格（last_price），则对买入委托队列进行撮合
         if self.crt_price < self.last_price:
-            for order_ in self.bid_queue.cross(crt_price_=self.crt_price):
-                self.time_offset()
-                EVENT_QUEUE.put(Event(type_="Fill", datetime_=self.last_datetime,
-                                      info_=order_to_fill(order_=order_, datetime_=self.last_datetime)))
+            self.put_fills(list(self.bid_queue.cross(crt_price_=self.crt_price)))
 
         # 如果现价（crt_price）高于前一价格（last_price），则对卖出委托队列进行撮合
         if self.crt_price > self.last_price:
-            for order_ in self.ask_queue.cross(crt_price_=self.crt_price):
-                self.time_offset()
-                EVENT_QUEUE.put(Event(type_="Fill", datetime_=self.last_datetime,
-                                      info_=order_to_fill(order_=order_, datetime_=self.last_datetime)))
+            self.put_fills(list(self.ask_queue.cross(crt_price_=self.crt_price)))
+
+        self.refresh_best()
+
+    def put_fills(self, fills_: list) -> None:
+        """
+        put_fills：将一次撮合得到的同一交易方向的成交结果放入事件队列
+        仅有一个委托成交时放入Fill事件，多个委托成交时合并为一个FillBatch事件，共用同一个时间戳
+        @fills_(list)：成交委托、成交数量、是否部分成交组成的列表，根据成交顺序排列
+        @return(None)
+        """
+
+        if not fills_:
+            return
+
+        self.time_offset()
+        infos = [order_to_fill(order_=order_, datetime_=self.last_datetime, volume_=volume_, partial_=partial_)
+                 for order_, volume_, partial_ in fills_]
+        for order_, _, partial_ in fills_:
+            if not partial_:
+                self.record_state(uid_=order_.uid, direction_=order_.direction, state_=FILLED)
+        if len(infos) == 1:
+            EVENT_QUEUE.put(Event(type_="Fill", datetime_=self.last_datetime, info_=infos[0]))
+        else:
+            EVENT_QUEUE.put(Event(type_="FillBatch", datetime_=self.last_datetime,
+                                  info_=Info.FillBatchInfo.from_fills(infos)))
+
+    def refresh_best(self) -> None:
+        """
+        refresh_best：将当前买入、卖出委托队列的最优价格写入交易所模块的标的代码表，委托队列为空时分别记为负无穷、正无穷
+        @return(None)
+        """
+
+        if self.table is not None:
+            self.table["best_bid"][self.symbol_id] = self.bid_queue.best_price(default_=-numpy.inf)
+            self.table["best_ask"][self.symbol_id] = self.ask_queue.best_price(default_=numpy.inf)
+
+    def is_crossable(self) -> bool:
+        """
+        is_crossable：根据交易所模块记录的最优委托价格，判断现价是否可能与委托队列成交
+        @return(bool)：是否可能成交，未注册到交易所模块时始终为True
+        """
+
+        if self.table is None:
+            return True
+        return (self.table["best_bid"][self.symbol_id] >= self.crt_price or
+                self.table["best_ask"][self.symbol_id] <= self.crt_price)
+
+    def is_capped(self) -> bool:
+        """
+        is_capped：判断当前交易模块是否采用参与率撮合方式
+        @return(bool)：是否采用参与率撮合方式
+        """
+
+        return self.participation_rate is not None and self.table is not None
+
+    def cross_capped(self) -> None:
+        """
+        cross_capped：当前交易模块按可成交数量进行交易撮合，成交结果作为Fill事件或FillBatch事件放入事件队列
+        部分成交的委托保留在委托队列中，因此每次撮合均对买入、卖出委托队列进行撮合
+        @return(None)
+        """
+
+        capacity = self.table["capacity"]
+        for queue in (self.bid_queue, self.ask_queue):
+            fills, capacity[self.symbol_id] = queue.cross_volume(crt_price_=self.crt_price,
+                                                                 capacity_=float(capacity[self.symbol_id]),
+                                                                 lot_=self.per_hand)
+            self.put_fills(fills)
+
+        self.refresh_best()
 
     def on_bar(self, event: Event) -> None:
         """
@@ -266,9 +383,34 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
         self.last_datetime = bar.datetime
         self.last_bar = bar
 
-        # 使用bar_slicer方法，将Bar事件包含的信息拆分为若干个Price事件并放入事件队列
-        for price in self.bar_slicer(bar):
-            EVENT_QUEUE.put(price)
+        # 使用bar_slicer方法，将Bar事件包含的信息拆分为若干个Price事件
+        prices = list(self.bar_slicer(bar))
+
+        # 参与率撮合方式下，Bar的可成交数量平均分配给各个Price事件，未使用的可成交数量在Bar内累计
+        if self.is_capped() and prices:
+            self.table["tick_capacity"][self.symbol_id] = self.participation_rate * bar.volume / len(prices)
+            self.table["capacity"][self.symbol_id] = 0.0
+
+        # Bar撮合方式下，直接沿价格路径撮合，仅将收盘Price事件放入事件队列，供其他模块更新价格
+        if self.bar_matching and prices:
+            self.match_path(prices)
+            self.bar_close = prices[-1].info
+            EVENT_QUEUE.put(prices[-1])
+
+        # 否则，将Price事件放入事件队列
+        else:
+            for price in prices:
+                EVENT_QUEUE.put(price)
+
+    def match_path(self, prices_: list) -> None:
+        """
+        match_path：沿给定的Price事件序列依次更新价格并撮合，成交时间与逐个处理Price事件时相同
+        @prices_(list)：给定的Price事件序列，以时间戳顺序排列
+        @return(None)
+        """
+
+        for price in prices_:
+            self.update_price(price.info)
 
     def on_price(self, event: Event) -> None:
         """
@@ -277,18 +419,41 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
         @return(None)
         """
 
-        price: Info.PriceInfo = event.info
+        # Bar撮合方式下，收盘Price事件已在撮合路径中处理
+        if event.info is self.bar_close:
+            return
+
+        self.update_price(event.info)
+
+    def update_price(self, price: Info.PriceInfo) -> None:
+        """
+        update_price：根据给定的价格信息更新现价，并进行一次撮合
+        @price(Info.PriceInfo)：给定的价格信息
+        @return(None)
+        """
 
         self.last_datetime = price.datetime
+        self.price_datetime = price.datetime
         self.last_price = self.crt_price
         self.crt_price = price.crt_price
 
-        # 根据Price事件包含的信息更新后，进行一次撮合
-        self.cross()
+        # 参与率撮合方式下，由Bar拆分得到的Price事件增加分配给它的可成交数量，Bar的成交数量已按Price事件平均分配，
+        # 不再计入Price事件自身的成交数量；没有Bar的Price事件流，增加Price事件自身成交数量对应的可成交数量
+        if self.is_capped():
+            if self.last_bar is not None:
+                self.table["capacity"][self.symbol_id] += self.table["tick_capacity"][self.symbol_id]
+            else:
+                self.table["capacity"][self.symbol_id] += self.participation_rate * price.volume
+
+        # 根据Price事件包含的信息更新后，如果现价可能与委托队列成交，则进行一次撮合
+        if self.is_crossable():
+            self.cross()
 
     def on_order(self, event: Event) -> None:
         """
-        on_order：接收并处理Order事件，注意默认设计不区分委托类别，统一按照TBF类型处理
+        on_order：接收并处理Order事件，根据委托分类处理未能即时成交的部分：
+        FOK委托不能即时全部成交时全部作废，IOC委托的未成交部分即时作废，作废的委托通过Expire事件通知投资组合；
+        TBF、GFD委托的未成交部分放入交易委托队列，GFD委托由交易所模块在其首个交易时段的清算时撤回
         @event(Event)：接收的Order事件
         @return(None)
         """
@@ -297,18 +462,104 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
 
         self.last_datetime = order.datetime
 
+        crossable = self.crt_price != 0 and ((order.direction == 1 and order.price >= self.crt_price) or
+                                             (order.direction == -1 and order.price <= self.crt_price))
+
+        # 计算可即时成交的数量：参与率撮合方式下按可成交数量计算，否则全部成交
+        if not crossable:
+            volume_ = 0
+        elif self.is_capped():
+            volume_ = lot_volume(volume_=order.volume, capacity_=float(self.table["capacity"][self.symbol_id]),
+                                 lot_=self.per_hand)
+        else:
+            volume_ = order.volume
+
+        # FOK委托不能即时全部成交时，不进行成交
+        if order.order_type == "FOK" and volume_ < order.volume:
+            volume_ = 0
+
         # 如果Order信息包含的委托可以即时成交，则将成交结果作为Fill事件放入事件队列
-        if self.crt_price != 0 and ((order.direction == 1 and order.price >= self.crt_price) or
-                                    (order.direction == -1 and order.price <= self.crt_price)):
+        if volume_ > 0:
+            if self.is_capped():
+                self.table["capacity"][self.symbol_id] -= volume_
             self.time_offset()
             EVENT_QUEUE.put(Event(type_="Fill", datetime_=self.last_datetime,
-                                  info_=order_to_fill(order_=order, datetime_=self.last_datetime)))
+                                  info_=order_to_fill(order_=order, datetime_=self.last_datetime,
+                                                      volume_=volume_, partial_=volume_ < order.volume)))
+            if volume_ >= order.volume:
+                self.record_state(uid_=order.uid, direction_=order.direction, state_=FILLED)
+                return
+
+        # 未成交数量记录在委托簿中，不修改Order信息
+        remain = order.volume - volume_
+
+        # FOK、IOC委托的未成交部分即时作废
+        if order.order_type in IMMEDIATE_ORDER:
+            self.expire([(order, remain)])
+            return
 
         # 否则，根据交易方向放入对应的交易委托队列，等待撮合
-        elif order.direction == 1:
-            self.bid_queue.put(order)
+        if order.direction == 1:
+            self.bid_queue.put(order, volume_=remain)
+        else:
+            self.ask_queue.put(order, volume_=remain)
+        self.record_state(uid_=order.uid, direction_=order.direction, state_=RESTING)
+
+        self.refresh_best()
+
+    def cancel_order(self, uid_, direction_: int) -> list:
+        """
+        cancel_order：根据给定的委托ID和交易方向，从交易委托队列中撤回对应委托，不更新最优委托价格
+        @uid_(uuid.UUID)：给定的委托ID
+        @direction_(int)：给定的交易方向，买入为1，卖出为-1
+        @return(list)：撤回的委托及其未成交数量组成的列表
+        """
+
+        if direction_ == 1:
+            return self.bid_queue.cancel(uid_)
         else:
-            self.ask_queue.put(order)
+            return self.ask_queue.cancel(uid_)
+
+    def is_resting(self, order_: Info.OrderInfo) -> bool:
+        """
+        is_resting：判断给定的委托是否仍在交易委托队列中
+        @order_(Info.OrderInfo)：给定的委托
+        @return(bool)：是否仍在交易委托队列中
+        """
+
+        if order_.direction == 1:
+            return order_.uid in self.bid_queue
+        else:
+            return order_.uid in self.ask_queue
+
+    def record_state(self, uid_, direction_: int, state_: str) -> None:
+        """
+        record_state：在全局委托状态表（ORDER_STATE）中记录给定委托的状态
+        同一委托ID仍有委托在交易委托队列中时，状态始终记为RESTING
+        @uid_(uuid.UUID)：给定的委托ID
+        @direction_(int)：给定的交易方向，买入为1，卖出为-1
+        @state_(str)：委托移出交易委托队列的原因，FILLED或CANCELLED；委托放入交易委托队列时为RESTING
+        @return(None)
+        """
+
+        queue = self.bid_queue if direction_ == 1 else self.ask_queue
+        ORDER_STATE.set(uid_, self.symbol, direction_, RESTING if uid_ in queue else state_)
+
+    def expire(self, orders_: list) -> None:
+        """
+        expire：将给定的作废委托汇总为一个Expire事件放入事件队列
+        @orders_(list)：给定的作废委托及其未成交数量组成的列表
+        @return(None)
+        """
+
+        if not orders_:
+            return
+
+        info = Info.ExpireInfo(datetime_=self.last_datetime, book_=self.book)
+        for order_, volume_ in orders_:
+            info.add(order_, volume_=volume_)
+            self.record_state(uid_=order_.uid, direction_=order_.direction, state_=CANCELLED)
+        EVENT_QUEUE.put(Event(type_="Expire", datetime_=self.last_datetime, info_=info))
 
     def on_cancel(self, event: Event) -> None:
         """
@@ -321,10 +572,25 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
 
         # 根据Cancel事件中包含的交易委托ID，从交易委托队列中撤回对应委托
         self.last_datetime = cancel.datetime
-        if cancel.direction == 1:
-            self.bid_queue.cancel(cancel.uid)
-        else:
-            self.ask_queue.cancel(cancel.uid)
+        self.cancel_order(uid_=cancel.uid, direction_=cancel.direction)
+        self.refresh_best()
+
+        # 撤回请求方已移除进行中的委托记录，委托不再在交易委托队列中时，不再保留状态记录
+        queue = self.bid_queue if cancel.direction == 1 else self.ask_queue
+        if cancel.uid not in queue:
+            ORDER_STATE.discard(cancel.uid, self.symbol, cancel.direction)
+
+    def on_cancel_symbol(self, event: Event) -> None:
+        """
+        on_cancel_symbol：接收并处理CancelSymbol事件，撤回买入、卖出委托队列中早于事件时间戳的所有委托
+        @event(Event)：接收的CancelSymbol事件
+        @return(None)
+        """
+
+        cancel: Info.CancelSymbolInfo = event.info
+
+        self.last_datetime = cancel.datetime
+        self.cancel_before(cancel.datetime)
 
     def on_clear(self, event: Event) -> None:
         """
@@ -352,52 +618,105 @@ class PseudoExchangeUnit(Subject, BarHandler, PriceHandler, OrderHandler, Cancel
 
         self.bid_queue.clear()
         self.ask_queue.clear()
+        self.refresh_best()
+
+    def cancel_before(self, datetime_) -> None:
+        """
+        cancel_before：撤回当前交易委托队列中委托时间戳早于给定时间戳的所有委托
+        不早于给定时间戳的委托在撤回请求之后发出，但由于Order事件优先于撤回事件处理，可能已经进入委托队列，因此予以保留
+        委托队列中的委托均早于给定时间戳时，委托队列整体替换为空队列，不逐个撤回委托
+        @datetime_(pandas.Timestamp)：给定的时间戳
+        @return(None)
+        """
 
+        self.bid_queue.clear_before(datetime_)
+        self.ask_queue.clear_before(datetime_)
+        self.refresh_best()
 
-class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, ClearHandler, ENDHandler):
+
+class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, CancelSymbolHandler, CancelAllHandler,
+                    ClearHandler, ENDHandler):
     """
-    ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, ClearHandler, ENDHandler)：
+    ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, CancelSymbolHandler, CancelAllHandler,
+    ClearHandler, ENDHandler)：
     回测框架中，交易所（Exchange）体系中使用的以交易所为单位的交易模块
-    可处理事件：Bar、Price、Order、Cancel、Clear、END
+    可处理事件：Bar、Price、Order、Cancel、CancelSymbol、CancelAll、Clear、END
     如果有继承PseudoExchangeUnit类的自定义单位交易模块，初始化时需要提交单位交易模块的初始化方法
     """
 
     _name = "ExchangeUnion"
 
-    def __init__(self, factory_=PseudoExchangeUnit):
+    def __init__(self, factory_=PseudoExchangeUnit, participation_rate_: float = None, bar_matching_: bool = False,
+                 book_: int = 0):
         """
         @factory_(单位交易模块初始化方法)：继承PseudoExchangeUnit类的自定义单位交易模块，默认为PseudoExchangeUnit
+        @participation_rate_(float)：所有单位交易模块采用的参与率，默认为None（沿用单位交易模块自身的设置）
+        @bar_matching_(bool)：所有单位交易模块是否采用Bar撮合方式，默认为False（沿用单位交易模块自身的设置）
+        @book_(int)：对应的投资组合编号，默认为0
+        多个投资组合共用同一数据、策略事件流时，每个投资组合对应一个交易所模块，仅处理相同编号的Order、Cancel类事件：
+        编号为0的交易所模块负责将Bar事件切片为Price事件并发出Clear事件，其他交易所模块不接收Bar事件，直接根据共用的Price事件撮合
         """
 
         # 在EVENT_QUEUE中注册交易所（Exchange）体系中的事件处理方法
-        EVENT_QUEUE.register("Bar", self.on_bar)
+        self.book = book_
+        if self.book == 0:
+            EVENT_QUEUE.register("Bar", self.on_bar)
         EVENT_QUEUE.register("Price", self.on_price)
         EVENT_QUEUE.register("Order", self.on_order)
         EVENT_QUEUE.register("Cancel", self.on_cancel)
+        EVENT_QUEUE.register("CancelSymbol", self.on_cancel_symbol)
+        EVENT_QUEUE.register("CancelAll", self.on_cancel_all)
         EVENT_QUEUE.register("Clear", self.on_clear)
         EVENT_QUEUE.register("END", self.on_end)
 
         self.units = dict()
-        self.handlers = dict()
         self.last_datetime = CONST["START_TIME"]
 
+        # 当前交易日内发生变动（接收过Price、Order、Cancel事件）的标的代码，Clear事件仅交给这些标的代码对应的单位交易模块处理
+        # 集合的迭代顺序随字符串哈希变化，处理Clear事件时按标的代码排序，使得各次运行的处理顺序相同
+        self.dirty_symbols = set()
+
+        # 到期委托索引：按交易时段编号（已处理的Clear事件数量）记录仍在交易委托队列中的GFD委托
+        # （标的代码、委托ID、交易方向、委托时间戳），在该交易时段的Clear事件中整体撤回
+        # 委托之后标的尚无价格（如日线数据在收盘价之后发出的委托）时，委托的首个交易时段为下一交易时段，顺延至下一Clear事件
+        self.session = 0
+        self.expiry = defaultdict(list)
+
         self.unit_factory = factory_
 
+        # 标的代码表：为单位交易模块分配编号，并以数组形式保存各标的的可成交数量（capacity）和每个Price事件分配的可成交数量（tick_capacity）
+        self.participation_rate = participation_rate_
+        self.bar_matching = bar_matching_
+        self.table = SymbolTable()
+        self.table.add_array("capacity")
+        self.table.add_array("tick_capacity")
+
+        # 各标的买入、卖出委托队列的最优价格，委托队列为空时分别为负无穷、正无穷
+        # 事件逐个处理，每个Price事件由对应的单位交易模块读取本标的的最优价格，判断现价是否可能成交（见is_crossable）
+        self.table.add_array("best_bid", -numpy.inf)
+        self.table.add_array("best_ask", numpy.inf)
+
     def register(self, unit: PseudoExchangeUnit):
         """
         register：当前的交易所模块中，注册给定的单位交易模块
+        单位交易模块直接在EVENT_QUEUE中订阅其标的代码（symbol）的Bar事件和Price事件
         @unit(PseudoExchangeUnit)：给定的单位交易模块
         @return(None)
         """
 
         if unit.symbol not in self.units:
             self.units[unit.symbol] = unit
-            self.handlers[(unit.symbol, "Bar")] = unit.on_bar
-            self.handlers[(unit.symbol, "Price")] = unit.on_price
-            self.handlers[(unit.symbol, "Order")] = unit.on_order
-            self.handlers[(unit.symbol, "Cancel")] = unit.on_cancel
-            self.handlers[(unit.symbol, "Clear")] = unit.on_clear
-            self.handlers[(unit.symbol, "END")] = unit.on_end
+            unit.table = self.table
+            unit.symbol_id = self.table.add(unit.symbol)
+            unit.book = self.book
+            if self.participation_rate is not None:
+                unit.participation_rate = self.participation_rate
+            if self.bar_matching:
+                unit.bar_matching = True
+            unit.refresh_best()
+            if self.book == 0:
+                EVENT_QUEUE.register("Bar", unit.on_bar, symbol_=unit.symbol)
+            EVENT_QUEUE.register("Price", unit.on_price, symbol_=unit.symbol)
 
     def on_bar(self, event: Event) -> None:
         """
@@ -418,8 +737,7 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
             EVENT_QUEUE.put(Event(type_="Clear", datetime_=self.last_datetime))
         self.last_datetime = bar.datetime
 
-        # 将Bar事件交给标的代码（symbol）对应的单位交易模块处理
-        self.handlers[(bar.symbol, "Bar")](event)
+        # Bar事件随后由标的代码（symbol）对应的单位交易模块通过订阅直接处理
 
     def on_price(self, event: Event) -> None:
         """
@@ -435,9 +753,9 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
         # 如果标的代码（symbol）未注册，则通过事件中的PriceInfo生成单位交易模块并注册
         if price.symbol not in self.units:
             self.register(self.unit_factory(price=price))
+        self.dirty_symbols.add(price.symbol)
 
-        # 将Price事件交给标的代码（symbol）对应的单位交易模块处理
-        self.handlers[(price.symbol, "Price")](event)
+        # Price事件随后由标的代码（symbol）对应的单位交易模块通过订阅直接处理
 
     def on_order(self, event: Event) -> None:
         """
@@ -448,15 +766,30 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
 
         order: Info.OrderInfo = event.info
 
+        # 不处理其他投资组合的Order事件
+        if order.book != self.book:
+            return
+
         self.last_datetime = order.datetime
+        self.dirty_symbols.add(order.symbol)
 
         # 如果标的代码（symbol）未注册，则通过事件中的OrderInfo生成单位交易模块并注册，同时处理OrderInfo中包含的交易委托
+        # 新生成的单位交易模块没有现价数据，FOK、IOC委托无法即时成交，直接作废
         if order.symbol not in self.units:
-            self.register(self.unit_factory(order=order))
+            unit = self.unit_factory(order=order)
+            self.register(unit)
+            if order.order_type in IMMEDIATE_ORDER:
+                unit.expire(unit.cancel_order(uid_=order.uid, direction_=order.direction))
+                unit.refresh_best()
 
         # 否则，将Order事件交给标的代码（symbol）对应的单位交易模块处理
         else:
-            self.handlers[(order.symbol, "Order")](event)
+            unit = self.units[order.symbol]
+            unit.on_order(event)
+
+        # 仍在交易委托队列中的GFD委托，登记到当前交易时段的到期委托索引
+        if order.order_type == "GFD" and unit.is_resting(order):
+            self.expiry[self.session].append((order.symbol, order.uid, order.direction, order.datetime))
 
     def on_cancel(self, event: Event) -> None:
         """
@@ -467,11 +800,56 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
 
         cancel: Info.CancelInfo = event.info
 
+        # 不处理其他投资组合的Cancel事件
+        if cancel.book != self.book:
+            return
+
         self.last_datetime = cancel.datetime
 
         # 如果标的代码（symbol）已注册，将Cancel事件交给标的代码（symbol）对应的单位交易模块处理
-        if cancel.symbol in self.units:
-            self.handlers[(cancel.symbol, "Cancel")](event)
+        unit = self.units.get(cancel.symbol)
+        if unit is not None:
+            self.dirty_symbols.add(cancel.symbol)
+            unit.on_cancel(event)
+
+    def on_cancel_symbol(self, event: Event) -> None:
+        """
+        on_cancel_symbol：接收并处理CancelSymbol事件
+        @event(Event)：接收的CancelSymbol事件
+        @return(None)
+        """
+
+        cancel: Info.CancelSymbolInfo = event.info
+
+        # 不处理其他投资组合的CancelSymbol事件
+        if cancel.book != self.book:
+            return
+
+        self.last_datetime = cancel.datetime
+
+        # 如果标的代码（symbol）已注册，将CancelSymbol事件交给标的代码（symbol）对应的单位交易模块处理
+        unit = self.units.get(cancel.symbol)
+        if unit is not None:
+            self.dirty_symbols.add(cancel.symbol)
+            unit.on_cancel_symbol(event)
+
+    def on_cancel_all(self, event: Event) -> None:
+        """
+        on_cancel_all：接收并处理CancelAll事件，撤回所有单位交易模块中早于事件时间戳的所有委托
+        已撤回的GFD委托仍保留在到期委托索引中，在Clear事件中撤回时不再产生作用
+        @event(Event)：接收的CancelAll事件
+        @return(None)
+        """
+
+        cancel: Info.CancelAllInfo = event.info
+
+        # 不处理其他投资组合的CancelAll事件
+        if cancel.book != self.book:
+            return
+
+        self.last_datetime = cancel.datetime
+        for unit in self.units.values():
+            unit.cancel_before(cancel.datetime)
 
     def on_clear(self, event: Event) -> None:
         """
@@ -480,9 +858,45 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
         @return(None)
         """
 
-        # 将Clear事件交给已注册的所有单位交易模块处理
-        for symbol in self.units.keys():
-            self.handlers[(symbol, "Clear")](event)
+        # 将Clear事件按标的代码顺序交给当前交易日内发生变动的单位交易模块处理
+        for symbol in sorted(self.dirty_symbols):
+            self.units[symbol].on_clear(event)
+        self.dirty_symbols.clear()
+
+        self.expire_orders(event.datetime)
+
+    def expire_orders(self, datetime_) -> None:
+        """
+        expire_orders：撤回当前交易时段登记的GFD委托，汇总为一个Expire事件放入事件队列，并进入下一交易时段
+        委托之后标的尚未更新现价的GFD委托未经历任何价格，顺延至下一交易时段；已成交或已撤回的委托直接移出索引
+        @datetime_(pandas.Timestamp)：给定的时间戳（Clear事件的时间戳）
+        @return(None)
+        """
+
+        entries = self.expiry.pop(self.session, None)
+        self.session += 1
+        if not entries:
+            return
+
+        info = Info.ExpireInfo(datetime_=datetime_, book_=self.book)
+        units = set()
+        for symbol_, uid_, direction_, order_datetime_ in entries:
+            unit = self.units[symbol_]
+            if uid_ not in (unit.bid_queue if direction_ == 1 else unit.ask_queue):
+                continue
+            if unit.price_datetime is None or unit.price_datetime <= order_datetime_:
+                self.expiry[self.session].append((symbol_, uid_, direction_, order_datetime_))
+                continue
+            for order_, volume_ in unit.cancel_order(uid_=uid_, direction_=direction_):
+                info.add(order_, volume_=volume_)
+            unit.record_state(uid_=uid_, direction_=direction_, state_=CANCELLED)
+            units.add(unit)
+
+        for unit in units:
+            unit.refresh_best()
+
+        if len(info) > 0:
+            EVENT_QUEUE.put(Event(type_="Expire", datetime_=datetime_, info_=info))
 
     def on_end(self, event: Event) -> None:
         """
@@ -491,7 +905,9 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
         @return(None)
         """
 
-        # 向事件队列放入当前易日的Clear事件
+        # 向事件队列放入当前易日的Clear事件，仅由编号为0的交易所模块发出
+        if self.book != 0:
+            return
         self.last_datetime += DateOffset(minutes=60)
         EVENT_QUEUE.put(Event(type_="Clear", datetime_=self.last_datetime))
 
@@ -503,3 +919,4 @@ class ExchangeUnion(BarHandler, PriceHandler, OrderHandler, CancelHandler, Clear
 
         for unit in self.units.values():
             unit.cancel_all()
+        self.expiry.clear()
@@ -1,14 +1,51 @@
-import uuid
-from BaseType.PriorityQueue import PriorityQueue
+import bisect
+from collections import deque
 from Information.Info import OrderInfo
 
 
-class OrderQueue(PriorityQueue):
+def lot_volume(volume_: float, capacity_: float, lot_: int = 1) -> float:
     """
-    OrderQueue(PriorityQueue)：交易所（Exchange）进行委托撮合时使用的委托优先队列
+    lot_volume：根据给定的委托数量、可成交数量和每手数量，计算本次可成交的数量
+    委托数量不超过可成交数量时全部成交，否则按每手数量向下取整成交
+    @volume_(float)：给定的委托数量
+    @capacity_(float)：给定的可成交数量
+    @lot_(int)：给定的每手数量，默认为1
+    @return(float)：本次可成交的数量
     """
 
-    __slots__ = ["symbol", "direction"]
+    if volume_ <= capacity_:
+        return volume_
+    return max(int(capacity_ / lot_), 0) * lot_
+
+
+class BookEntry(object):
+    """
+    BookEntry(object)：委托簿中的一条委托记录，记录委托及其未成交数量
+    部分成交时仅扣减记录中的未成交数量，不修改委托信息（OrderInfo），Order事件及其记录保留委托时的数量
+    """
+
+    __slots__ = ["order", "volume"]
+
+    def __init__(self, order_: OrderInfo, volume_: float):
+        """
+        @order_(OrderInfo)：委托信息
+        @volume_(float)：未成交数量
+        """
+
+        self.order = order_
+        self.volume = volume_
+
+
+class OrderQueue(object):
+    """
+    OrderQueue(object)：交易所（Exchange）进行委托撮合时使用的价格档位委托簿
+    每个不同的委托价格为一个档位，档位按优先级升序保存在有序列表中，末尾为最优档位；
+    每个档位以先进先出队列保存委托记录（时间优先），并记录档位的未成交总数量
+    买入方向的档位键为委托价格，卖出方向为其相反数，因此两个方向均以最大的档位键为最优档位；
+    档位键不按报价单位取整，不在报价单位上的委托价格仍按其原价格撮合，并保持价格优先
+    """
+
+    __slots__ = ["symbol", "direction", "keys", "levels", "volumes", "index", "count", "latest"]
 
     def __init__(self, symbol_: str, direction_: str):
         """
@@ -16,51 +53,283 @@ class OrderQueue(PriorityQueue):
         @direction_(str)：交易方向，买入/卖出
         """
 
-        super().__init__(factory_=OrderInfo)
         self.symbol = symbol_
         self.direction = 1 if direction_ == "买入" else -1
 
-    def put(self, o: OrderInfo) -> None:
+        # keys：按优先级升序排列的档位键；levels：档位键到委托记录队列的映射；volumes：档位键到未成交总数量的映射
+        # index：委托ID到其所在档位键列表的映射；count：委托簿中的委托数量；latest：委托簿中最晚的委托时间戳
+        self.keys = list()
+        self.levels = dict()
+        self.volumes = dict()
+        self.index = dict()
+        self.count = 0
+        self.latest = None
+
+    def to_key(self, price_: float) -> float:
+        """
+        to_key：将给定的委托价格换算为档位键
+        @price_(float)：给定的委托价格
+        @return(float)：档位键
+        """
+
+        return price_ * self.direction
+
+    def to_price(self, key_: float) -> float:
+        """
+        to_price：将给定的档位键换算为档位价格
+        @key_(float)：给定的档位键
+        @return(float)：档位价格
+        """
+
+        return key_ * self.direction
+
+    def cross_key(self, crt_price_: float) -> float:
+        """
+        cross_key：根据给定的现价，计算可以成交的最小档位键，档位键不小于该值的档位均可成交
+        买入委托价格不低于现价时成交，卖出委托价格不高于现价时成交，与委托价格直接比较
+        @crt_price_(float)：给定的现价
+        @return(float)：可以成交的最小档位键
+        """
+
+        return crt_price_ * self.direction
+
+    def is_empty(self) -> bool:
+        """
+        is_empty：判断委托簿当前是否为空
+        @return(bool)：委托簿是否为空
+        """
+
+        return not self.keys
+
+    def clear(self) -> None:
+        """
+        clear：清空当前的委托簿
+        @return(None)
+        """
+
+        self.keys = list()
+        self.levels = dict()
+        self.volumes = dict()
+        self.index = dict()
+        self.count = 0
+        self.latest = None
+
+    def clear_before(self, datetime_) -> None:
+        """
+        clear_before：撤回委托时间戳早于给定时间戳的所有委托
+        委托簿中的委托均早于给定时间戳时整体清空，否则仅保留不早于给定时间戳的委托
+        @datetime_(pandas.Timestamp)：给定的时间戳
+        @return(None)
+        """
+
+        if self.latest is None or self.latest < datetime_:
+            self.clear()
+            return
+
+        # 按档位优先级升序、档位内先后顺序重新放入保留的委托及其未成交数量，保持原有的优先级
+        remain = [entry for key in self.keys for entry in self.levels[key] if entry.order.datetime >= datetime_]
+        self.clear()
+        for entry in remain:
+            self.put(entry.order, volume_=entry.volume)
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, uid_: int) -> bool:
+        return uid_ in self.index
+
+    def first(self) -> OrderInfo:
+        """
+        first：查询委托簿当前优先级最高的委托，委托簿为空时报错
+        @return(OrderInfo)：委托簿当前优先级最高的委托
+        """
+
+        if self.keys:
+            return self.levels[self.keys[-1]][0].order
+        else:
+            raise RuntimeError("Empty Queue")
+
+    def put(self, o: OrderInfo, volume_: float = None) -> None:
+        """
+        put：将给定委托放入委托簿对应档位的队尾
+        @o(OrderInfo)：给定的委托
+        @volume_(float)：委托的未成交数量，默认为None（委托数量）
+        @return(None)
+        """
 
         # 仅当委托标的代码、交易方向均与委托队列一致时，才将委托放入撮合队列
-        if o.symbol == self.symbol and o.direction == self.direction:
-            super().put(o)
+        if not isinstance(o, OrderInfo) or o.symbol != self.symbol or o.direction != self.direction:
+            return
+
+        key = self.to_key(o.price)
+        level = self.levels.get(key)
+        if level is None:
+            bisect.insort(self.keys, key)
+            level = self.levels[key] = deque()
+            self.volumes[key] = 0.0
+        if volume_ is None:
+            volume_ = o.volume
+        level.append(BookEntry(order_=o, volume_=volume_))
+        self.volumes[key] += volume_
+        self.index.setdefault(o.uid, []).append(key)
+        self.count += 1
+        if self.latest is None or o.datetime > self.latest:
+            self.latest = o.datetime
 
-    def cancel(self, uid_: uuid.UUID) -> None:
+    def remove_level(self, key_: float) -> deque:
         """
-        cancel：根据给定的委托ID撤销对应委托
-        @uid_(uuid.UUID)：委托ID
+        remove_level：从委托簿中整体移除给定档位，并清除档位中委托的ID索引
+        @key_(float)：给定的档位键
+        @return(deque)：移除档位的委托记录队列
+        """
+
+        # 最优档位直接从有序列表末尾移除
+        if self.keys[-1] == key_:
+            self.keys.pop()
+        else:
+            self.keys.remove(key_)
+        level = self.levels.pop(key_)
+        del self.volumes[key_]
+        self.count -= len(level)
+        for entry in level:
+            self.unindex(entry.order.uid, key_)
+        return level
+
+    def unindex(self, uid_: int, key_: float) -> None:
+        """
+        unindex：清除给定委托ID在给定档位的一条索引
+        @uid_(int)：给定的委托ID
+        @key_(float)：给定的档位键
         @return(None)
         """
 
-        i = 0
-        while i <= self.max_index:
-            if self.heap[i].uid == uid_:
-                self.pop(i)
+        keys = self.index.get(uid_)
+        if keys is not None:
+            keys.remove(key_)
+            if not keys:
+                del self.index[uid_]
+
+    def cancel(self, uid_: int) -> list:
+        """
+        cancel：根据给定的委托ID撤销对应委托
+        @uid_(int)：委托ID
+        @return(list)：撤销的委托及其未成交数量组成的列表
+        """
+
+        removed = list()
+        keys = self.index.pop(uid_, None)
+        if keys is None:
+            return removed
+
+        for key in set(keys):
+            level = self.levels[key]
+            remain = deque(entry for entry in level if entry.order.uid != uid_)
+            removed.extend((entry.order, entry.volume) for entry in level if entry.order.uid == uid_)
+            self.count -= len(level) - len(remain)
+            if remain:
+                self.levels[key] = remain
+                self.volumes[key] = sum(entry.volume for entry in remain)
             else:
-                i += 1
+                self.keys.remove(key)
+                del self.levels[key]
+                del self.volumes[key]
+
+        return removed
+
+    def best_price(self, default_: float = None) -> float:
+        """
+        best_price：查询委托簿最优档位的价格
+        @default_(float)：委托簿为空时返回的价格，默认为None
+        @return(float)：最优档位的价格
+        """
+
+        if self.keys:
+            return self.to_price(self.keys[-1])
+        return default_
+
+    def depth(self, n_: int = 5) -> list:
+        """
+        depth：查询委托簿优先级最高的若干个档位
+        @n_(int)：查询的档位数量，默认为5
+        @return(list)：档位价格、档位未成交总数量、档位委托数量组成的列表，按优先级降序排列
+        """
+
+        return [(self.to_price(key), self.volumes[key], len(self.levels[key]))
+                for key in reversed(self.keys[-n_:])]
+
+    def level_volume(self, price_: float) -> float:
+        """
+        level_volume：查询给定价格所在档位的未成交总数量
+        @price_(float)：给定的价格
+        @return(float)：档位未成交总数量，档位不存在时为0.0
+        """
+
+        return self.volumes.get(self.to_key(price_), 0.0)
 
     def __repr__(self):
-        if self.max_index < 0:
+        if not self.keys:
             return "Empty Queue"
         else:
             return (
                 "Symbol: {:s}, Direction: {:s}: \n"
                 "{:s}"
             ).format(self.symbol, "买入" if self.direction == 1 else "卖出",
-                     "\n".join(str(self.heap[i]) for i in range(self.max_index + 1)))
+                     "\n".join(str(entry.order) for key in reversed(self.keys) for entry in self.levels[key]))
 
     def cross(self, crt_price_: float):
         """
-        cross：根据给定的现价进行交易撮合
+        cross：根据给定的现价进行交易撮合，可成交的档位整体从委托簿中移除
         @crt_price_(float)：现价
-        @return(Generator)：包含成交委托的生成器，根据成交顺序排列
+        @return(Generator)：包含成交委托、成交数量（未成交数量）、是否部分成交（始终为False）的生成器，根据成交顺序排列
         """
 
         # 仅根据现价与委托价格判断是否成交，暂不考虑委托数量与当前盘口的关系
-        if self.direction == 1:
-            while not self.is_empty() and self.heap[0].price >= crt_price_:
-                yield self.pop()
-        else:
-            while not self.is_empty() and self.heap[0].price <= crt_price_:
-                yield self.pop()
+        min_key = self.cross_key(crt_price_)
+        while self.keys and self.keys[-1] >= min_key:
+            for entry in self.remove_level(self.keys[-1]):
+                yield entry.order, entry.volume, False
+
+    def cross_volume(self, crt_price_: float, capacity_: float, lot_: int = 1):
+        """
+        cross_volume：根据给定的现价和可成交数量进行交易撮合，可成交数量不足时对档位内的委托依次成交，最后一个委托部分成交
+        部分成交的委托扣减委托记录中的未成交数量后保留在档位队首，优先级不变
+        @crt_price_(float)：现价
+        @capacity_(float)：可成交数量
+        @lot_(int)：每手数量，默认为1
+        @return(list, float)：成交委托、成交数量、是否部分成交组成的列表（根据成交顺序排列），以及剩余的可成交数量
+        """
+
+        fills = list()
+        min_key = self.cross_key(crt_price_)
+        while self.keys and self.keys[-1] >= min_key:
+            key = self.keys[-1]
+
+            # 可成交数量足以成交整个档位时，整体移除档位
+            if self.volumes[key] <= capacity_:
+                capacity_ -= self.volumes[key]
+                fills.extend((entry.order, entry.volume, False) for entry in self.remove_level(key))
+                continue
+
+            # 否则依次成交档位内的委托，直至可成交数量不足
+            level = self.levels[key]
+            while level:
+                entry = level[0]
+                volume_ = lot_volume(volume_=entry.volume, capacity_=capacity_, lot_=lot_)
+                if volume_ <= 0:
+                    break
+
+                capacity_ -= volume_
+                self.volumes[key] -= volume_
+                if volume_ < entry.volume:
+                    entry.volume -= volume_
+                    fills.append((entry.order, volume_, True))
+                    break
+                level.popleft()
+                self.count -= 1
+                self.unindex(entry.order.uid, key)
+                fills.append((entry.order, volume_, False))
+            if not level:
+                self.remove_level(key)
+            break
+
+        return fills, capacity_
@@ -0,0 +1,61 @@
+import numpy
+
+
+class SymbolTable(object):
+    """
+    SymbolTable(object)：交易所（Exchange）体系中，为标的代码分配连续编号，并按编号保存各标的数值状态数组的模块
+    各单位交易模块通过编号读写数组中对应的元素，交易所模块可以对数组进行整体的向量化计算
+    """
+
+    __slots__ = ["index", "symbols", "size", "arrays", "defaults"]
+
+    def __init__(self, size_: int = 16):
+        """
+        @size_(int)：数组的初始容量，默认为16
+        """
+
+        self.index = dict()
+        self.symbols = list()
+        self.size = size_
+        self.arrays = dict()
+        self.defaults = dict()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        return self.arrays[name]
+
+    def add_array(self, name: str, default: float = 0.0) -> numpy.ndarray:
+        """
+        add_array：新增一个按标的代码编号保存的数组，已存在时直接返回
+        @name(str)：数组名称
+        @default(float)：数组元素的默认值，默认为0.0
+        @return(numpy.ndarray)：新增的数组
+        """
+
+        if name not in self.arrays:
+            self.arrays[name] = numpy.full(self.size, default, dtype=numpy.float64)
+            self.defaults[name] = default
+        return self.arrays[name]
+
+    def add(self, symbol_: str) -> int:
+        """
+        add：为给定的标的代码分配编号，已分配时直接返回编号，容量不足时所有数组的容量增加一倍
+        @symbol_(str)：给定的标的代码
+        @return(int)：标的代码的编号
+        """
+
+        if symbol_ in self.index:
+            return self.index[symbol_]
+
+        i = len(self.symbols)
+        if i >= self.size:
+            for name, array in self.arrays.items():
+                self.arrays[name] = numpy.concatenate(
+                    [array, numpy.full(self.size, self.defaults[name], dtype=numpy.float64)])
+            self.size *= 2
+
+        self.index[symbol_] = i
+        self.symbols.append(symbol_)
+        return i
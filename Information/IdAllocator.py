@@ -0,0 +1,59 @@
+import uuid
+
+
+class IdAllocator(object):
+    """
+    IdAllocator(object)：回测框架中，为信号（Signal）、委托（Order）分配ID的单调递增整数ID分配器
+    成交（Fill）、撤回（Cancel）沿用对应委托的ID；需要对外导出时，可以将整数ID转换为确定的uuid.UUID
+    """
+
+    __slots__ = ["last"]
+
+    def __init__(self, start_: int = 0):
+        """
+        @start_(int)：起始值，分配的第一个ID为start_ + 1，默认为0
+        """
+
+        self.last = start_
+
+    def next(self) -> int:
+        """
+        next：分配一个新的ID
+        @return(int)：新的ID
+        """
+
+        self.last += 1
+        return self.last
+
+    def reserve(self, uid_: int) -> None:
+        """
+        reserve：登记一个由外部提供的ID（如从事件日志中读取的信号ID），此后分配的ID均大于该ID
+        @uid_(int)：给定的ID
+        @return(None)
+        """
+
+        if uid_ > self.last:
+            self.last = uid_
+
+    def reset(self, start_: int = 0) -> None:
+        """
+        reset：重置分配器，用于在同一进程中开始新的回测
+        @start_(int)：起始值，默认为0
+        @return(None)
+        """
+
+        self.last = start_
+
+    @staticmethod
+    def to_uuid(uid_: int) -> uuid.UUID:
+        """
+        to_uuid：将给定的整数ID转换为uuid.UUID，用于对外导出
+        @uid_(int)：给定的整数ID
+        @return(uuid.UUID)：对应的uuid.UUID
+        """
+
+        return uuid.UUID(int=uid_)
+
+
+# ID_ALLOCATOR：回测框架使用的全局ID分配器
+ID_ALLOCATOR = IdAllocator()
@@ -1,6 +1,8 @@
 from abc import (ABCMeta, abstractmethod)
 import uuid
 from collections import defaultdict
+from Information.IdAllocator import ID_ALLOCATOR
+import numpy
 
 
 class Info:
@@ -35,13 +37,15 @@ class NullInfo(Info):
 class BarInfo(Info):
     """
     Bar信息，用于Bar事件中传递以“标的在一定时间段内的报价成交数据”为单位的市场信息
+    价格为复权价格时，adj_factor为复权因子，原始价格为价格除以复权因子（见to_raw_price）
     """
 
     type = "Bar"
-    __slots__ = ["symbol", "datetime", "open", "high", "low", "close", "volume", "turnover"]
+    __slots__ = ["symbol", "datetime", "open", "high", "low", "close", "volume", "turnover", "adj_factor"]
 
     def __init__(self, symbol_: str, datetime_,
-                 open_: float, high_: float, low_: float, close_: float, volume_: float, turnover_: float):
+                 open_: float, high_: float, low_: float, close_: float, volume_: float, turnover_: float,
+                 adj_factor_: float = 1.0):
         """
         @symbol_(str)：标的代码
         @datetime_(pandas.Timestamp)：信息时间戳
@@ -53,6 +57,8 @@ class BarInfo(Info):
 
         @volume_(float)：成交数量
         @turnover_(float)：成交金额
+
+        @adj_factor_(float)：复权因子，默认为1.0（未复权）
         """
 
         self.symbol = symbol_
@@ -63,6 +69,16 @@ class BarInfo(Info):
         self.close = close_
         self.volume = volume_
         self.turnover = turnover_
+        self.adj_factor = adj_factor_
+
+    def to_raw_price(self, price_: float) -> float:
+        """
+        to_raw_price：将给定的复权价格还原为原始价格
+        @price_(float)：给定的复权价格
+        @return(float)：原始价格
+        """
+
+        return price_ / self.adj_factor
 
     def __repr__(self):
         """
@@ -78,12 +94,14 @@ class BarInfo(Info):
 class PriceInfo(Info):
     """
     Price信息，用于Price事件中传递以“标的在一个时刻的价格数据”为单位的市场信息
+    价格为复权价格时，adj_factor为复权因子，原始价格为现价除以复权因子（见raw_price）
     """
 
     type = "Price"
-    __slots__ = ["symbol", "datetime", "last_price", "crt_price", "volume"]
+    __slots__ = ["symbol", "datetime", "last_price", "crt_price", "volume", "adj_factor"]
 
-    def __init__(self, symbol_: str, datetime_, crt_price_: float, last_price_: float = 0, volume_: float = 0):
+    def __init__(self, symbol_: str, datetime_, crt_price_: float, last_price_: float = 0, volume_: float = 0,
+                 adj_factor_: float = 1.0):
         """
         @symbol_(str)：标的代码
         @datetime_(pandas.Timestamp)：信息时间戳
@@ -92,6 +110,7 @@ class PriceInfo(Info):
 
         @last_price_(float)：上一个价格，默认为0
         @volume_(float)：成交数量，默认为0
+        @adj_factor_(float)：复权因子，默认为1.0（未复权）
         """
 
         self.symbol = symbol_
@@ -99,6 +118,15 @@ class PriceInfo(Info):
         self.crt_price = crt_price_
         self.last_price = last_price_
         self.volume = volume_
+        self.adj_factor = adj_factor_
+
+    @property
+    def raw_price(self) -> float:
+        """
+        raw_price：现价对应的原始价格
+        """
+
+        return self.crt_price / self.adj_factor
 
     def __repr__(self):
         """
@@ -136,7 +164,7 @@ class SignalInfo(Info):
     def __init__(self, symbol_: str, datetime_,
                  direction_: int, open_or_close_: int, price_: float, volume_: float,
                  amount_: float = 0, currency_: str = "CNY",
-                 signal_type_: str = "FOW", uid_: uuid.UUID = None):
+                 signal_type_: str = "FOW", uid_: int = None):
         """
         @symbol_(str)：标的代码
         @datetime_(pandas.Timestamp)：信息时间戳
@@ -149,7 +177,7 @@ class SignalInfo(Info):
         @amount_(float)：预算交易金额，默认为0
         @currency_(str)：交易货币代码，默认为CNY
         @signal_type_(str)：信号分类，默认为FOW
-        @uid_(uuid.UUID)：信号ID，默认为None
+        @uid_(int)：信号ID，默认为None（由ID_ALLOCATOR分配）
         """
 
         self.symbol = symbol_
@@ -162,10 +190,21 @@ class SignalInfo(Info):
         self.currency = currency_
         self.signal_type = signal_type_
         if uid_ is None:
-            self.uid = uuid.uuid4()
+            self.uid = ID_ALLOCATOR.next()
         else:
             self.uid = uid_
 
+    def copy(self, uid_: int = None):
+        """
+        copy：复制当前信号，用于多个投资组合共用同一信号流时，各投资组合独立修改信号的数量和预算金额
+        @uid_(int)：复制得到的信号的信号ID，默认为None（由ID_ALLOCATOR分配新的信号ID）
+        @return(SignalInfo)：复制得到的信号
+        """
+
+        return SignalInfo(symbol_=self.symbol, datetime_=self.datetime, direction_=self.direction,
+                          open_or_close_=self.open_or_close, price_=self.price, volume_=self.volume,
+                          amount_=self.amount, currency_=self.currency, signal_type_=self.signal_type, uid_=uid_)
+
     def __gt__(self, other):
         """
         比较信号的优先级：分类优先、预算金额较少优先
@@ -195,15 +234,16 @@ class SignalInfo(Info):
 # FOK（Fill or Kill）：即时，或者全部成交，或者全部撤回
 # IOC（Immediate or Cancel）：即时，最大限度成交，其余撤回
 # TBF（to be Fill）：持续有效，直至全部成交，或者主动撤回
-# GFD（good for day）：当日有效，持续至全部成交，或者主动撤回，或者当日清算时撤回
+# GFD（good for day）：当日有效，持续至全部成交，或者主动撤回，或者首个交易时段（委托之后首次出现价格的交易日）清算时撤回
 
 # SIGNAL_MAP_ORDER：记录由各类信号生成各类委托时的类型映射关系
 SIGNAL_MAP_ORDER = dict()
 
-# 考虑到回测系统连续运作的便利性，暂不自动生成GFD委托
+# FOW信号生成GFD委托，未成交部分由交易所在委托的首个交易时段清算时撤回，并通过Expire事件通知投资组合
+# 日线数据在收盘价之后发出的委托，至下一交易日的清算时撤回，不会未经历任何价格即被撤回
 SIGNAL_MAP_ORDER["FOK"] = "FOK"
 SIGNAL_MAP_ORDER["IOC"] = "IOC"
-SIGNAL_MAP_ORDER["FOW"] = "TBF"
+SIGNAL_MAP_ORDER["FOW"] = "GFD"
 SIGNAL_MAP_ORDER["TBF"] = "TBF"
 
 
@@ -213,10 +253,10 @@ class OrderInfo(Info):
     """
 
     type = "Order"
-    __slots__ = ["uid", "symbol", "datetime", "direction", "open_or_close", "price", "volume", "order_type"]
+    __slots__ = ["uid", "symbol", "datetime", "direction", "open_or_close", "price", "volume", "order_type", "book"]
 
     def __init__(self, symbol_: str, datetime_, direction_: int, open_or_close_: int, price_: float, volume_: float,
-                 uid_: uuid.UUID = None, order_type_: str = "TBF"):
+                 uid_: int = None, order_type_: str = "TBF", book_: int = 0):
         """
         @symbol_(str)：标的代码
         @datetime_(pandas.Timestamp)：信息时间戳
@@ -226,8 +266,9 @@ class OrderInfo(Info):
         @price_(float)：交易价格
         @volume_(float)：交易数量
 
-        @uid_(uuid.UUID)：委托ID，默认为None
+        @uid_(int)：委托ID，默认为None（由ID_ALLOCATOR分配）
         @order_type_(str)：委托分类，默认为TBF
+        @book_(int)：投资组合编号，默认为0
         """
 
         self.symbol = symbol_
@@ -237,18 +278,19 @@ class OrderInfo(Info):
         self.price = price_
         self.volume = volume_
         if uid_ is None:
-            self.uid = uuid.uuid4()
+            self.uid = ID_ALLOCATOR.next()
         else:
             self.uid = uid_
         self.order_type = order_type_
+        self.book = book_
 
     def get_uuid(self) -> uuid.UUID:
         """
-        get_uuid：获取委托信息的ID
+        get_uuid：将委托信息的整数ID转换为uuid.UUID，用于对外导出
         @return(uuid.UUID)：委托信息的ID
         """
 
-        return self.uid
+        return ID_ALLOCATOR.to_uuid(self.uid)
 
     def __gt__(self, other):
         """
@@ -289,28 +331,30 @@ class CancelInfo(Info):
     """
 
     type = "Cancel"
-    __slots__ = ["uid", "symbol", "datetime", "direction"]
+    __slots__ = ["uid", "symbol", "datetime", "direction", "book"]
 
-    def __init__(self, uid_: uuid.UUID, symbol_: str, datetime_, direction_: int):
+    def __init__(self, uid_: int, symbol_: str, datetime_, direction_: int, book_: int = 0):
         """
-        @uid_(uuid.UUID)：委托ID
+        @uid_(int)：委托ID
         @symbol_(str)：标的代码
         @datetime_(pandas.Timestamp)：信息时间戳
         @direction_(int)：交易方向，买入为1，卖出为-1
+        @book_(int)：投资组合编号，默认为0
         """
 
         self.uid = uid_
         self.symbol = symbol_
         self.datetime = datetime_
         self.direction = 1 if direction_ >= 0 else -1
+        self.book = book_
 
     def get_uuid(self) -> uuid.UUID:
         """
-        get_uuid：获取撤回委托的ID
+        get_uuid：将撤回委托的整数ID转换为uuid.UUID，用于对外导出
         @return(uuid.UUID)：撤回委托的ID
         """
 
-        return self.uid
+        return ID_ALLOCATOR.to_uuid(self.uid)
 
     def __repr__(self):
         """
@@ -323,18 +367,129 @@ class CancelInfo(Info):
                  "买入" if self.direction == 1 else "卖出")
 
 
+class CancelSymbolInfo(Info):
+    """
+    CancelSymbol信息，用于CancelSymbol事件中传递由持仓组合（portfolio）发出的撤回某一标的全部委托的相关信息
+    """
+
+    type = "CancelSymbol"
+    __slots__ = ["symbol", "datetime", "book"]
+
+    def __init__(self, symbol_: str, datetime_, book_: int = 0):
+        """
+        @symbol_(str)：标的代码
+        @datetime_(pandas.Timestamp)：信息时间戳
+        @book_(int)：投资组合编号，默认为0
+        """
+
+        self.symbol = symbol_
+        self.datetime = datetime_
+        self.book = book_
+
+    def __repr__(self):
+        """
+        type, datetime, symbol
+        """
+
+        return (
+            "{:s},{:s},{:s}"
+        ).format(self.type, str(self.datetime), self.symbol)
+
+
+class CancelAllInfo(Info):
+    """
+    CancelAll信息，用于CancelAll事件中传递由持仓组合（portfolio）发出的撤回全部委托的相关信息
+    """
+
+    type = "CancelAll"
+    __slots__ = ["datetime", "book"]
+
+    def __init__(self, datetime_, book_: int = 0):
+        """
+        @datetime_(pandas.Timestamp)：信息时间戳
+        @book_(int)：投资组合编号，默认为0
+        """
+
+        self.datetime = datetime_
+        self.book = book_
+
+    def __repr__(self):
+        """
+        type, datetime
+        """
+
+        return (
+            "{:s},{:s}"
+        ).format(self.type, str(self.datetime))
+
+
+class ExpireInfo(Info):
+    """
+    Expire信息，用于Expire事件中传递由交易所（exchange）撤回的到期委托（GFD委托当日清算、FOK/IOC委托即时作废）的相关信息
+    一个Expire事件汇总多个委托，各委托的信息按相同下标保存在各列表中
+    """
+
+    type = "Expire"
+    __slots__ = ["datetime", "uids", "symbols", "directions", "volumes", "book"]
+
+    def __init__(self, datetime_, uids_: list = None, symbols_: list = None,
+                 directions_: list = None, volumes_: list = None, book_: int = 0):
+        """
+        @datetime_(pandas.Timestamp)：信息时间戳
+        @uids_(list)：到期委托的委托ID，默认为None
+        @symbols_(list)：到期委托的标的代码，默认为None
+        @directions_(list)：到期委托的交易方向，买入为1，卖出为-1，默认为None
+        @volumes_(list)：到期委托的未成交数量，默认为None
+        @book_(int)：投资组合编号，默认为0
+        """
+
+        self.datetime = datetime_
+        self.uids = list() if uids_ is None else uids_
+        self.symbols = list() if symbols_ is None else symbols_
+        self.directions = list() if directions_ is None else directions_
+        self.volumes = list() if volumes_ is None else volumes_
+        self.book = book_
+
+    def add(self, order_: OrderInfo, volume_: float = None) -> None:
+        """
+        add：将给定的到期委托加入当前信息
+        @order_(OrderInfo)：给定的到期委托
+        @volume_(float)：到期委托的未成交数量，默认为None（委托数量）
+        @return(None)
+        """
+
+        self.uids.append(order_.uid)
+        self.symbols.append(order_.symbol)
+        self.directions.append(order_.direction)
+        self.volumes.append(order_.volume if volume_ is None else volume_)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __repr__(self):
+        """
+        type, datetime, count
+        """
+
+        return (
+            "{:s},{:s},{:d}"
+        ).format(self.type, str(self.datetime), len(self.uids))
+
+
 class FillInfo(Info):
     """
     Fill信息，用于Fill事件中传递由交易所（exchange）返回的委托成交的相关信息
     """
 
     type = "Fill"
-    __slots__ = ["uid", "symbol", "datetime", "direction", "open_or_close", "filled_price", "volume", "partial"]
+    __slots__ = ["uid", "symbol", "datetime", "direction", "open_or_close", "filled_price", "volume", "partial",
+                 "book"]
 
-    def __init__(self, uid_: uuid.UUID, symbol_: str, datetime_,
-                 direction_: int, open_or_close_: int, filled_price_: float, volume_: float, partial_: bool = False):
+    def __init__(self, uid_: int, symbol_: str, datetime_,
+                 direction_: int, open_or_close_: int, filled_price_: float, volume_: float, partial_: bool = False,
+                 book_: int = 0):
         """
-        @uid_(uuid.UUID)：委托ID
+        @uid_(int)：委托ID
         @symbol_(str)：标的代码
         @datetime_(pandas.Timestamp)：信息时间戳
 
@@ -344,6 +499,7 @@ class FillInfo(Info):
         @volume_(float)：成交数量
 
         @partial_(bool)：是否部分成交，默认为False
+        @book_(int)：投资组合编号，默认为0
         """
 
         self.uid = uid_
@@ -354,14 +510,15 @@ class FillInfo(Info):
         self.filled_price = filled_price_
         self.volume = volume_
         self.partial = partial_
+        self.book = book_
 
     def get_uuid(self) -> uuid.UUID:
         """
-        get_uuid：获取成交委托的ID
+        get_uuid：将成交委托的整数ID转换为uuid.UUID，用于对外导出
         @return(uuid.UUID)：成交委托的ID
         """
 
-        return self.uid
+        return ID_ALLOCATOR.to_uuid(self.uid)
 
     def __repr__(self):
         """
@@ -374,3 +531,78 @@ class FillInfo(Info):
                  "买入" if self.direction == 1 else "卖出",
                  "开仓" if self.open_or_close == 1 else "平仓",
                  self.filled_price, self.volume, "partial" if self.partial else "")
+
+
+class FillBatchInfo(Info):
+    """
+    FillBatch信息，用于FillBatch事件中传递由交易所（exchange）在同一时间戳、同一标的、同一交易方向上一次撮合成交的多个委托的相关信息
+    各委托的信息按相同下标保存在各数组中，按成交顺序排列
+    """
+
+    type = "FillBatch"
+    __slots__ = ["symbol", "datetime", "direction", "uids", "open_or_closes", "filled_prices", "volumes", "partials",
+                 "book"]
+
+    def __init__(self, symbol_: str, datetime_, direction_: int, uids_: list,
+                 open_or_closes_, filled_prices_, volumes_, partials_, book_: int = 0):
+        """
+        @symbol_(str)：标的代码
+        @datetime_(pandas.Timestamp)：信息时间戳
+        @direction_(int)：交易方向，买入为1，卖出为-1
+
+        @uids_(list)：委托ID
+        @open_or_closes_(numpy.ndarray)：开平仓标志，开仓为1，平仓为-1
+        @filled_prices_(numpy.ndarray)：成交价格
+        @volumes_(numpy.ndarray)：成交数量
+        @partials_(numpy.ndarray)：是否部分成交
+        @book_(int)：投资组合编号，默认为0
+        """
+
+        self.symbol = symbol_
+        self.datetime = datetime_
+        self.direction = 1 if direction_ >= 0 else -1
+        self.uids = uids_
+        self.open_or_closes = numpy.asarray(open_or_closes_, dtype=numpy.int8)
+        self.filled_prices = numpy.asarray(filled_prices_, dtype=numpy.float64)
+        self.volumes = numpy.asarray(volumes_, dtype=numpy.float64)
+        self.partials = numpy.asarray(partials_, dtype=bool)
+        self.book = book_
+
+    @classmethod
+    def from_fills(cls, fills_: list):
+        """
+        from_fills：将给定的同一标的、同一交易方向的多个委托成交信息（FillInfo）合并为一个FillBatch信息
+        @fills_(list)：给定的委托成交信息（FillInfo），按成交顺序排列
+        @return(FillBatchInfo)：合并得到的FillBatch信息
+        """
+
+        return cls(symbol_=fills_[0].symbol, datetime_=fills_[0].datetime, direction_=fills_[0].direction,
+                   uids_=[fill_.uid for fill_ in fills_],
+                   open_or_closes_=[fill_.open_or_close for fill_ in fills_],
+                   filled_prices_=[fill_.filled_price for fill_ in fills_],
+                   volumes_=[fill_.volume for fill_ in fills_],
+                   partials_=[fill_.partial for fill_ in fills_], book_=fills_[0].book)
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __iter__(self):
+        """
+        逐个返回合并前的委托成交信息（FillInfo），用于逐笔处理Fill事件的模块
+        """
+
+        for i, uid_ in enumerate(self.uids):
+            yield FillInfo(uid_=uid_, symbol_=self.symbol, datetime_=self.datetime, direction_=self.direction,
+                           open_or_close_=int(self.open_or_closes[i]), filled_price_=float(self.filled_prices[i]),
+                           volume_=float(self.volumes[i]), partial_=bool(self.partials[i]), book_=self.book)
+
+    def __repr__(self):
+        """
+        type, datetime, symbol, direction, count, volume
+        """
+
+        return (
+            "{:s},{:s},{:s},{:s},{:d},{:.2f}"
+        ).format(self.type, str(self.datetime), self.symbol,
+                 "买入" if self.direction == 1 else "卖出",
+                 len(self.uids), float(self.volumes.sum()))
@@ -0,0 +1,102 @@
+from typing import Optional
+
+# 委托状态：RESTING为仍在交易委托队列中，FILLED为已全部成交，CANCELLED为已撤回或作废
+RESTING = "resting"
+FILLED = "filled"
+CANCELLED = "cancelled"
+
+
+class OrderState(object):
+    """
+    OrderState(object)：回测框架中，交易所（Exchange）与投资组合（Portfolio）共享的委托状态表
+    以（委托ID, 标的代码, 交易方向）为键记录委托状态：交易委托队列中仍有对应委托时为RESTING，否则为最后一次移出的原因
+    投资组合模块发出委托时记为RESTING，交易所模块在委托进入、移出交易委托队列时更新状态；
+    投资组合模块据此仅对仍在交易委托队列中的委托发出Cancel事件，并在处理完成交、作废或撤回后移除记录
+    """
+
+    __slots__ = ["states"]
+
+    def __init__(self):
+        self.states = dict()
+
+    def set(self, uid_: int, symbol_: str, direction_: int, state_: str) -> None:
+        """
+        set：记录给定委托的状态
+        @uid_(int)：委托ID
+        @symbol_(str)：标的代码
+        @direction_(int)：交易方向，买入为1，卖出为-1
+        @state_(str)：委托状态
+        @return(None)
+        """
+
+        self.states[(uid_, symbol_, direction_)] = state_
+
+    def get(self, uid_: int, symbol_: str, direction_: int) -> Optional[str]:
+        """
+        get：查询给定委托的状态
+        @uid_(int)：委托ID
+        @symbol_(str)：标的代码
+        @direction_(int)：交易方向，买入为1，卖出为-1
+        @return(Optional[str])：委托状态，没有记录时为None
+        """
+
+        return self.states.get((uid_, symbol_, direction_))
+
+    def resting(self, uid_: int, symbol_: str) -> list:
+        """
+        resting：查询给定委托ID、标的代码仍在交易委托队列中的交易方向
+        @uid_(int)：委托ID
+        @symbol_(str)：标的代码
+        @return(list)：仍在交易委托队列中的交易方向
+        """
+
+        return [direction_ for direction_ in (1, -1) if self.states.get((uid_, symbol_, direction_)) == RESTING]
+
+    def discard(self, uid_: int, symbol_: str, direction_: int) -> None:
+        """
+        discard：移除给定委托在给定交易方向上的状态记录
+        @uid_(int)：委托ID
+        @symbol_(str)：标的代码
+        @direction_(int)：交易方向，买入为1，卖出为-1
+        @return(None)
+        """
+
+        self.states.pop((uid_, symbol_, direction_), None)
+
+    def remove(self, uid_: int, symbol_: str) -> None:
+        """
+        remove：移除给定委托ID、标的代码在两个交易方向上的状态记录
+        @uid_(int)：委托ID
+        @symbol_(str)：标的代码
+        @return(None)
+        """
+
+        self.states.pop((uid_, symbol_, 1), None)
+        self.states.pop((uid_, symbol_, -1), None)
+
+    def settle(self, uid_: int, symbol_: str) -> None:
+        """
+        settle：移除给定委托ID、标的代码已全部成交或已撤回的状态记录，保留仍在交易委托队列中的记录
+        @uid_(int)：委托ID
+        @symbol_(str)：标的代码
+        @return(None)
+        """
+
+        for direction_ in (1, -1):
+            if self.states.get((uid_, symbol_, direction_), RESTING) != RESTING:
+                del self.states[(uid_, symbol_, direction_)]
+
+    def clear(self) -> None:
+        """
+        clear：清空所有状态记录
+        @return(None)
+        """
+
+        self.states = dict()
+
+    def __len__(self):
+        return len(self.states)
+
+
+# ORDER_STATE：回测框架使用的全局委托状态表
+ORDER_STATE = OrderState()
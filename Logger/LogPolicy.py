@@ -0,0 +1,119 @@
+from pandas import Timestamp
+
+# 记录方式：OFF（不记录）、FULL（全部记录）、SAMPLED（每n次记录1次）、FIRST（每个交易日记录前n次）
+OFF = "off"
+FULL = "full"
+SAMPLED = "sampled"
+FIRST = "first"
+
+# 每日的纳秒数，用于按日期计数
+_NS_PER_DAY = 86400 * 10 ** 9
+
+
+class LogPolicy(object):
+    """
+    LogPolicy(object)：回测框架中，按记录类型决定是否记录的模块，在每次回测运行前设置
+    记录类型包括事件分类标签（EVENT_LOGGER，如Price、Signal），以及Portfolio（PORTFOLIO_LOGGER等投资组合记录）、
+    Strategy（STRATEGY_LOGGER等策略记录）；调用方在记录前先调用allow，不记录时不生成、不格式化记录对象
+    """
+
+    __slots__ = ["modes", "default", "counts", "days"]
+
+    def __init__(self, modes_: dict = None, default_: str = FULL):
+        """
+        @modes_(dict)：记录类型到记录方式的映射，记录方式为OFF、FULL，或(SAMPLED, n)、(FIRST, n)，默认为None
+        @default_(str)：未设置的记录类型的记录方式，默认为FULL
+        """
+
+        self.modes = dict()
+        self.default = (FULL, 1)
+        self.counts = dict()
+        self.days = dict()
+        self.load(modes_=modes_, default_=default_)
+
+    @staticmethod
+    def parse(mode_) -> tuple:
+        """
+        parse：将给定的记录方式转换为(记录方式, n)
+        @mode_(str或tuple)：OFF、FULL，或(SAMPLED, n)、(FIRST, n)
+        @return(tuple)：(记录方式, n)
+        """
+
+        if isinstance(mode_, str):
+            mode_ = (mode_, 1)
+        name, n = mode_
+        if name not in {OFF, FULL, SAMPLED, FIRST}:
+            raise ValueError("log mode {:s} not defined".format(str(name)))
+        if n <= 0:
+            raise ValueError("log mode n must be positive")
+        return name, int(n)
+
+    def load(self, modes_: dict = None, default_: str = FULL) -> None:
+        """
+        load：重新设置所有记录类型的记录方式，并清空计数
+        @modes_(dict)：记录类型到记录方式的映射，默认为None
+        @default_(str)：未设置的记录类型的记录方式，默认为FULL
+        @return(None)
+        """
+
+        self.default = self.parse(default_)
+        self.modes = {key: self.parse(mode) for key, mode in (modes_ or dict()).items()}
+        self.counts = dict()
+        self.days = dict()
+
+    def set(self, key_: str, mode_) -> None:
+        """
+        set：设置给定记录类型的记录方式，并清空其计数
+        @key_(str)：记录类型
+        @mode_(str或tuple)：OFF、FULL，或(SAMPLED, n)、(FIRST, n)
+        @return(None)
+        """
+
+        self.modes[key_] = self.parse(mode_)
+        self.counts.pop(key_, None)
+        self.days.pop(key_, None)
+
+    def disable_all(self) -> None:
+        """
+        disable_all：关闭所有记录类型的记录，用于批量回测
+        @return(None)
+        """
+
+        self.load(default_=OFF)
+
+    def enable_all(self) -> None:
+        """
+        enable_all：全部记录所有记录类型，用于调试
+        @return(None)
+        """
+
+        self.load(default_=FULL)
+
+    def allow(self, key_: str, datetime_: Timestamp = None) -> bool:
+        """
+        allow：判断给定记录类型在给定时间的本次记录是否进行，SAMPLED、FIRST方式同时更新计数
+        @key_(str)：记录类型
+        @datetime_(pandas.Timestamp)：记录时间，FIRST方式按其日期计数，默认为None
+        @return(bool)：是否记录
+        """
+
+        name, n = self.modes.get(key_, self.default)
+        if name == FULL:
+            return True
+        if name == OFF:
+            return False
+
+        # FIRST方式：日期变化时重新计数
+        if name == FIRST:
+            day = datetime_.value // _NS_PER_DAY if datetime_ is not None else 0
+            if self.days.get(key_) != day:
+                self.days[key_] = day
+                self.counts[key_] = 0
+
+        count = self.counts.get(key_, 0)
+        self.counts[key_] = count + 1
+        return count % n == 0 if name == SAMPLED else count < n
+
+
+# LOG_POLICY：回测框架使用的全局记录规则，默认不记录Price事件，其余全部记录
+LOG_POLICY = LogPolicy(modes_={"Price": OFF})
@@ -0,0 +1,138 @@
+import gzip
+import io
+import pandas
+
+# zstd压缩需要Python 3.14的compression.zstd或安装zstandard，均不可用时只能使用gzip
+try:
+    from compression import zstd as _zstd_std
+except ImportError:
+    _zstd_std = None
+
+try:
+    import zstandard as _zstd_ext
+except ImportError:
+    _zstd_ext = None
+
+ZSTD_AVAILABLE = _zstd_std is not None or _zstd_ext is not None
+
+# 各压缩方式的文件后缀
+SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_binary(path_: str, mode_: str, compression_: str = None, level_: int = None):
+    """
+    _open_binary：以给定的压缩方式打开二进制文件流
+    @path_(str)：文件地址
+    @mode_(str)："wb"或"rb"
+    @compression_(str)：压缩方式，None、"gzip"或"zstd"，默认为None
+    @level_(int)：压缩级别，默认为None（使用各压缩方式的默认级别）
+    @return(file object)：二进制文件流
+    """
+
+    if compression_ is None:
+        return open(path_, mode_)
+
+    if compression_ == "gzip":
+        return gzip.open(path_, mode_, compresslevel=6 if level_ is None else level_)
+
+    if compression_ == "zstd":
+        if _zstd_std is not None:
+            return _zstd_std.open(path_, mode_, level=level_)
+        if _zstd_ext is not None:
+            if mode_ == "wb":
+                compressor = _zstd_ext.ZstdCompressor(level=3 if level_ is None else level_)
+                return compressor.stream_writer(open(path_, "wb"), closefd=True)
+            return _zstd_ext.ZstdDecompressor().stream_reader(open(path_, "rb"), closefd=True)
+        raise RuntimeError("zstd not available, install zstandard or use gzip")
+
+    raise ValueError("compression {:s} not supported".format(str(compression_)))
+
+
+def infer_compression(path_: str):
+    """
+    infer_compression：根据文件后缀推断压缩方式
+    @path_(str)：文件地址
+    @return(str)：压缩方式，None、"gzip"或"zstd"
+    """
+
+    if path_.endswith(".gz"):
+        return "gzip"
+    if path_.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+class LogSink(object):
+    """
+    LogSink(object)：回测框架中，将记录结果以数据帧为单位流式写入（可压缩的）文件的模块
+    每次写入一个数据帧（多行记录拼接的字符串），编码后交给压缩流，运行过程中不保留已写入的记录
+    """
+
+    __slots__ = ["path", "encoding", "compression", "file", "bytes"]
+
+    def __init__(self, path_: str, compression_: str = "gzip", encoding_: str = "GB2312", level_: int = None):
+        """
+        @path_(str)：输出文件地址，自动追加压缩方式对应的后缀（如.gz）
+        @compression_(str)：压缩方式，None、"gzip"或"zstd"，默认为"gzip"
+        @encoding_(str)：输出文件编码方式，默认为GB2312
+        @level_(int)：压缩级别，默认为None（使用各压缩方式的默认级别）
+        """
+
+        if compression_ not in SUFFIX:
+            raise ValueError("compression {:s} not supported".format(str(compression_)))
+
+        self.path = path_ if path_.endswith(SUFFIX[compression_]) else path_ + SUFFIX[compression_]
+        self.encoding = encoding_
+        self.compression = compression_
+        self.file = _open_binary(self.path, "wb", compression_=compression_, level_=level_)
+
+        # bytes：已写入的未压缩字节数
+        self.bytes = 0
+
+    def write(self, frame_: str) -> None:
+        """
+        write：写入一个数据帧
+        @frame_(str)：数据帧
+        @return(None)
+        """
+
+        data = frame_.encode(self.encoding)
+        self.file.write(data)
+        self.bytes += len(data)
+
+    def close(self) -> None:
+        """
+        close：结束压缩流并关闭文件
+        @return(None)
+        """
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_log(path_: str, encoding_: str = "GB2312", compression_: str = "infer") -> pandas.DataFrame:
+    """
+    read_log：读取LoggerStringUnit输出的（可压缩的）记录文件，按首行的列数拆分，最后一列保留剩余的全部内容
+    QueueLog中各类事件的信息（info）包含数量不同的字段，以此保证每行的列数与首行相同；可转换为数值的列转换为数值
+    @path_(str)：文件地址
+    @encoding_(str)：文件编码方式，默认为GB2312
+    @compression_(str)：压缩方式，默认为"infer"（根据文件后缀推断）
+    @return(pandas.DataFrame)：记录结果，以index列为索引
+    """
+
+    if compression_ == "infer":
+        compression_ = infer_compression(path_)
+
+    with _open_binary(path_, "rb", compression_=compression_) as raw:
+        stream = io.TextIOWrapper(raw, encoding=encoding_, newline="")
+        header = stream.readline().rstrip("\r\n").split(",")
+        n = len(header) - 1
+        rows = [line.rstrip("\r\n").split(",", n) for line in stream]
+
+    frame = pandas.DataFrame(rows, columns=header)
+    for name in frame.columns:
+        values = pandas.to_numeric(frame[name], errors="coerce")
+        if not values.isna().any():
+            frame[name] = values
+    return frame.set_index(header[0])
@@ -1,6 +1,7 @@
 import pandas
 from abc import (ABCMeta, abstractmethod)
 from collections import defaultdict
+from Logger.LogSink import LogSink
 
 
 class LoggerUnit:
@@ -40,9 +41,10 @@ class LoggerUnit:
 class LoggerStringUnit:
     """
     LoggerStringUnit：回测框架中，用于记录的单位模块，记录结果的存储方式为字符串
+    调用stream方法后，记录结果以数据帧为单位流式写入（可压缩的）文件，不再在内存中保留全部记录
     """
 
-    __slots__ = ["data", "row"]
+    __slots__ = ["data", "row", "sink", "frame", "frame_rows"]
 
     def __init__(self, head_: str = "info"):
         """
@@ -52,6 +54,30 @@ class LoggerStringUnit:
         self.data = "index,committer,datetime,{:s}\n".format(head_)
         self.row = 1
 
+        # sink：流式写入的输出模块，为None时在内存中保留全部记录；frame：尚未写入的记录行
+        self.sink = None
+        self.frame = list()
+        self.frame_rows = 0
+
+    def stream(self, path_: str, compression_: str = "gzip", frame_rows_: int = 10000,
+               encoding_: str = "GB2312") -> str:
+        """
+        stream：此后的记录结果以数据帧为单位流式写入给定文件，已有的记录结果（包括首行）立即写入
+        @path_(str)：给定输出文件地址，自动追加压缩方式对应的后缀（如.gz）
+        @compression_(str)：压缩方式，None、"gzip"或"zstd"，默认为"gzip"
+        @frame_rows_(int)：每个数据帧的记录行数，默认为10000
+        @encoding_(str)：给定输出文件编码方式，默认为GB2312
+        @return(str)：实际输出文件地址
+        """
+
+        if self.sink is not None:
+            self.sink.close()
+        self.sink = LogSink(path_=path_, compression_=compression_, encoding_=encoding_)
+        self.frame_rows = frame_rows_
+        self.sink.write(self.data)
+        self.data = ""
+        return self.sink.path
+
     def log(self, obj: object, committer: str, datetime_) -> None:
         """
         log：根据给定记录者在给定时间提交的记录对象，记录一行数据
@@ -60,24 +86,100 @@ class LoggerStringUnit:
         @datetime_(pandas.Timestamp)：给定的记录时间
         @return(None)
         """
-        self.data += (
+
+        line = (
             "{:d},{:s},{:s},{:s}\n"
         ).format(self.row, committer, str(datetime_), str(obj))
         self.row += 1
 
+        if self.sink is None:
+            self.data += line
+        else:
+            self.frame.append(line)
+            if len(self.frame) >= self.frame_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        flush：流式写入时，将尚未写入的记录行作为一个数据帧写入文件
+        @return(None)
+        """
+
+        if self.sink is not None and self.frame:
+            self.sink.write("".join(self.frame))
+            self.frame = list()
+
     def to_file(self, path_: str, encoding_: str = "GB2312") -> None:
         """
         to_file：以给定的编码方式，将保存的记录结果输出到给定的文件
+        流式写入时，写入剩余的记录行并关闭stream方法给定的文件，给定的文件地址和编码方式不再使用
         @path_(str)：给定输出文件地址
         @encoding_(str)：给定输出文件编码方式，默认为GB2312
         @return(None)
         """
 
+        if self.sink is not None:
+            self.flush()
+            self.sink.close()
+            self.sink = None
+            return
+
         with open(file=path_, mode="w", encoding=encoding_) as file:
             file.write(self.data)
             file.close()
 
 
+class LoggerColumnUnit:
+    """
+    LoggerColumnUnit：回测框架中，用于记录的单位模块，以列为单位保存记录结果
+    每次记录一个包含多个标的的快照，仅追加各列的原始数据，不进行字符串格式化
+    """
+
+    __slots__ = ["columns", "data"]
+
+    def __init__(self, columns_: list):
+        """
+        @columns_(list)：记录对象中需要记录的属性名称列表
+        """
+
+        self.columns = list(columns_)
+        self.data = {name: list() for name in ["committer", "datetime", "symbol"] + self.columns}
+
+    def log_snapshot(self, objs: dict, committer: str, datetime_) -> None:
+        """
+        log_snapshot：根据给定记录者在给定时间提交的一组记录对象，按列记录一个快照
+        @objs(dict)：提交的(标的代码, 记录对象)键值对
+        @committer(str)：给定的记录者
+        @datetime_(pandas.Timestamp)：给定的记录时间
+        @return(None)
+        """
+
+        n = len(objs)
+        self.data["committer"] += [committer] * n
+        self.data["datetime"] += [datetime_] * n
+        self.data["symbol"] += objs.keys()
+        for name in self.columns:
+            self.data[name] += [getattr(obj, name) for obj in objs.values()]
+
+    def to_frame(self) -> pandas.DataFrame:
+        """
+        to_frame：将保存的记录结果转换为pandas.DataFrame
+        @return(pandas.DataFrame)：记录结果
+        """
+
+        return pandas.DataFrame(self.data)
+
+    def to_file(self, path_: str, encoding_: str = "GB2312") -> None:
+        """
+        to_file：以给定的编码方式，将保存的记录结果输出到给定的.csv文件
+        @path_(str)：给定输出文件地址
+        @encoding_(str)：给定输出文件编码方式，默认为GB2312
+        @return(None)
+        """
+
+        self.to_frame().to_csv(path_or_buf=path_, encoding=encoding_, index_label="index")
+
+
 class Logger:
     """
     Logger：回测框架中，用于记录的模块，管理多个单位记录模块
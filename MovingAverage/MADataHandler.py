@@ -1,4 +1,6 @@
 from DataHandler.DataHandler import DataHandler
+from DataHandler.Adjustment import CorporateActions
+from BaseType.Const import CONST
 import pandas
 from Event.EventQueue import EVENT_QUEUE
 from Event.Event import Event
@@ -12,7 +14,7 @@ DEFAULT_COLUMN = ["Symbol", "Date", "Time",
 
 def series_to_bar(row: pandas.Series) -> Event:
     """
-    series_to_bar：根据给定的一行数据（pandas.Series），生成一个Bar事件
+    series_to_bar：根据给定的一行数据（pandas.Series），生成一个Bar事件；已复权的数据带有AdjFactor列，随Bar事件传递复权因子
     @row(pandas.Series)：给定的一行数据（pandas.Series）
     @return(Event)：生成的Bar事件
     """
@@ -20,7 +22,7 @@ def series_to_bar(row: pandas.Series) -> Event:
                  info_=Info.BarInfo(symbol_=row["Symbol"], datetime_=row["UpdateDateTime"],
                                     open_=float(row["Open"]), high_=float(row["High"]),
                                     low_=float(row["Low"]), close_=float(row["Close"]),
-                                    volume_=0, turnover_=0))
+                                    volume_=0, turnover_=0, adj_factor_=float(row.get("AdjFactor", 1.0))))
 
 
 class MADataHandler(DataHandler):
@@ -51,6 +53,22 @@ class MADataHandler(DataHandler):
         self.dataframe = self.dataframe.set_index("index")
         self.dataframe = self.dataframe.sort_index()
 
+    def adjust(self, actions_: CorporateActions, method_: str = "forward",
+               cache_path_: str = CONST["ADJUST_PATH"]) -> None:
+        """
+        adjust：根据给定的除权除息表，将已读取行情数据的开盘价、最高价、最低价、收盘价整体替换为复权价格，
+        原始价格保留在RawOpen、RawHigh、RawLow、RawClose列中，复权因子保留在AdjFactor列中；
+        生成的Bar事件使用复权价格，并通过BarInfo.adj_factor传递复权因子，由Bar拆分的Price事件同样带有复权因子，
+        需要原始价格的模块可以通过BarInfo.to_raw_price、PriceInfo.raw_price还原；
+        注意：交易所模块以复权价格撮合，投资组合模块以复权价格计算成交金额、现金收付和持仓金额，不使用原始价格
+        @actions_(CorporateActions)：给定的除权除息表
+        @method_(str)：复权方式，forward（前复权）或backward（后复权），默认为forward
+        @cache_path_(str)：复权价格缓存文件目录，默认为CONST["ADJUST_PATH"]，为None时不使用缓存
+        @return(None)
+        """
+
+        self.dataframe = actions_.adjust(frame_=self.dataframe, method_=method_, cache_path_=cache_path_)
+
     def publish_bar(self):
         tmp = self.dataframe.iterrows()
         self.dataframe = pandas.DataFrame()
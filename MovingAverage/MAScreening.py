@@ -0,0 +1,82 @@
+from Portfolio.Screening import VectorizedPortfolio
+import numpy
+
+
+def moving_averages(prices_: numpy.ndarray, periods_) -> dict:
+    """
+    moving_averages：以累计和一次性计算给定价格序列上各个周期的简单移动平均
+    @prices_(numpy.ndarray)：价格序列，长度为T
+    @periods_(iterable)：周期
+    @return(dict)：周期到移动平均序列（长度为T，前period - 1个值为NaN）的映射
+    """
+
+    prices_ = numpy.asarray(prices_, dtype=numpy.float64)
+    sums = numpy.concatenate(([0.0], numpy.cumsum(prices_)))
+
+    ret = dict()
+    for period in set(int(p) for p in periods_):
+        ma = numpy.full(len(prices_), numpy.nan)
+        if period <= len(prices_):
+            ma[period - 1:] = (sums[period:] - sums[:len(prices_) + 1 - period]) / period
+        ret[period] = ma
+    return ret
+
+
+def ma_directions(prices_: numpy.ndarray, shorts_, longs_) -> numpy.ndarray:
+    """
+    ma_directions：对于K个(短周期, 长周期)参数组合，一次性计算每个价格上的交易方向，与MAStrategyUnit相同：
+    价格数据达到一个长周期之前为0，此后短周期均线不低于长周期均线时为1，否则为-1
+    @prices_(numpy.ndarray)：价格序列，长度为T
+    @shorts_(array-like)：各参数组合的短周期，长度为K
+    @longs_(array-like)：各参数组合的长周期，长度为K
+    @return(numpy.ndarray)：交易方向，K x T
+    """
+
+    shorts_ = numpy.asarray(shorts_, dtype=numpy.int64)
+    longs_ = numpy.asarray(longs_, dtype=numpy.int64)
+    table = moving_averages(prices_, numpy.concatenate((shorts_, longs_)))
+
+    short_ma = numpy.stack([table[s] for s in shorts_.tolist()])
+    long_ma = numpy.stack([table[l] for l in longs_.tolist()])
+
+    active = numpy.arange(len(prices_))[None, :] >= (longs_ - 1)[:, None]
+    return numpy.where(active, numpy.where(short_ma >= long_ma, 1, -1), 0).astype(numpy.int8)
+
+
+def ma_positions(directions_: numpy.ndarray, volume_: float, init_volume_: float = 0,
+                 per_hand_: int = 1) -> numpy.ndarray:
+    """
+    ma_positions：根据交易方向计算目标持仓数量：首次发出信号时交易数量减半，此后在交易方向变化时交易给定数量
+    @directions_(numpy.ndarray)：交易方向，K x T
+    @volume_(float)：每次交易的数量
+    @init_volume_(float)：起始持仓数量，默认为0
+    @per_hand_(int)：每手数量，交易数量按每手数量取整，默认为1
+    @return(numpy.ndarray)：目标持仓数量，K x T
+    """
+
+    directions_ = numpy.asarray(directions_, dtype=numpy.float64)
+    last = numpy.concatenate((numpy.zeros((directions_.shape[0], 1)), directions_[:, :-1]), axis=1)
+
+    half = (volume_ // 2) // per_hand_ * per_hand_
+    full = volume_ // per_hand_ * per_hand_
+    trades = directions_ * numpy.where(last == 0, half, numpy.where(last * directions_ < 0, full, 0.0))
+
+    return init_volume_ + numpy.cumsum(trades, axis=1)
+
+
+def screen(prices_: numpy.ndarray, shorts_, longs_, volume_: float,
+           portfolio_: VectorizedPortfolio) -> numpy.ndarray:
+    """
+    screen：对于K个(短周期, 长周期)参数组合，以向量化方式一次性计算移动均线策略的净资产曲线
+    @prices_(numpy.ndarray)：收盘价序列，长度为T
+    @shorts_(array-like)：各参数组合的短周期，长度为K
+    @longs_(array-like)：各参数组合的长周期，长度为K
+    @volume_(float)：每次交易的数量
+    @portfolio_(VectorizedPortfolio)：向量化投资组合，提供起始资金、起始持仓和费率
+    @return(numpy.ndarray)：净资产，K x T
+    """
+
+    positions = ma_positions(ma_directions(prices_, shorts_, longs_), volume_=volume_,
+                             init_volume_=portfolio_.init_volume, per_hand_=portfolio_.subject.per_hand)
+    _, net_assets = portfolio_.run(prices_, positions)
+    return net_assets
@@ -1,9 +1,16 @@
 from Event.Event import Event
 from Event.EventQueue import EVENT_QUEUE
 from Strategy.Strategy import PseudoStrategyUnit
+from Strategy.Indicator import INDICATOR_SERVICE
 from BaseType.Const import CONST
 import Information.Info as Info
 from Logger.Logger import LoggerStringUnit
+from Logger.LogPolicy import LOG_POLICY
+from Portfolio.Screening import ShadowBook
+from numpy.lib.stride_tricks import sliding_window_view
+from pandas import Timestamp
+import pandas
+import numpy
 
 # 定义默认使用5日、20日移动平均值
 CONST["SHORT"] = 5
@@ -50,7 +57,7 @@ class MAStrategyUnit(PseudoStrategyUnit):
     MAStrategyUnit(PseudoStrategyUnit)：移动均线策略的单位策略模块
     """
 
-    __slots__ = ["prices", "idx", "long", "short", "long_sum", "short_sum", "is_act",
+    __slots__ = ["long", "short", "long_indicator", "short_indicator",
                  "crt_price", "last_direction", "last_datetime"]
     _name = "MAStrategy"
 
@@ -107,41 +114,89 @@ class MAStrategyUnit(PseudoStrategyUnit):
 
         self.long = long_
         self.short = short_
-        self.prices = [0.0 for _ in range(self.long)]
-        self.idx: int = 0
-        self.long_sum = 0.0
-        self.short_sum = 0.0
-        self.is_act = False
+
+        # 短周期、长周期均线由技术指标模块（INDICATOR_SERVICE）在Price事件中先行更新，同一标的、同一周期的均线由各策略共用
+        self.long_indicator = INDICATOR_SERVICE.subscribe(self.symbol, "SMA", period_=self.long)
+        self.short_indicator = INDICATOR_SERVICE.subscribe(self.symbol, "SMA", period_=self.short)
         self.last_direction: int = 0
 
-    def update_price(self, price_: float) -> None:
+    def get_info(self) -> MAInfo:
         """
-        update_price：根据给定的现价，更新策略的数据
-        @price_(float)：给定的现价
-        @return(None)
+        get_info：提取当前单位策略模块的信息（MAInfo）
+        @return(MAInfo)：提取的单位策略模块的信息
         """
 
-        last_long = self.prices[self.idx]
-        last_short = self.prices[(self.idx + self.long - self.short) % self.long]
-        self.prices[self.idx] = price_
-        self.long_sum = self.long_sum - last_long + price_
-        self.short_sum = self.short_sum - last_short + price_
-        self.idx: int = (self.idx + 1) % self.long
+        # 混合方式下，均线值由信号时间表中的价格序列计算
+        if self.schedule is not None:
+            i = self.schedule.index_at(self.last_datetime)
+            prices = self.schedule.prices
+            short_ma = prices[max(i + 1 - self.short, 0):i + 1].sum() / self.short if i >= 0 else 0.0
+            long_ma = prices[max(i + 1 - self.long, 0):i + 1].sum() / self.long if i >= 0 else 0.0
+            crt_direction = (1 if short_ma >= long_ma else -1) if i + 1 >= self.long else 0
+        else:
+            short_ma = self.short_indicator.value
+            long_ma = self.long_indicator.value
+            crt_direction = self.last_direction
 
-        # 当价格数据达到一个长周期之后，激活策略
-        if self.idx == 0:
-            self.is_act = True
+        return MAInfo(crt_price_=self.crt_price,
+                      short_ma_=round(short_ma, 4),
+                      long_ma_=round(long_ma, 4),
+                      crt_direction_=crt_direction)
 
-    def get_info(self) -> MAInfo:
+    def compute_signals(self, prices_: numpy.ndarray) -> (numpy.ndarray, numpy.ndarray):
         """
-        get_info：提取当前单位策略模块的信息（MAInfo）
-        @return(MAInfo)：提取的单位策略模块的信息
+        compute_signals：以向量化方式计算给定价格序列上的交易信号：价格数据达到一个长周期时首次发出信号，此后在均线交叉时发出信号
+        @prices_(numpy.ndarray)：价格序列
+        @return(numpy.ndarray, numpy.ndarray)：发出信号的价格序列下标，以及对应的交易方向
         """
 
-        return MAInfo(crt_price_=self.crt_price,
-                      short_ma_=round(self.short_sum / self.short, 4),
-                      long_ma_=round(self.long_sum / self.long, 4),
-                      crt_direction_=self.last_direction)
+        if len(prices_) < self.long:
+            return numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64)
+
+        # 自第long个价格起，各价格对应的长周期、短周期均线
+        long_ma = sliding_window_view(prices_, self.long).sum(axis=1) / self.long
+        short_ma = sliding_window_view(prices_[self.long - self.short:], self.short).sum(axis=1) / self.short
+        directions = numpy.where(short_ma >= long_ma, 1, -1)
+
+        # 首个价格，以及交易方向发生变化的价格
+        indices = numpy.concatenate(([0], numpy.flatnonzero(directions[1:] != directions[:-1]) + 1))
+        return indices + self.long - 1, directions[indices]
+
+    def lookback(self) -> int:
+        """
+        lookback：分段计算交易信号时，每段之前需要额外提供一个长周期的价格
+        @return(int)：额外提供的价格数量
+        """
+
+        return self.long
+
+    def make_signal(self, price_: Info.PriceInfo, direction_: int) -> Info.SignalInfo:
+        """
+        make_signal：混合方式下，根据预先计算的交易方向和触发信号的价格信息，生成交易信号，首次发出的信号成交数量减半
+        @price_(Info.PriceInfo)：触发信号的价格信息
+        @direction_(int)：交易方向，买入为1，卖出为-1
+        @return(Info.SignalInfo)：生成的交易信号
+        """
+
+        self.crt_price = price_.crt_price
+        self.last_datetime = price_.datetime
+        volume_ = self.volume // 2 if self.last_direction == 0 else self.volume
+        self.last_direction = direction_
+
+        return Info.SignalInfo(symbol_=price_.symbol, datetime_=self.last_datetime,
+                               direction_=direction_, open_or_close_=direction_,
+                               price_=self.crt_price, volume_=volume_)
+
+    def set_schedule(self, schedule_) -> None:
+        """
+        set_schedule：混合方式下，接收预先计算的信号时间表，并释放均线指标
+        @schedule_(SignalSchedule)：信号时间表
+        @return(None)
+        """
+
+        super().set_schedule(schedule_)
+        INDICATOR_SERVICE.release(self.long_indicator, keep_=False)
+        INDICATOR_SERVICE.release(self.short_indicator, keep_=False)
 
     def on_bar(self, event: Event) -> None:
         pass
@@ -156,13 +211,12 @@ class MAStrategyUnit(PseudoStrategyUnit):
         price: Info.PriceInfo = event.info
 
         self.crt_price = price.crt_price
-        self.update_price(price.crt_price)
         self.last_datetime = price.datetime
 
-        # 仅当策略已激活时执行
-        if self.is_act:
-            short_ma = self.short_sum / self.short
-            long_ma = self.long_sum / self.long
+        # 仅当价格数据达到一个长周期之后执行
+        if self.long_indicator.ready:
+            short_ma = self.short_indicator.value
+            long_ma = self.long_indicator.value
             last_dict = 1 if short_ma >= long_ma else -1
 
             # 首次触发，成交数量减半执行
@@ -203,11 +257,151 @@ class MAStrategyUnit(PseudoStrategyUnit):
     def on_fill(self, event: Event) -> None:
         pass
 
+    def on_fill_batch(self, event: Event) -> None:
+        pass
+
+    def on_clear(self, event: Event) -> None:
+        # 混合方式下，不再接收Price事件，根据信号时间表更新至Clear事件前的最后一个价格
+        if self.schedule is not None:
+            i = self.schedule.index_at(event.datetime)
+            if i >= 0:
+                self.crt_price = float(self.schedule.prices[i])
+                self.last_datetime = Timestamp(int(self.schedule.datetimes[i]))
+        if LOG_POLICY.allow("Strategy", self.last_datetime):
+            STRATEGY_LOGGER.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+
+    def on_end(self, event: Event) -> None:
+        pass
+
+    def put_signals(self) -> None:
+        pass
+
+
+class MABatchStrategyUnit(PseudoStrategyUnit):
+    """
+    MABatchStrategyUnit(PseudoStrategyUnit)：在同一事件流中同时评估K个(短周期, 长周期)参数组合的移动均线策略的单位策略模块
+    保存一个价格累计和的环形缓冲区，每个Price事件以一次numpy运算计算所有参数组合的均线；
+    各参数组合的交易信号不放入事件队列，直接交由各自的轻量投资组合（ShadowBook）成交，Clear事件时记录净资产
+    """
+
+    __slots__ = ["shorts", "longs", "periods", "prefix", "lags", "pos", "total", "count", "max_long", "half", "full",
+                 "last_directions", "book", "crt_price", "last_datetime"]
+    _name = "MABatchStrategy"
+
+    def __init__(self, shorts_, longs_, init_cash_: float, init_volume_: float = 0, init_price_: float = None,
+                 symbol_: str = CONST["SYMBOL"], exchange_: str = CONST["EXCHANGE"],
+                 last_datetime_=CONST["START_TIME"],
+                 per_hand_: int = CONST["PER_HAND"], per_price_: float = CONST["PER_PRICE"],
+                 bid_commission_: float = CONST["BID_COMMISSION"],
+                 bid_commission_rate_: float = CONST["BID_COMMISSION_RATE"],
+                 ask_commission_: float = CONST["ASK_COMMISSION"],
+                 ask_commission_rate_: float = CONST["ASK_COMMISSION_RATE"],
+                 bid_tax_: float = CONST["BID_TAX"], bid_tax_rate_: float = CONST["BID_TAX_RATE"],
+                 ask_tax_: float = CONST["ASK_TAX"], ask_tax_rate_: float = CONST["ASK_TAX_RATE"],
+                 crt_price_: float = CONST["CRT_PRICE"], net_price_: float = CONST["NET_PRICE"],
+                 book_value_: float = CONST["BOOK_VALUE"], volume_: float = CONST["VOLUME"],
+                 multiplier_: int = CONST["MULTIPLIER"], margin_rate_: float = CONST["MARGIN_RATE"],
+                 currency_: str = CONST["CURRENCY"]):
+        """
+        @shorts_(array-like)：各参数组合的短周期，长度为K
+        @longs_(array-like)：各参数组合的长周期，长度为K
+        @init_cash_(float)：各轻量投资组合的起始资金（人民币）
+        @init_volume_(float)：各轻量投资组合的起始持仓数量，默认为0
+        @init_price_(float)：起始持仓的买入价格，默认为None（不计起始持仓的买入成本）
+
+        其余参数与MAStrategyUnit相同，volume_为每次交易的数量
+        """
+
+        super().__init__(symbol_=symbol_, exchange_=exchange_, last_datetime_=last_datetime_, per_hand_=per_hand_,
+                         per_price_=per_price_, bid_commission_=bid_commission_,
+                         bid_commission_rate_=bid_commission_rate_, ask_commission_=ask_commission_,
+                         ask_commission_rate_=ask_commission_rate_, bid_tax_=bid_tax_, bid_tax_rate_=bid_tax_rate_,
+                         ask_tax_=ask_tax_, ask_tax_rate_=ask_tax_rate_, crt_price_=crt_price_,
+                         net_price_=net_price_, book_value_=book_value_, volume_=volume_, multiplier_=multiplier_,
+                         margin_rate_=margin_rate_, currency_=currency_)
+
+        self.shorts = numpy.asarray(shorts_, dtype=numpy.int64)
+        self.longs = numpy.asarray(longs_, dtype=numpy.int64)
+        if len(self.shorts) != len(self.longs) or len(self.longs) == 0:
+            raise ValueError("shorts and longs length mismatch")
+        self.periods = numpy.concatenate((self.shorts, self.longs))
+
+        # prefix：价格累计和的环形缓冲区，长度为最长周期加1，第0个位置为尚未接收价格时的累计和0
+        # 周期为p的均线为(当前累计和 - p个价格之前的累计和) / p，未满一个周期时与MAStrategyUnit相同，不足部分按0计算
+        self.prefix = numpy.zeros(int(self.periods.max()) + 1)
+        self.pos = 0
+        self.total = 0.0
+        self.count = 0
+        self.max_long = int(self.longs.max())
+
+        # lags：环形缓冲区每个位置对应的各周期之前的累计和的位置，预先计算以减少每个Price事件的运算
+        self.lags = (numpy.arange(len(self.prefix))[:, None] - self.periods[None, :]) % len(self.prefix)
+
+        # 首次发出信号时交易数量减半，交易数量按每手数量取整
+        self.half = (self.volume // 2) // self.per_hand * self.per_hand
+        self.full = self.volume // self.per_hand * self.per_hand
+
+        self.last_directions = numpy.zeros(len(self.longs))
+        self.book = ShadowBook(subject_=self, k_=len(self.longs), init_cash_=init_cash_,
+                               init_volume_=init_volume_, init_price_=init_price_)
+
+    def on_bar(self, event: Event) -> None:
+        pass
+
+    def on_price(self, event: Event) -> None:
+        """
+        on_price：接收并处理Price事件，计算所有参数组合的均线和交易方向，交易方向变化的参数组合在各自的轻量投资组合中成交
+        @event(Event)：接收的Price事件
+        @return(None)
+        """
+
+        price: Info.PriceInfo = event.info
+
+        self.crt_price = price.crt_price
+        self.last_datetime = price.datetime
+
+        self.total += self.crt_price
+        self.count += 1
+        self.pos = (self.pos + 1) % len(self.prefix)
+        self.prefix[self.pos] = self.total
+
+        # 一次计算所有参数组合的短周期、长周期均线
+        ma = (self.total - self.prefix[self.lags[self.pos]]) / self.periods
+        k = len(self.longs)
+        directions = numpy.where(ma[:k] >= ma[k:], 1.0, -1.0)
+
+        # 价格数据达到最长周期之前，未达到一个长周期的参数组合交易方向为0
+        if self.count < self.max_long:
+            directions *= (self.count >= self.longs)
+
+        # 仅当存在交易方向变化的参数组合时成交：首次触发的参数组合交易数量减半，此后交易给定数量
+        if (directions != self.last_directions).any():
+            trades = directions * numpy.where(self.last_directions == 0, self.half,
+                                              numpy.where(self.last_directions * directions < 0, self.full, 0.0))
+            self.book.execute(trades_=trades, price_=self.crt_price)
+            self.last_directions = directions
+
+    def on_fill(self, event: Event) -> None:
+        pass
+
+    def on_fill_batch(self, event: Event) -> None:
+        pass
+
     def on_clear(self, event: Event) -> None:
-        STRATEGY_LOGGER.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+        self.book.record(datetime_=self.last_datetime, price_=self.crt_price)
 
     def on_end(self, event: Event) -> None:
         pass
 
     def put_signals(self) -> None:
         pass
+
+    def to_frame(self) -> pandas.DataFrame:
+        """
+        to_frame：将各轻量投资组合记录的净资产整理为pandas.DataFrame
+        @return(pandas.DataFrame)：以记录时间戳为索引、以“短周期_长周期”为列名的净资产
+        """
+
+        return pandas.DataFrame(numpy.array(self.book.history).reshape(-1, len(self.longs)),
+                                index=pandas.DatetimeIndex(self.book.datetimes),
+                                columns=["{:d}_{:d}".format(s, l) for s, l in zip(self.shorts, self.longs)])
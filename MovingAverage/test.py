@@ -1,15 +1,24 @@
 from Event.EventQueue import EVENT_QUEUE
+from Logger.Logger import LoggerStringUnit
 
 from Exchange.Exchange import (ExchangeUnion, PseudoExchangeUnit)
 from Portfolio.Holding import (PORTFOLIO_LOGGER, HoldingUnion, PseudoHoldingUnit)
-from MovingAverage.MAStrategy import (MAStrategyUnit, STRATEGY_LOGGER)
+from MovingAverage.MAStrategy import (MAStrategyUnit, MABatchStrategyUnit, STRATEGY_LOGGER)
 from MovingAverage.MADataHandler import MADataHandler
+from MovingAverage.MAScreening import screen
 from Strategy.Strategy import StrategyUnion
+from Portfolio.Screening import VectorizedPortfolio
+from Portfolio.Analytics import PortfolioAnalytics
+from Portfolio.TradeLedger import TradeLedger
+from DataHandler.Adjustment import CorporateActions
 
 from Event.EventLogger import EVENT_LOGGER
+from Event.EventJournal import (EventJournalWriter, replay)
 from BaseType.Const import CONST
 import pandas
-import uuid
+import numpy
+import time
+from Information.IdAllocator import ID_ALLOCATOR
 import Information.Info as Info
 from Event.Event import Event
 
@@ -28,26 +37,48 @@ def bar_slicer(bar: Info.BarInfo):
     """
 
     yield Event(type_="Price", datetime_=bar.datetime,
-                info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=bar.datetime, crt_price_=bar.close))
+                info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=bar.datetime, crt_price_=bar.close,
+                                     adj_factor_=bar.adj_factor))
 
 
-def test():
+def test(journal_path_: str = None, hybrid_: bool = False, compression_: str = None):
+    """
+    @journal_path_(str)：事件日志文件地址，提供时记录Price事件、Signal事件和Clear事件，默认为None
+    @hybrid_(bool)：是否以混合方式运行交易策略：预先以向量化方式计算交易信号，仅在信号时间生成Signal事件，默认为False
+    @compression_(str)：提供时各记录模块在运行过程中流式写入压缩文件，"gzip"或"zstd"，默认为None
+    """
 
     print("Hello World!")
     print(EVENT_QUEUE, "\n")
 
+    # 流式写入压缩文件，文件地址追加压缩方式对应的后缀，可由Logger.LogSink.read_log读取
+    if compression_ is not None:
+        EVENT_LOGGER.stream(path_=CONST["QUEUE_PATH"], compression_=compression_)
+        STRATEGY_LOGGER.stream(path_=CONST["STRATEGY_PATH"], compression_=compression_)
+        PORTFOLIO_LOGGER.stream(path_=CONST["PORTFOLIO_PATH"], compression_=compression_)
+
     # 初始化数据处理模块
     file_engine = MADataHandler()
 
     # 读入输入数据，并将生成的Bar事件放入事件优先队列
     file_engine.load_file(CONST["THIS_PATH"] + "/MovingAverage/510300_20210101_20211231.csv")
+    datetimes = file_engine.dataframe["UpdateDateTime"].values
+    closes = file_engine.dataframe["Close"].values
     file_engine.publish_bar()
 
+    # 如果提供了事件日志文件地址，则在其他模块之前初始化事件日志模块
+    if journal_path_ is not None:
+        EventJournalWriter(path_=journal_path_)
+
     # 初始化交易所、投资组合、投资顾问模块
     executor = ExchangeUnion()
     portfolio = HoldingUnion()
     strategy = StrategyUnion(factory_=MAStrategyUnit)
 
+    # 在投资组合模块之后初始化绩效指标模块
+    analytics = PortfolioAnalytics(portfolio_=portfolio)
+    ledger = TradeLedger(method_="FIFO")
+
     # 投资组合注入起始资金
     portfolio.subscribe(amount_=INIT_CASH)
 
@@ -58,17 +89,328 @@ def test():
                                          last_datetime_=executor.last_datetime))
     strategy.register(MAStrategyUnit(symbol_="510300.SH", short_=7, long_=23, volume_=100000))
 
+    # 混合方式下，Price事件由收盘价生成（见bar_slicer），以收盘价序列预先计算交易信号
+    if hybrid_:
+        strategy.schedule_signals(symbol_="510300.SH", datetimes_=datetimes, prices_=closes)
+
+    # 投资组合买入标的的起始持仓，交易记录模块同时记录起始持仓的持仓批次
+    init_fill = Event(type_="Fill", datetime_=executor.last_datetime,
+                      info_=Info.FillInfo(uid_=ID_ALLOCATOR.next(), symbol_="510300.SH",
+                                          datetime_=executor.last_datetime,
+                                          direction_=1, open_or_close_=1,
+                                          filled_price_=5.131, volume_=100000))
+    portfolio.on_fill(init_fill)
+    ledger.on_fill(init_fill)
+
+    # 运行事件队列
+    EVENT_QUEUE.run()
+
+    # 输出绩效指标
+    for name, value in analytics.metrics.items():
+        print("{:s}: {:.6f}".format(name, value))
+
+    # 输出成交回合统计
+    trades = ledger.to_frame()
+    print("trades: {:d}, win rate: {:.6f}, pnl: {:.2f}".format(
+        len(trades), (trades["pnl"] > 0).mean() if len(trades) > 0 else 0.0, trades["pnl"].sum()))
+
+    # 保存结果
+    EVENT_LOGGER.to_file(path_=CONST["QUEUE_PATH"])
+    STRATEGY_LOGGER.to_file(path_=CONST["STRATEGY_PATH"])
+    PORTFOLIO_LOGGER.to_file(path_=CONST["PORTFOLIO_PATH"])
+    ledger.to_file(path_=CONST["TRADE_PATH"])
+
+
+def test_replay(journal_path_: str = CONST["JOURNAL_PATH"]):
+    """
+    test_replay：回放test()记录的事件日志，仅运行交易所和投资组合模块，用于快速检验投资组合规则的修改
+    @journal_path_(str)：事件日志文件地址，默认为CONST["JOURNAL_PATH"]
+    """
+
+    # 初始化交易所、投资组合模块，不初始化投资顾问模块
+    executor = ExchangeUnion()
+    portfolio = HoldingUnion()
+
+    # 投资组合注入起始资金
+    portfolio.subscribe(amount_=INIT_CASH)
+
+    # 初始化回测样例使用的标的的单位模块
+    executor.register(PseudoExchangeUnit(symbol_="510300.SH", crt_price_=5.131,
+                                         last_datetime_=executor.last_datetime, bar_slicer_=bar_slicer))
+    portfolio.register(PseudoHoldingUnit(symbol_="510300.SH", crt_price_=5.131,
+                                         last_datetime_=executor.last_datetime))
+
     # 投资组合买入标的的起始持仓
     portfolio.on_fill(Event(type_="Fill", datetime_=executor.last_datetime,
-                            info_=Info.FillInfo(uid_=uuid.uuid4(), symbol_="510300.SH",
+                            info_=Info.FillInfo(uid_=ID_ALLOCATOR.next(), symbol_="510300.SH",
                                                 datetime_=executor.last_datetime,
                                                 direction_=1, open_or_close_=1,
                                                 filled_price_=5.131, volume_=100000)))
 
+    # 回放事件日志
+    replay(path_=journal_path_)
+
+    # 保存结果
+    EVENT_LOGGER.to_file(path_=CONST["QUEUE_PATH"])
+    PORTFOLIO_LOGGER.to_file(path_=CONST["PORTFOLIO_PATH"])
+
+
+def test_fan_out(init_cashes_: tuple = (INIT_CASH, INIT_CASH / 2, INIT_CASH * 2)):
+    """
+    test_fan_out：在一次运行中，以同一数据、策略事件流驱动多个投资组合，每个投资组合与各自的交易所模块配对
+    数据读取、Bar切片、策略计算仅进行一次，编号为0的投资组合与test()相同，交易策略跟随其成交回报
+    @init_cashes_(tuple)：各个投资组合的起始资金，依次对应编号0, 1, 2, ...
+    """
+
+    # 初始化数据处理模块，读入输入数据，并将生成的Bar事件放入事件优先队列
+    file_engine = MADataHandler()
+    file_engine.load_file(CONST["THIS_PATH"] + "/MovingAverage/510300_20210101_20211231.csv")
+    file_engine.publish_bar()
+
+    # 初始化投资顾问模块
+    strategy = StrategyUnion(factory_=MAStrategyUnit)
+    strategy.register(MAStrategyUnit(symbol_="510300.SH", short_=7, long_=23, volume_=100000))
+
+    # 检验：在各投资组合之前记录每个信号原始的数量和预算金额，在各投资组合之后检验共用的信号未被修改；
+    # 委托在信号处理之后才被处理，且卖出委托的时间戳晚于信号，因此按(标的代码, 交易方向)对应最近一个信号
+    originals = dict()
+    order_volumes = {book_: list() for book_ in range(len(init_cashes_))}
+
+    def snapshot_signal(event: Event) -> None:
+        signal: Info.SignalInfo = event.info
+        originals[(signal.symbol, signal.direction)] = (signal.uid, signal.volume, signal.amount)
+
+    def check_signal(event: Event) -> None:
+        signal: Info.SignalInfo = event.info
+        uid_, volume_, amount_ = originals[(signal.symbol, signal.direction)]
+        assert (signal.uid, signal.volume, signal.amount) == (uid_, volume_, amount_), "shared signal modified"
+
+    def check_order(event: Event) -> None:
+        order: Info.OrderInfo = event.info
+        original = originals.get((order.symbol, order.direction))
+        if original is not None:
+            assert order.volume <= original[1], "order volume exceeds the original signal"
+            order_volumes[order.book].append((order.volume, original[1]))
+
+    EVENT_QUEUE.register("Signal", snapshot_signal)
+    EVENT_QUEUE.register("Order", check_order)
+
+    # 每个投资组合初始化各自的交易所、投资组合模块和投资组合记录模块，编号为0的投资组合使用PORTFOLIO_LOGGER
+    loggers = list()
+    for book_, init_cash_ in enumerate(init_cashes_):
+        logger_ = PORTFOLIO_LOGGER if book_ == 0 else LoggerStringUnit(head_="cash,amount,asset,debt,net_asset,"
+                                                                             "share,net_price")
+        loggers.append(logger_)
+
+        executor = ExchangeUnion(book_=book_)
+        portfolio = HoldingUnion(book_=book_, logger_=logger_)
+        portfolio.subscribe(amount_=init_cash_)
+
+        executor.register(PseudoExchangeUnit(symbol_="510300.SH", crt_price_=5.131,
+                                             last_datetime_=executor.last_datetime, bar_slicer_=bar_slicer))
+        portfolio.register(PseudoHoldingUnit(symbol_="510300.SH", crt_price_=5.131,
+                                             last_datetime_=executor.last_datetime))
+
+        # 投资组合买入标的的起始持仓
+        portfolio.on_fill(Event(type_="Fill", datetime_=executor.last_datetime,
+                                info_=Info.FillInfo(uid_=ID_ALLOCATOR.next(), symbol_="510300.SH",
+                                                    datetime_=executor.last_datetime,
+                                                    direction_=1, open_or_close_=1,
+                                                    filled_price_=5.131, volume_=100000, book_=book_)))
+
+    EVENT_QUEUE.register("Signal", check_signal)
+
     # 运行事件队列
     EVENT_QUEUE.run()
 
-    # 保存结果
+    # 各投资组合按原始信号下单：输出每个投资组合的委托数量，以及其中按原始信号数量全额下单的数量
+    for book_, volumes in order_volumes.items():
+        print("book {:d}: {:d} orders, {:d} at the original signal volume".format(
+            book_, len(volumes), sum(1 for volume_, original_ in volumes if volume_ == original_)))
+
+    # 保存结果，编号不为0的投资组合记录保存为PortfolioLog_<编号>.csv
     EVENT_LOGGER.to_file(path_=CONST["QUEUE_PATH"])
     STRATEGY_LOGGER.to_file(path_=CONST["STRATEGY_PATH"])
-    PORTFOLIO_LOGGER.to_file(path_=CONST["PORTFOLIO_PATH"])
+    for book_, logger_ in enumerate(loggers):
+        if book_ == 0:
+            logger_.to_file(path_=CONST["PORTFOLIO_PATH"])
+        else:
+            logger_.to_file(path_=CONST["PORTFOLIO_PATH"][:-len(".csv")] + "_{:d}.csv".format(book_))
+
+
+def test_screening(portfolio_path_: str = CONST["PORTFOLIO_PATH"], top_: int = 5):
+    """
+    test_screening：以向量化方式初筛移动均线策略的参数组合，并与test()记录的投资组合结果比较，检验向量化结果的偏差
+    @portfolio_path_(str)：test()保存的投资组合记录文件地址，默认为CONST["PORTFOLIO_PATH"]
+    @top_(int)：按最终净资产选出的候选参数组合数量，默认为5
+    """
+
+    # 读入输入数据，Price事件由收盘价生成
+    file_engine = MADataHandler()
+    file_engine.load_file(CONST["THIS_PATH"] + "/MovingAverage/510300_20210101_20211231.csv")
+    dates = file_engine.dataframe["UpdateDateTime"].dt.normalize().values
+    closes = file_engine.dataframe["Close"].values.astype(numpy.float64)
+
+    # 与test()相同的起始资金、起始持仓和费率
+    portfolio = VectorizedPortfolio(subject_=PseudoHoldingUnit(symbol_="510300.SH", crt_price_=5.131),
+                                    init_cash_=INIT_CASH, init_volume_=100000, init_price_=5.131)
+
+    # 校准：参数组合(7, 23)的净资产与事件驱动回测每个交易日最后一次记录的净资产比较
+    net_assets = screen(closes, shorts_=[7], longs_=[23], volume_=100000, portfolio_=portfolio)[0]
+    log = pandas.read_csv(portfolio_path_, encoding="GB2312")
+    log["date"] = pandas.to_datetime(log["datetime"]).dt.normalize()
+    log = log.groupby("date").last()
+    idx = numpy.searchsorted(dates, log.index.values)
+    mask = (idx < len(dates)) & (dates[numpy.minimum(idx, len(dates) - 1)] == log.index.values)
+    diff = net_assets[idx[mask]] - log["net_asset"].values[mask]
+    print("calibration on {:d} days: max abs diff {:.2f}, max rel diff {:.4%}, final diff {:.2f}".format(
+        int(mask.sum()), numpy.abs(diff).max(), (numpy.abs(diff) / log["net_asset"].values[mask]).max(), diff[-1]))
+
+    # 初筛：一次性计算所有参数组合的净资产，选出候选参数组合交由事件驱动回测
+    shorts, longs = numpy.meshgrid(numpy.arange(3, 16), numpy.arange(10, 61, 2))
+    shorts, longs = shorts.ravel(), longs.ravel()
+    keep = shorts < longs
+    shorts, longs = shorts[keep], longs[keep]
+    net_assets = screen(closes, shorts_=shorts, longs_=longs, volume_=100000, portfolio_=portfolio)
+    for k in VectorizedPortfolio.shortlist(net_assets, top_=top_):
+        print("short {:d}, long {:d}: final net asset {:.2f}".format(shorts[k], longs[k], net_assets[k, -1]))
+
+
+def test_batch(portfolio_path_: str = CONST["PORTFOLIO_PATH"], top_: int = 5):
+    """
+    test_batch：在一次运行中，以同一数据事件流同时评估100个移动均线策略的参数组合，各参数组合由各自的轻量投资组合成交
+    参数组合(7, 23)的结果与test()保存的投资组合记录比较，检验轻量投资组合的偏差
+    @portfolio_path_(str)：test()保存的投资组合记录文件地址，默认为CONST["PORTFOLIO_PATH"]
+    @top_(int)：按最终净资产选出的候选参数组合数量，默认为5
+    """
+
+    # 初始化数据处理模块，读入输入数据，并将生成的Bar事件放入事件优先队列
+    file_engine = MADataHandler()
+    file_engine.load_file(CONST["THIS_PATH"] + "/MovingAverage/510300_20210101_20211231.csv")
+    file_engine.publish_bar()
+
+    # 交易所模块仅用于将Bar事件切分为Price事件，不初始化投资组合模块
+    executor = ExchangeUnion()
+    executor.register(PseudoExchangeUnit(symbol_="510300.SH", crt_price_=5.131,
+                                         last_datetime_=executor.last_datetime, bar_slicer_=bar_slicer))
+
+    # 10 x 10的参数网格，包含(7, 23)
+    shorts, longs = numpy.meshgrid(numpy.arange(3, 13), numpy.arange(14, 33, 2) + 1)
+    strategy = StrategyUnion(factory_=MABatchStrategyUnit)
+    batch = MABatchStrategyUnit(shorts_=shorts.ravel(), longs_=longs.ravel(), init_cash_=INIT_CASH,
+                                init_volume_=100000, init_price_=5.131, symbol_="510300.SH", volume_=100000)
+    strategy.register(batch)
+
+    # 运行事件队列
+    EVENT_QUEUE.run()
+
+    # 参数组合(7, 23)与事件驱动回测每个交易日最后一次记录的净资产比较
+    frame = batch.to_frame()
+    log = pandas.read_csv(portfolio_path_, encoding="GB2312")
+    log = log.groupby(pandas.to_datetime(log["datetime"]).dt.normalize())["net_asset"].last()
+    diff = (frame["7_23"].groupby(frame.index.normalize()).last() - log).dropna()
+    print("calibration on {:d} days: max abs diff {:.2f}, final diff {:.2f}".format(
+        len(diff), diff.abs().max(), diff.iloc[-1]))
+
+    for name, value in frame.iloc[-1].sort_values(ascending=False).iloc[:top_].items():
+        print("{:s}: final net asset {:.2f}".format(name, value))
+
+
+def test_adjust(method_: str = "forward"):
+    """
+    test_adjust：以示例除权除息表（1次现金分红、1次送转）对回测样例的行情数据复权，检验复权因子和复权价格缓存
+    回测样例为未经除权除息的示例数据，除权除息日的复权价格跳变仅用于展示复权因子的计算
+    @method_(str)：复权方式，forward（前复权）或backward（后复权），默认为forward
+    """
+
+    # 示例除权除息表：每份分红0.072，10送5
+    actions = CorporateActions()
+    actions.load_frame(pandas.DataFrame({"symbol": ["510300.SH", "510300.SH"],
+                                         "ex_date": ["2021-01-18", "2021-07-01"],
+                                         "dividend": [0.072, 0.0], "split": [1.0, 1.5]}))
+
+    # 第一次复权计算并写入缓存，第二次读取缓存
+    for _ in range(2):
+        file_engine = MADataHandler()
+        file_engine.load_file(CONST["THIS_PATH"] + "/MovingAverage/510300_20210101_20211231.csv")
+        start = time.perf_counter()
+        file_engine.adjust(actions_=actions, method_=method_)
+        print("adjust: {:.6f}s".format(time.perf_counter() - start))
+
+    # 除权除息日前后的原始价格、复权价格和复权因子
+    frame = file_engine.dataframe
+    jumps = numpy.flatnonzero(numpy.diff(frame["AdjFactor"].values)) + 1
+    for i in jumps:
+        print(frame.iloc[i - 1:i + 1][["RawClose", "Close", "AdjFactor"]])
+
+    # 原始价格由复权价格除以复权因子还原
+    print("max restore error: {:.3e}".format(
+        numpy.abs(frame["Close"].values / frame["AdjFactor"].values - frame["RawClose"].values).max()))
+
+    # 复权因子随Bar事件传递，Bar事件的原始收盘价与RawClose列相同
+    bars = list(file_engine.bar_iterator())
+    print("max bar restore error: {:.3e}".format(
+        max(abs(bar.info.to_raw_price(bar.info.close) - raw) for bar, raw in zip(bars, frame["RawClose"].values))))
+
+
+def volume_slicer(bar: Info.BarInfo):
+    """
+    volume_slicer：将Bar按开盘价、最高价、最低价、收盘价拆分为4个Price事件，Bar的成交数量平均分配给各个Price事件
+    @bar(Info.BarInfo)：给定的标的的报价成交数据
+    @return(Generator)：包含“标的在一个时刻的价格数据”信息的Price事件的生成器
+    """
+
+    for i, price_ in enumerate((bar.open, bar.high, bar.low, bar.close)):
+        datetime_ = bar.datetime + pandas.Timedelta(seconds=i)
+        yield Event(type_="Price", datetime_=datetime_,
+                    info_=Info.PriceInfo(symbol_=bar.symbol, datetime_=datetime_, crt_price_=price_,
+                                         volume_=bar.volume / 4, adj_factor_=bar.adj_factor))
+
+
+def test_participation(participation_rate_: float = 0.1, n_bars_: int = 5, bar_volume_: float = 8000):
+    """
+    test_participation：以参与率撮合方式撮合一个大额买入委托，Bar由拆分成交数量的volume_slicer拆分为Price事件，
+    检验每个Bar内累计成交数量不超过Bar成交数量的给定比例，委托部分成交直至全部成交
+    @participation_rate_(float)：参与率，默认为0.1
+    @n_bars_(int)：Bar数量，默认为5
+    @bar_volume_(float)：每个Bar的成交数量，默认为8000
+    """
+
+    executor = ExchangeUnion(participation_rate_=participation_rate_)
+    executor.register(PseudoExchangeUnit(symbol_="510300.SH", crt_price_=5.131,
+                                         last_datetime_=executor.last_datetime, bar_slicer_=volume_slicer))
+
+    # 按成交时间戳所在的分钟（即所在的Bar）累计成交数量
+    filled = dict()
+
+    def record_fill(event: Event) -> None:
+        minute = event.datetime.floor("min")
+        filled[minute] = filled.get(minute, 0) + event.info.volume
+
+    def record_fill_batch(event: Event) -> None:
+        minute = event.datetime.floor("min")
+        filled[minute] = filled.get(minute, 0) + float(event.info.volumes.sum())
+
+    EVENT_QUEUE.register("Fill", record_fill)
+    EVENT_QUEUE.register("FillBatch", record_fill_batch)
+
+    # 委托价格高于所有Bar的价格，每个Price事件均可成交，成交数量仅受参与率限制
+    datetime_ = CONST["START_TIME"] + pandas.Timedelta(hours=9, minutes=30)
+    order = Info.OrderInfo(symbol_="510300.SH", datetime_=datetime_, direction_=1, open_or_close_=1,
+                           price_=6.0, volume_=3000, order_type_="TBF")
+    EVENT_QUEUE.put(Event(type_="Order", datetime_=datetime_, info_=order))
+    for i in range(n_bars_):
+        bar_datetime = datetime_ + pandas.Timedelta(minutes=i + 1)
+        EVENT_QUEUE.put(Event(type_="Bar", datetime_=bar_datetime,
+                              info_=Info.BarInfo(symbol_="510300.SH", datetime_=bar_datetime, open_=5.13,
+                                                 high_=5.15, low_=5.12, close_=5.14, volume_=bar_volume_,
+                                                 turnover_=bar_volume_ * 5.14)))
+
+    # 运行事件队列
+    EVENT_QUEUE.run()
+
+    cap = participation_rate_ * bar_volume_
+    for minute, volume_ in sorted(filled.items()):
+        print("{:s}: filled {:.0f} (cap {:.0f})".format(str(minute), volume_, cap))
+        assert volume_ <= cap, "fills exceed the participation cap"
+    assert sum(filled.values()) == min(order.volume, cap * n_bars_), "order not filled up to the cap"
@@ -0,0 +1,206 @@
+from Event.Event import Event
+from Event.EventHandler import (PriceHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler)
+from Event.EventQueue import EVENT_QUEUE
+from BaseType.Const import CONST
+from BaseType.ExchangeRate import FX_RATES
+from Portfolio.Holding import HoldingUnion
+import Information.Info as Info
+import math
+
+# ANNUAL_PERIODS（年化周期数）：每年的Clear事件数量，用于计算年化收益率、波动率和夏普比率
+CONST["ANNUAL_PERIODS"] = 252
+
+
+class PortfolioAnalytics(PriceHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler):
+    """
+    PortfolioAnalytics(PriceHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler)：
+    回测框架中，随事件流在线计算投资组合绩效指标的模块，不读写投资组合记录
+    可处理事件：Price（可选，采样日内净值）、Fill、FillBatch、Clear、END
+    每个Clear事件以投资组合的净值计算一次收益率，以Welford方法更新收益率的均值和方差，并更新净值峰值和最大回撤；
+    Fill、FillBatch事件累计成交笔数和以人民币（CNY）为单位的成交金额；所有状态均为O(1)，END事件时计算指标（metrics）
+    应当在投资组合模块之后初始化，使得Clear事件在投资组合更新净值之后处理
+    """
+
+    __slots__ = ["portfolio", "annual_periods", "sample_every", "ticks",
+                 "count", "mean", "m2", "first_price", "last_price", "peak", "max_drawdown",
+                 "net_count", "net_mean", "fills", "bid_fills", "ask_fills", "traded", "ended", "metrics"]
+    _name = "PortfolioAnalytics"
+
+    def __init__(self, portfolio_: HoldingUnion, annual_periods_: int = CONST["ANNUAL_PERIODS"],
+                 sample_every_: int = 0):
+        """
+        @portfolio_(HoldingUnion)：投资组合模块
+        @annual_periods_(int)：每年的Clear事件数量，默认为CONST["ANNUAL_PERIODS"]
+        @sample_every_(int)：每隔给定数量的Price事件采样一次日内净值，仅用于更新净值峰值和最大回撤，默认为0（不采样）
+        采样在单位持仓模块处理Price事件之前进行，采样净值不含当前Price事件的价格变动
+        """
+
+        EVENT_QUEUE.register("Fill", self.on_fill)
+        EVENT_QUEUE.register("FillBatch", self.on_fill_batch)
+        EVENT_QUEUE.register("Clear", self.on_clear)
+        EVENT_QUEUE.register("END", self.on_end)
+        if sample_every_ > 0:
+            EVENT_QUEUE.register("Price", self.on_price)
+
+        self.portfolio = portfolio_
+        self.annual_periods = annual_periods_
+        self.sample_every = sample_every_
+        self.ticks = 0
+
+        # count、mean、m2：收益率的数量、均值和离差平方和
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+        # first_price、last_price：首个、上一个净值；peak、max_drawdown：净值峰值、最大回撤
+        self.first_price = None
+        self.last_price = None
+        self.peak = None
+        self.max_drawdown = 0.0
+
+        # net_count、net_mean：净资产的数量、均值，用于计算换手率
+        self.net_count = 0
+        self.net_mean = 0.0
+
+        # fills、bid_fills、ask_fills：成交笔数；traded：以人民币（CNY）为单位的成交金额（不含费用和税费），与净资产单位相同
+        self.fills = 0
+        self.bid_fills = 0
+        self.ask_fills = 0
+        self.traded = 0.0
+
+        # 交易所模块在END事件中发出最后一个Clear事件，END事件之后的Clear事件处理后重新计算指标
+        self.ended = False
+        self.metrics = dict()
+
+    def update_peak(self, net_price_: float) -> None:
+        """
+        update_peak：根据给定净值更新净值峰值和最大回撤
+        @net_price_(float)：给定净值
+        @return(None)
+        """
+
+        if self.peak is None or net_price_ > self.peak:
+            self.peak = net_price_
+        elif self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, 1 - net_price_ / self.peak)
+
+    def on_price(self, event: Event) -> None:
+        """
+        on_price：接收并处理Price事件，每隔sample_every个Price事件，以投资组合的现金余额和持仓现值计算一次日内净值
+        @event(Event)：接收的Price事件
+        @return(None)
+        """
+
+        self.ticks += 1
+        if self.ticks < self.sample_every:
+            return
+        self.ticks = 0
+
+        portfolio = self.portfolio
+        if portfolio.share > 0:
+            amount = sum(holding.crt_amount for holding in portfolio.holdings.values())
+            self.update_peak((portfolio.wallet.get_total() + amount - portfolio.debt) / portfolio.share)
+
+    def on_fill(self, event: Event) -> None:
+        """
+        on_fill：接收并处理Fill事件，累计成交笔数和成交金额，成交金额按标的的乘数和当前结汇汇率换算为人民币（CNY）
+        @event(Event)：接收的Fill事件
+        @return(None)
+        """
+
+        fill: Info.FillInfo = event.info
+        if fill.book != self.portfolio.book:
+            return
+
+        self.fills += 1
+        if fill.direction == 1:
+            self.bid_fills += 1
+        else:
+            self.ask_fills += 1
+
+        holding = self.portfolio.get_holding(symbol_=fill.symbol)
+        rate = float(FX_RATES.to_rates[holding.currency_id])
+        self.traded += round(fill.filled_price * fill.volume * holding.multiplier * rate, ndigits=2)
+
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        on_fill_batch：接收并处理FillBatch事件，累计成交笔数和成交金额，成交金额按标的的乘数和当前结汇汇率换算为人民币（CNY）
+        @event(Event)：接收的FillBatch事件
+        @return(None)
+        """
+
+        batch: Info.FillBatchInfo = event.info
+        if batch.book != self.portfolio.book:
+            return
+
+        n = len(batch.uids)
+        self.fills += n
+        if batch.direction == 1:
+            self.bid_fills += n
+        else:
+            self.ask_fills += n
+
+        holding = self.portfolio.get_holding(symbol_=batch.symbol)
+        amounts = FX_RATES.to_cny_amounts(holding.currency_id, batch.filled_prices * batch.volumes * holding.multiplier)
+        self.traded += float(amounts.sum())
+
+    def on_clear(self, event: Event) -> None:
+        """
+        on_clear：接收并处理Clear事件，以投资组合的净值更新收益率的均值和方差、净值峰值和最大回撤
+        @event(Event)：接收的Clear事件
+        @return(None)
+        """
+
+        net_price = self.portfolio.net_price
+        if self.first_price is None:
+            self.first_price = net_price
+        elif self.last_price > 0:
+            ret = net_price / self.last_price - 1
+            self.count += 1
+            delta = ret - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (ret - self.mean)
+        self.last_price = net_price
+        self.update_peak(net_price)
+
+        self.net_count += 1
+        self.net_mean += (self.portfolio.net_asset - self.net_mean) / self.net_count
+
+        if self.ended:
+            self.metrics = self.get_metrics()
+
+    def get_metrics(self) -> dict:
+        """
+        get_metrics：计算当前的绩效指标
+        @return(dict)：绩效指标，包括总收益率、年化收益率、年化波动率、夏普比率、最大回撤、成交笔数、成交金额和换手率
+        """
+
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        total_return = self.last_price / self.first_price - 1 if self.first_price else 0.0
+        annual_return = (1 + total_return) ** (self.annual_periods / self.count) - 1 \
+            if self.count > 0 and total_return > -1 else 0.0
+
+        return {
+            "periods": self.count,
+            "total_return": total_return,
+            "annual_return": annual_return,
+            "mean_return": self.mean,
+            "volatility": std * math.sqrt(self.annual_periods),
+            "sharpe": self.mean / std * math.sqrt(self.annual_periods) if std > 0 else 0.0,
+            "max_drawdown": self.max_drawdown,
+            "fills": self.fills,
+            "bid_fills": self.bid_fills,
+            "ask_fills": self.ask_fills,
+            "traded": self.traded,
+            "turnover": self.traded / self.net_mean if self.net_mean > 0 else 0.0,
+        }
+
+    def on_end(self, event: Event) -> None:
+        """
+        on_end：接收并处理END事件，计算绩效指标并保存在metrics中
+        @event(Event)：接收的END事件
+        @return(None)
+        """
+
+        self.ended = True
+        self.metrics = self.get_metrics()
@@ -1,4 +1,3 @@
-import uuid
 from BaseType.PriorityQueue import PriorityQueue
 from Information.Info import (SignalInfo)
 
@@ -18,10 +17,10 @@ class BidSignalQueue(PriorityQueue):
         if s.direction == 1:
             super().put(s)
 
-    def cancel(self, uid_: uuid.UUID):
+    def cancel(self, uid_: int):
         """
         cancel：根据给定的信号ID撤销对应信号
-        @uid_(uuid.UUID)：信号ID
+        @uid_(int)：信号ID
         @return(None)
         """
 
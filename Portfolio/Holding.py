@@ -1,19 +1,23 @@
-from BaseType.Subject import Subject
+from BaseType.Subject import (Subject, time_delta)
 from Event.Event import Event
-from Event.EventHandler import (PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHandler)
+from Event.EventHandler import (PriceHandler, SignalHandler, FillHandler, FillBatchHandler, ExpireHandler,
+                                ClearHandler, ENDHandler)
 from Event.EventQueue import EVENT_QUEUE
-from pandas.tseries.offsets import DateOffset
+from pandas import Timestamp
 from Logger.Logger import LoggerStringUnit
+from Logger.LogPolicy import LOG_POLICY
 from BaseType.Const import CONST
 from collections import defaultdict
 from Portfolio.BidSignalQueue import BidSignalQueue
 from Information.Info import SIGNAL_MAP_ORDER
-import uuid
 from BaseType.CashFlow import (CashFlow, cashflow_exchange)
 from Portfolio.Wallet import Wallet
+from Information.OrderState import (ORDER_STATE, RESTING)
+from Information.IdAllocator import ID_ALLOCATOR
 import Information.Info as Info
 from typing import Optional
-from BaseType.ExchangeRate import amount_from_cny
+from BaseType.ExchangeRate import (amount_from_cny, FX_RATES)
+import numpy
 
 
 class PortfolioInfo(Info.Info):
@@ -146,7 +150,8 @@ class PseudoHoldingUnit(Subject, PriceHandler, FillHandler):
         self.last_datetime = event.datetime
         self.crt_price = price.crt_price
 
-        self.refresh()
+        # 现价变化只影响现值，其余金额在成交、汇率更新时重新计算
+        self.refresh_price()
 
     def on_fill(self, event: Event) -> None:
         """
@@ -171,12 +176,44 @@ class PseudoHoldingUnit(Subject, PriceHandler, FillHandler):
 
         self.refresh()
 
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        on_fill_batch：接收并处理FillBatch事件，一次性更新加权成本价和持仓数量
+        @event(Event)：接收的FillBatch事件
+        @return(None)
+        """
+
+        batch: Info.FillBatchInfo = event.info
 
-class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHandler):
+        self.last_datetime = batch.datetime
+        self.crt_price = float(batch.filled_prices[-1])
+
+        # 逐笔更新加权成本价时，持仓成本等于累计成交金额，仅在持仓数量归零时清零
+        # 因此从最后一次持仓数量归零之后的成交开始，按成交金额汇总后一次更新
+        volumes = self.volume + numpy.cumsum(batch.volumes) * batch.direction
+        flows = batch.filled_prices * batch.volumes * batch.direction
+        zeros = numpy.flatnonzero(volumes == 0)
+        if len(zeros) > 0:
+            cost = float(flows[zeros[-1] + 1:].sum())
+        else:
+            cost = self.open_price * self.volume + float(flows.sum())
+
+        tmp_volume = float(volumes[-1])
+        if tmp_volume == 0:
+            self.open_price = 0
+        else:
+            self.open_price = cost / tmp_volume
+        self.volume = tmp_volume
+
+        self.refresh()
+
+
+class HoldingUnion(PriceHandler, SignalHandler, FillHandler, FillBatchHandler, ExpireHandler, ClearHandler,
+                   ENDHandler):
     """
-    HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHandler)：
+    HoldingUnion(PriceHandler, SignalHandler, FillHandler, FillBatchHandler, ExpireHandler, ClearHandler, ENDHandler)：
     回测框架中，投资组合（Portfolio）体系中使用的以投资组合/基金/集合理财产品为单位的交易模块
-    可处理事件：Price、Signal、Fill、Clear、END
+    可处理事件：Price、Signal、Fill、FillBatch、Expire、Clear、END
     如果有继承PseudoHoldingUnit类的自定义单位交易模块，初始化时需要提交单位交易模块的初始化方法
     """
 
@@ -185,19 +222,28 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
     __slots__ = ["last_datetime", "share", "cash_available", "net_price",
                  "amount", "asset", "debt", "net_asset", "net_last"]
 
-    def __init__(self, factory_=PseudoHoldingUnit):
+    def __init__(self, factory_=PseudoHoldingUnit, book_: int = 0, logger_: LoggerStringUnit = None):
         """
         @factory_(单位交易模块初始化方法)：继承PseudoHoldingUnit类的自定义单位交易模块，默认为PseudoHoldingUnit
+        @book_(int)：投资组合编号，默认为0
+        @logger_(LoggerStringUnit)：投资组合记录模块，默认为None（使用PORTFOLIO_LOGGER）
+        多个投资组合共用同一数据、策略事件流时，每个投资组合使用不同的编号，并与相同编号的交易所模块配对：
+        发出的Order、Cancel类事件带有当前编号，仅处理相同编号的Fill、FillBatch、Expire事件；
+        每个投资组合复制接收的信号后再处理，不修改共用的信号，编号不为0的投资组合的信号副本分配新的信号ID
         """
 
         # 在EVENT_QUEUE中注册投资组合（Portfolio）体系中的事件处理方法
-        EVENT_QUEUE.register("Price", self.on_price)
+        # Price事件由单位持仓模块通过订阅直接处理，不经过当前模块
         EVENT_QUEUE.register("Signal", self.on_signal)
         EVENT_QUEUE.register("Fill", self.on_fill)
+        EVENT_QUEUE.register("FillBatch", self.on_fill_batch)
+        EVENT_QUEUE.register("Expire", self.on_expire)
         EVENT_QUEUE.register("Clear", self.on_clear)
         EVENT_QUEUE.register("END", self.on_end)
 
         self.unit_factory = factory_
+        self.book = book_
+        self.logger = PORTFOLIO_LOGGER if logger_ is None else logger_
 
         self.share = 0
 
@@ -211,13 +257,17 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         self.net_price = 1
         self.net_last = 1
         self.holdings = dict()
-        self.handlers = dict()
         self.bid_queue = BidSignalQueue()
-        self.active_orders = defaultdict(set)
+
+        # active_orders：进行中的委托ID到标的代码的映射；active_symbols：标的代码到进行中的委托ID集合的映射
+        self.active_orders = dict()
         self.active_symbols = defaultdict(set)
 
         self.last_datetime = CONST["START_TIME"]
 
+        # fx_version：最近一次重新计算持仓金额时FX_RATES的版本号
+        self.fx_version = FX_RATES.version
+
     def time_offset(self, offset: str = CONST["TIME_OFFSET"], times: int = CONST["TIME_OFFSET_TIMES"]) -> None:
         """
         time_offset：模块内的最新时间戳的时间流逝
@@ -226,8 +276,8 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         @return(None)
         """
 
-        # 调用pandas.tseries.offsets.DateOffset方法
-        self.last_datetime = self.last_datetime + DateOffset(**{offset: times})
+        # 使用缓存的时间间隔
+        self.last_datetime = self.last_datetime + time_delta(offset, times)
 
     def refresh(self) -> None:
         """
@@ -262,6 +312,15 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         return PortfolioInfo(cash_=self.cash, amount_=self.amount, asset_=self.asset, debt_=self.debt,
                              net_asset_=self.net_asset, share_=self.share, net_price_=self.net_price)
 
+    def log_info(self) -> None:
+        """
+        log_info：记录规则允许时，在投资组合记录模块中记录当前交易模块的信息
+        @return(None)
+        """
+
+        if LOG_POLICY.allow("Portfolio", self.last_datetime):
+            self.logger.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+
     def reset_price(self) -> None:
         """
         reset_price：将模块的净值重置为1.0000，当前份额设置为当前净资产的值
@@ -284,7 +343,7 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
             self.share = share_
 
             self.refresh()
-            PORTFOLIO_LOGGER.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+            self.log_info()
 
     def subscribe(self, amount_: float, currency_: str = "CNY") -> None:
         """
@@ -302,7 +361,7 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         # self.share += round(amount_ / self.net_price, 2)
 
         self.refresh()
-        PORTFOLIO_LOGGER.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+        self.log_info()
 
     def redeem_amount(self, amount_: float, currency_: str = "CNY") -> Optional[CashFlow]:
         """
@@ -349,7 +408,7 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         self.debt += flow.to_cny()
 
         self.refresh()
-        PORTFOLIO_LOGGER.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+        self.log_info()
 
     def repay(self, amount_: float, currency_: str = "CNY") -> Optional[CashFlow]:
         """
@@ -368,14 +427,14 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
     def register(self, holding: PseudoHoldingUnit) -> None:
         """
         register：当前的投资组合/基金/集合理财产品模块中，注册给定的单位持仓模块
+        单位持仓模块直接在EVENT_QUEUE中订阅其标的代码（symbol）的Price事件
         @holding(PseudoHoldingUnit)：给定的单位持仓模块
         @return(None)
         """
 
         if holding.symbol not in self.holdings:
             self.holdings[holding.symbol] = holding
-            self.handlers[(holding.symbol, "Price")] = holding.on_price
-            self.handlers[(holding.symbol, "Fill")] = holding.on_fill
+            EVENT_QUEUE.register("Price", holding.on_price, symbol_=holding.symbol)
 
     def get_holding(self, symbol_: str) -> PseudoHoldingUnit:
         """
@@ -396,7 +455,7 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
 
     def on_price(self, event: Event) -> None:
         """
-        on_price：接收并处理Price事件
+        on_price：接收并处理Price事件，仅用于直接调用，事件队列中的Price事件由单位持仓模块通过订阅直接处理
         @event(Event)：接收的Price事件
         @return(None)
         """
@@ -406,69 +465,79 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         self.last_datetime = price.datetime
 
         # 将Price事件交给标的代码（symbol）对应的单位持仓模块处理
-        if price.symbol in self.holdings:
-            self.handlers[(price.symbol, "Price")](event)
+        holding = self.holdings.get(price.symbol)
+        if holding is not None:
+            holding.on_price(event)
 
-    def cancel(self, uid_: uuid.UUID, symbol_: str) -> None:
+    def cancel(self, uid_: int, symbol_: str) -> None:
         """
         cancel：根据给定的委托ID、标的代码，撤回对应的交易委托
-        @uid_(uuid.UUID)：委托ID
+        @uid_(int)：委托ID
         @symbol_(str)：标的代码
         @return(None)
         """
 
-        # 根据给定的委托ID、标的代码，释放对应的冻结资金
-        self.wallet.release(uid_=uid_, symbol_=symbol_)
+        # 根据给定的委托ID，释放对应的冻结资金
+        self.wallet.release(uid_=uid_)
 
-        # 如果存在委托ID（uid）的进行中的委托，且进行中的委托中包含标的代码（symbol），则撤回对应的交易委托
-        if uid_ in self.active_orders and symbol_ in self.active_orders[uid_]:
-            self.time_offset()
-            # EVENT_QUEUE.put(Event.CancelEvent(uid_=uid_, symbol_=symbol_,
-            #                                   datetime_=self.last_datetime, direction_=1))
-            # EVENT_QUEUE.put(Event.CancelEvent(uid_=uid_, symbol_=symbol_,
-            #                                   datetime_=self.last_datetime, direction_=-1))
-            EVENT_QUEUE.put(Event(type_="Cancel", datetime_=self.last_datetime,
-                                  info_=Info.CancelInfo(uid_=uid_, symbol_=symbol_,
-                                                        datetime_=self.last_datetime, direction_=1)))
-            EVENT_QUEUE.put(Event(type_="Cancel", datetime_=self.last_datetime,
-                                  info_=Info.CancelInfo(uid_=uid_, symbol_=symbol_,
-                                                        datetime_=self.last_datetime, direction_=-1)))
-            self.active_orders[uid_].remove(symbol_)
+        # 如果存在委托ID（uid）的进行中的委托，且进行中的委托的标的代码为给定标的代码（symbol），则撤回对应的交易委托
+        # 仅对仍在交易委托队列中的交易方向发出Cancel事件，已全部成交或已撤回的委托不再发出
+        if self.active_orders.get(uid_) == symbol_:
+            directions = ORDER_STATE.resting(uid_, symbol_)
+            if directions:
+                self.time_offset()
+                for direction_ in directions:
+                    EVENT_QUEUE.put(Event(type_="Cancel", datetime_=self.last_datetime,
+                                          info_=Info.CancelInfo(uid_=uid_, symbol_=symbol_,
+                                                                datetime_=self.last_datetime, direction_=direction_,
+                                                                book_=self.book)))
+            del self.active_orders[uid_]
+            self.active_symbols[symbol_].discard(uid_)
+
+        ORDER_STATE.settle(uid_, symbol_)
 
     def cancel_symbol(self, symbol_: str) -> None:
         """
         cancel_symbol：根据给定的标的代码，撤回对应的交易委托
+        一次性释放对应的冻结资金，并向事件队列放入一个CancelSymbol事件，由交易所撤回该标的早于事件时间戳的所有委托
         @symbol_(str)：标的代码
         @return(None)
         """
 
-        for uid_ in self.active_symbols[symbol_]:
-            self.cancel(uid_=uid_, symbol_=symbol_)
+        # 标的代码（symbol）对应的进行中的委托ID
+        uids = self.active_symbols.pop(symbol_, ())
+        if not uids:
+            return
+
+        self.wallet.release_orders(uids_=uids)
+        for uid_ in uids:
+            ORDER_STATE.remove(uid_, symbol_)
+            self.active_orders.pop(uid_, None)
 
-        self.active_symbols[symbol_].clear()
+        self.time_offset()
+        EVENT_QUEUE.put(Event(type_="CancelSymbol", datetime_=self.last_datetime,
+                              info_=Info.CancelSymbolInfo(symbol_=symbol_, datetime_=self.last_datetime,
+                                                          book_=self.book)))
 
     def cancel_all(self) -> None:
         """
         cancel_all：撤回当前投资组合的所有交易委托
+        一次性释放所有冻结资金，并向事件队列放入一个CancelAll事件，由交易所撤回早于事件时间戳的所有委托
         @return(None)
         """
 
         # 释放所有冻结资金
         self.wallet.release_all()
 
-        for uid_, symbols in self.active_orders.items():
-            for symbol_ in symbols:
-                # EVENT_QUEUE.put(Event.CancelEvent(uid_=uid_, symbol_=symbol_,
-                #                                   datetime_=self.last_datetime, direction_=1))
-                # EVENT_QUEUE.put(Event.CancelEvent(uid_=uid_, symbol_=symbol_,
-                #                                   datetime_=self.last_datetime, direction_=-1))
-                EVENT_QUEUE.put(Event(type_="Cancel", datetime_=self.last_datetime,
-                                      info_=Info.CancelInfo(uid_=uid_, symbol_=symbol_,
-                                                            datetime_=self.last_datetime, direction_=1)))
-                EVENT_QUEUE.put(Event(type_="Cancel", datetime_=self.last_datetime,
-                                      info_=Info.CancelInfo(uid_=uid_, symbol_=symbol_,
-                                                            datetime_=self.last_datetime, direction_=-1)))
-        self.active_orders = defaultdict(set)
+        for uid_, symbol_ in self.active_orders.items():
+            ORDER_STATE.remove(uid_, symbol_)
+
+        if self.active_orders:
+            self.time_offset()
+            EVENT_QUEUE.put(Event(type_="CancelAll", datetime_=self.last_datetime,
+                                  info_=Info.CancelAllInfo(datetime_=self.last_datetime, book_=self.book)))
+        self.active_orders = dict()
+        self.active_symbols = defaultdict(set)
 
     def on_fill(self, event: Event) -> None:
         """
@@ -479,6 +548,10 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
 
         fill: Info.FillInfo = event.info
 
+        # 不处理其他投资组合的Fill事件
+        if fill.book != self.book:
+            return
+
         self.last_datetime = fill.datetime
 
         # 如果标的代码（symbol）未注册，且Fill事件为买入开仓委托成交，则通过事件中的FillInfo生成单位持仓模块并注册
@@ -489,7 +562,7 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
 
         # 否则，将Fill事件交给标的代码（symbol）对应的单位持仓模块处理
         elif fill.symbol in self.holdings:
-            self.handlers[(fill.symbol, "Fill")](event)
+            self.holdings[fill.symbol].on_fill(event)
 
         # 获取标的代码（symbol）对应的单位持仓模块
         holding = self.get_holding(symbol_=fill.symbol)
@@ -506,6 +579,63 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
             self.wallet.process_full_fill(fill=fill, cash_flow_=flow)
             self.cancel(uid_=fill.uid, symbol_=fill.symbol)
 
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        on_fill_batch：接收并处理FillBatch事件，一次性处理同一标的、同一交易方向上多个委托成交的持仓和资金变动
+        @event(Event)：接收的FillBatch事件
+        @return(None)
+        """
+
+        batch: Info.FillBatchInfo = event.info
+
+        # 不处理其他投资组合的FillBatch事件
+        if batch.book != self.book:
+            return
+
+        self.last_datetime = batch.datetime
+
+        # 与Fill事件相同：标的代码（symbol）未注册时，仅在包含买入开仓委托成交时生成单位持仓模块并注册
+        if batch.symbol in self.holdings or (batch.direction == 1 and (batch.open_or_closes == 1).any()):
+            self.get_holding(symbol_=batch.symbol).on_fill_batch(event)
+
+        # 获取标的代码（symbol）对应的单位持仓模块
+        holding = self.get_holding(symbol_=batch.symbol)
+
+        # 按数组批量计算成交所涉及的现金变动（含每笔的定额费用），由Wallet一次计入
+        amounts = holding.volumes_to_amounts(volumes_=batch.volumes, prices_=batch.filled_prices,
+                                             direction_=batch.direction)
+        self.wallet.process_fill_batch(batch=batch, amounts_=amounts)
+
+        # 完全成交的委托，撤回同一委托ID（uid）且同一标的代码（symbol）对应的交易委托
+        for uid_, partial_ in zip(batch.uids, batch.partials.tolist()):
+            if not partial_:
+                self.cancel(uid_=uid_, symbol_=batch.symbol)
+
+    def on_expire(self, event: Event) -> None:
+        """
+        on_expire：接收并处理Expire事件，一次性释放到期委托的冻结资金，并移除进行中的委托记录
+        @event(Event)：接收的Expire事件
+        @return(None)
+        """
+
+        expire: Info.ExpireInfo = event.info
+
+        # 不处理其他投资组合的Expire事件
+        if expire.book != self.book:
+            return
+
+        self.last_datetime = event.datetime
+
+        self.wallet.release_orders(uids_=expire.uids)
+        for uid_, symbol_ in zip(expire.uids, expire.symbols):
+            ORDER_STATE.settle(uid_, symbol_)
+            if self.active_orders.get(uid_) == symbol_:
+                del self.active_orders[uid_]
+                self.active_symbols[symbol_].discard(uid_)
+
+        # 释放的资金可用于买入信号优先队列（BidSignalQueue）中的买入信号
+        self.process_bid_signal_queue()
+
     def put_bid_order(self, order: Info.OrderInfo, amount_: float) -> None:
         """
         put_bid_order：根据给定的买入交易委托信息和预计冻结金额，发出交易委托并冻结相应资金
@@ -519,9 +649,10 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         EVENT_QUEUE.put(Event(type_="Order", datetime_=self.last_datetime, info_=order))
 
         # 按照买入委托预计占用的金额冻结资金
-        self.wallet.freeze(uid_=order.uid, symbol_=order.symbol, currency_="CNY", amount_=amount_)
-        self.active_orders[order.uid].add(order.symbol)
+        self.wallet.freeze(uid_=order.uid, currency_="CNY", amount_=amount_)
+        self.active_orders[order.uid] = order.symbol
         self.active_symbols[order.symbol].add(order.uid)
+        ORDER_STATE.set(order.uid, order.symbol, order.direction, RESTING)
 
     def process_bid_signal(self, signal: Info.SignalInfo, holding: PseudoHoldingUnit) -> None:
         """
@@ -539,7 +670,8 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
             self.put_bid_order(order=Info.OrderInfo(symbol_=signal.symbol, datetime_=self.last_datetime,
                                                     direction_=signal.direction, open_or_close_=signal.open_or_close,
                                                     price_=signal.price, volume_=signal.volume,
-                                                    uid_=signal.uid, order_type_=SIGNAL_MAP_ORDER[signal.signal_type]),
+                                                    uid_=signal.uid, order_type_=SIGNAL_MAP_ORDER[signal.signal_type],
+                                                    book_=self.book),
                                amount_=signal.amount)
 
             rest_volume = 0
@@ -553,8 +685,10 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
                 self.put_bid_order(order=Info.OrderInfo(symbol_=signal.symbol, datetime_=self.last_datetime,
                                                         direction_=signal.direction,
                                                         open_or_close_=signal.open_or_close,
-                                                        price_=signal.price, volume_=tmp_volume, uid_=uuid.UUID(),
-                                                        order_type_=SIGNAL_MAP_ORDER[signal.signal_type]),
+                                                        price_=signal.price, volume_=tmp_volume,
+                                                        uid_=ID_ALLOCATOR.next(),
+                                                        order_type_=SIGNAL_MAP_ORDER[signal.signal_type],
+                                                        book_=self.book),
                                    amount_=holding.volume_to_amount(volume_=tmp_volume,
                                                                     price_=signal.price, direction_=1))
 
@@ -584,7 +718,8 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
             self.put_bid_order(order=Info.OrderInfo(symbol_=signal.symbol, datetime_=self.last_datetime,
                                                     direction_=signal.direction, open_or_close_=signal.open_or_close,
                                                     price_=signal.price, volume_=signal.volume,
-                                                    uid_=signal.uid, order_type_=SIGNAL_MAP_ORDER[signal.signal_type]),
+                                                    uid_=signal.uid, order_type_=SIGNAL_MAP_ORDER[signal.signal_type],
+                                                    book_=self.book),
                                amount_=signal.amount)
 
         if self.bid_queue.is_empty():
@@ -601,8 +736,9 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
             self.put_bid_order(order=Info.OrderInfo(symbol_=signal.symbol, datetime_=self.last_datetime,
                                                     direction_=signal.direction,
                                                     open_or_close_=signal.open_or_close,
-                                                    price_=signal.price, volume_=tmp_volume, uid_=uuid.UUID(),
-                                                    order_type_=SIGNAL_MAP_ORDER[signal.signal_type]),
+                                                    price_=signal.price, volume_=tmp_volume, uid_=ID_ALLOCATOR.next(),
+                                                    order_type_=SIGNAL_MAP_ORDER[signal.signal_type],
+                                                    book_=self.book),
                                amount_=holding.volume_to_amount(volume_=tmp_volume,
                                                                 price_=signal.price, direction_=1))
 
@@ -636,9 +772,26 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
                                                        direction_=signal.direction,
                                                        open_or_close_=signal.open_or_close,
                                                        price_=signal.price, volume_=tmp_volume, uid_=signal.uid,
-                                                       order_type_=SIGNAL_MAP_ORDER[signal.signal_type])))
-            self.active_orders[signal.uid].add(signal.symbol)
+                                                       order_type_=SIGNAL_MAP_ORDER[signal.signal_type],
+                                                       book_=self.book)))
+            self.active_orders[signal.uid] = signal.symbol
             self.active_symbols[signal.symbol].add(signal.uid)
+            ORDER_STATE.set(signal.uid, signal.symbol, signal.direction, RESTING)
+
+    def advance_exchange_rate(self, datetime_: Timestamp) -> None:
+        """
+        advance_exchange_rate：将汇率历史推进到给定时间戳，汇率更新时重新计算非人民币（CNY）持仓的金额
+        多个投资组合共用FX_RATES，汇率可能已由其他投资组合推进，因此比较FX_RATES的版本号，而不使用advance的返回值
+        @datetime_(pandas.Timestamp)：给定时间戳
+        @return(None)
+        """
+
+        FX_RATES.advance(datetime_=datetime_)
+        if self.fx_version != FX_RATES.version:
+            self.fx_version = FX_RATES.version
+            for holding in self.holdings.values():
+                if holding.currency != "CNY":
+                    holding.refresh()
 
     def on_signal(self, event: Event) -> None:
         """
@@ -649,7 +802,12 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
 
         signal: Info.SignalInfo = event.info
 
+        # 每个投资组合均处理信号的副本，不修改共用的信号，信号的剩余部分可能放入各自的买入信号优先队列；
+        # 编号为0的投资组合沿用原信号ID，其余投资组合分配新的信号ID
+        signal = signal.copy(uid_=signal.uid if self.book == 0 else None)
+
         self.last_datetime = signal.datetime
+        self.advance_exchange_rate(datetime_=self.last_datetime)
 
         # 获取标的代码（symbol）对应的单位持仓模块
         holding = self.get_holding(symbol_=signal.symbol)
@@ -668,11 +826,12 @@ class HoldingUnion(PriceHandler, SignalHandler, FillHandler, ClearHandler, ENDHa
         """
 
         self.last_datetime = event.datetime
+        self.advance_exchange_rate(datetime_=self.last_datetime)
 
         self.refresh()
         self.process_bid_signal_queue()
 
-        PORTFOLIO_LOGGER.log(obj=self.get_info(), committer=self._name, datetime_=self.last_datetime)
+        self.log_info()
 
         print("{:s}: {:4f}".format(str(self.last_datetime), self.net_price))
 
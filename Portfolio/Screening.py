@@ -0,0 +1,174 @@
+from BaseType.Subject import Subject
+from BaseType.ExchangeRate import TO_CNY
+import numpy
+
+
+class VectorizedPortfolio(object):
+    """
+    VectorizedPortfolio(object)：回测框架中，用于批量初筛参数组合的向量化投资组合
+    对于单一标的的收盘价序列，以及K个参数组合在每个价格上的目标持仓数量（K x T），一次性计算所有组合的资金和净资产曲线；
+    交易按收盘价全部成交，费用、税费按给定Subject的费率、定额计算（与Subject.volume_to_cash_flow相同），交易数量按每手数量取整；
+    不考虑可用资金、可卖数量不足时信号被忽略或排队的情形，结果与事件驱动回测的偏差见MovingAverage/test.py中的test_screening
+    """
+
+    __slots__ = ["subject", "init_cash", "init_volume", "init_price"]
+
+    def __init__(self, subject_: Subject, init_cash_: float, init_volume_: float = 0, init_price_: float = None):
+        """
+        @subject_(Subject)：提供每手数量、费率、定额和货币代码的标的对象，如PseudoHoldingUnit
+        @init_cash_(float)：起始资金（人民币）
+        @init_volume_(float)：起始持仓数量，默认为0
+        @init_price_(float)：起始持仓的买入价格，默认为None（不计起始持仓的买入成本）
+        """
+
+        self.subject = subject_
+        self.init_cash = init_cash_
+        self.init_volume = init_volume_
+        self.init_price = init_price_
+
+    def round_lots(self, volumes_: numpy.ndarray) -> numpy.ndarray:
+        """
+        round_lots：将给定的交易数量按每手数量向零取整
+        @volumes_(numpy.ndarray)：给定的交易数量
+        @return(numpy.ndarray)：取整后的交易数量
+        """
+
+        per_hand = self.subject.per_hand
+        return numpy.trunc(numpy.asarray(volumes_, dtype=numpy.float64) / per_hand) * per_hand
+
+    def cash_flows(self, trades_: numpy.ndarray, prices_: numpy.ndarray) -> numpy.ndarray:
+        """
+        cash_flows：对于给定的交易数量（买入为正，卖出为负）和成交价格，批量计算以人民币（CNY）为单位的资金变动
+        @trades_(numpy.ndarray)：交易数量
+        @prices_(numpy.ndarray)：成交价格，可以按最后一维广播
+        @return(numpy.ndarray)：资金变动，买入为负，卖出为正，未交易为0
+        """
+
+        s = self.subject
+        gross = numpy.abs(trades_) * prices_
+
+        # 买入所需金额、卖出所得金额，计算方式与Subject.volume_to_cash_flow相同
+        bid = gross * (1 + s.bid_commission_rate + s.bid_tax_rate) + (s.bid_commission + s.bid_tax)
+        ask = numpy.maximum(gross / (1 - s.ask_commission_rate - s.ask_tax_rate) - (s.ask_commission + s.ask_tax), 0)
+
+        flows = numpy.where(trades_ > 0, -bid, numpy.where(trades_ < 0, ask, 0.0))
+        return flows * TO_CNY[s.currency]
+
+    def run(self, prices_: numpy.ndarray, positions_: numpy.ndarray) -> (numpy.ndarray, numpy.ndarray):
+        """
+        run：根据收盘价序列和各参数组合的目标持仓数量，计算各参数组合在每个价格上的现金余额和净资产
+        @prices_(numpy.ndarray)：收盘价序列，长度为T
+        @positions_(numpy.ndarray)：目标持仓数量，K x T，应当已按每手数量取整
+        @return(numpy.ndarray, numpy.ndarray)：现金余额、净资产，均为K x T，保留2位小数
+        """
+
+        prices_ = numpy.asarray(prices_, dtype=numpy.float64)
+        positions_ = numpy.atleast_2d(numpy.asarray(positions_, dtype=numpy.float64))
+        rate = TO_CNY[self.subject.currency]
+
+        # 起始资金扣除起始持仓的买入成本
+        cash0 = self.init_cash
+        if self.init_volume and self.init_price is not None:
+            cash0 += float(self.cash_flows(numpy.array(self.init_volume, dtype=numpy.float64), self.init_price))
+
+        # 每个价格上的交易数量为目标持仓数量的变动，资金变动累加得到现金余额
+        trades = numpy.diff(positions_, axis=1, prepend=self.init_volume)
+        cash = numpy.round(cash0 + numpy.cumsum(self.cash_flows(trades, prices_), axis=1), 2)
+        amounts = numpy.round(positions_ * prices_ * self.subject.multiplier * rate, 2)
+
+        return cash, numpy.round(cash + amounts, 2)
+
+    @staticmethod
+    def shortlist(net_assets_: numpy.ndarray, top_: int) -> numpy.ndarray:
+        """
+        shortlist：按最终净资产从高到低选出前top_个参数组合，作为事件驱动回测的候选
+        @net_assets_(numpy.ndarray)：净资产，K x T
+        @top_(int)：选出的参数组合数量
+        @return(numpy.ndarray)：选出的参数组合下标
+        """
+
+        final = numpy.asarray(net_assets_)[:, -1]
+        return numpy.argsort(-final, kind="stable")[:top_]
+
+
+class ShadowBook(object):
+    """
+    ShadowBook(object)：回测框架中，随事件流逐笔更新的K个轻量投资组合，每个投资组合对应一个参数组合的交易策略
+    现金余额、持仓数量均以长度为K的numpy.ndarray保存，一次成交处理所有参数组合；成交规则与HoldingUnion处理FOW信号相同：
+    可用资金足够时按信号价格全部买入，持仓数量足够时全部卖出，否则忽略信号（不进入买入信号优先队列）
+    """
+
+    __slots__ = ["portfolio", "bid_factor", "bid_fixed", "ask_factor", "ask_fixed", "cash", "volumes",
+                 "datetimes", "history"]
+
+    def __init__(self, subject_: Subject, k_: int, init_cash_: float, init_volume_: float = 0,
+                 init_price_: float = None):
+        """
+        @subject_(Subject)：提供每手数量、费率、定额和货币代码的标的对象
+        @k_(int)：投资组合数量
+        @init_cash_(float)：起始资金（人民币）
+        @init_volume_(float)：起始持仓数量，默认为0
+        @init_price_(float)：起始持仓的买入价格，默认为None（不计起始持仓的买入成本）
+        """
+
+        # 费用、税费的计算由VectorizedPortfolio提供
+        self.portfolio = VectorizedPortfolio(subject_=subject_, init_cash_=init_cash_, init_volume_=init_volume_,
+                                             init_price_=init_price_)
+
+        # 买入所需金额、卖出所得金额的系数和定额，与Subject.volume_to_cash_flow相同
+        self.bid_factor = 1 + subject_.bid_commission_rate + subject_.bid_tax_rate
+        self.bid_fixed = subject_.bid_commission + subject_.bid_tax
+        self.ask_factor = 1 / (1 - subject_.ask_commission_rate - subject_.ask_tax_rate)
+        self.ask_fixed = subject_.ask_commission + subject_.ask_tax
+
+        cash0 = init_cash_
+        if init_volume_ and init_price_ is not None:
+            cash0 += float(self.portfolio.cash_flows(numpy.array(init_volume_, dtype=numpy.float64), init_price_))
+
+        self.cash = numpy.full(k_, round(cash0, 2))
+        self.volumes = numpy.full(k_, float(init_volume_))
+
+        # datetimes、history：每次记录的时间戳，以及对应的K个投资组合的净资产
+        self.datetimes = list()
+        self.history = list()
+
+    def execute(self, trades_: numpy.ndarray, price_: float) -> None:
+        """
+        execute：按给定价格处理各投资组合的交易数量（买入为正，卖出为负，0为不交易），资金或持仓不足的交易被忽略
+        @trades_(numpy.ndarray)：交易数量，长度为K
+        @price_(float)：成交价格
+        @return(None)
+        """
+
+        # 与VectorizedPortfolio.cash_flows相同，按标量价格减少运算次数；不交易时资金变动为0
+        gross = trades_ * price_
+        flows = numpy.where(trades_ > 0, -gross * self.bid_factor - self.bid_fixed,
+                            numpy.maximum(-gross * self.ask_factor - self.ask_fixed, 0.0))
+        flows *= TO_CNY[self.portfolio.subject.currency]
+
+        # 买入时资金不足、卖出时持仓不足的交易被忽略
+        valid = (self.cash + flows >= 0) & (self.volumes + trades_ >= 0)
+        self.cash = numpy.round(self.cash + flows * valid, 2)
+        self.volumes = self.volumes + trades_ * valid
+
+    def net_assets(self, price_: float) -> numpy.ndarray:
+        """
+        net_assets：按给定价格计算各投资组合的净资产
+        @price_(float)：标的现价
+        @return(numpy.ndarray)：净资产，长度为K，保留2位小数
+        """
+
+        s = self.portfolio.subject
+        amounts = numpy.round(self.volumes * price_ * s.multiplier * TO_CNY[s.currency], 2)
+        return numpy.round(self.cash + amounts, 2)
+
+    def record(self, datetime_, price_: float) -> None:
+        """
+        record：按给定价格记录各投资组合在给定时间戳的净资产
+        @datetime_(pandas.Timestamp)：给定时间戳
+        @price_(float)：标的现价
+        @return(None)
+        """
+
+        self.datetimes.append(datetime_)
+        self.history.append(self.net_assets(price_))
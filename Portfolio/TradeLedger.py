@@ -0,0 +1,305 @@
+from Event.Event import Event
+from Event.EventHandler import (PriceHandler, FillHandler, FillBatchHandler, ENDHandler)
+from Event.EventQueue import EVENT_QUEUE
+from BaseType.Const import CONST
+from collections import deque
+import Information.Info as Info
+import pandas
+
+# TRADE_PATH：成交回合记录的默认输出文件地址
+CONST["TRADE_PATH"] = CONST["THIS_PATH"] + "/log/TradeLog.csv"
+
+# 成交回合记录的列名
+TRADE_COLUMN = ["symbol", "side", "open_datetime", "close_datetime", "volume", "open_price", "close_price",
+                "pnl", "holding_period", "mae", "mfe"]
+
+# 持仓批次的匹配方式：先进先出、后进先出、加权平均
+MATCH_METHOD = {"FIFO", "LIFO", "AVG"}
+
+
+class Lot(object):
+    """
+    Lot(object)：交易记录模块中尚未平仓的持仓批次
+    high、low为该批次开仓至下一批次开仓之间（最后一个批次为开仓至今）的最高价、最低价
+    """
+
+    __slots__ = ["seq", "volume", "price", "datetime", "high", "low"]
+
+    def __init__(self, seq_: int, volume_: float, price_: float, datetime_):
+        """
+        @seq_(int)：批次序号
+        @volume_(float)：数量
+        @price_(float)：开仓价格
+        @datetime_(pandas.Timestamp)：开仓时间戳
+        """
+
+        self.seq = seq_
+        self.volume = volume_
+        self.price = price_
+        self.datetime = datetime_
+        self.high = price_
+        self.low = price_
+
+
+class LotBook(object):
+    """
+    LotBook(object)：交易记录模块中单一标的的持仓批次
+    FIFO方式下，以单调队列维护各批次区间最高价、最低价的后缀极值，最早批次的极值为队首，每个价格、每个批次各进出队列一次；
+    LIFO、AVG方式下，仅更新最后一个批次的区间极值，最后一个批次全部平仓时将其区间极值并入前一批次
+    """
+
+    __slots__ = ["side", "lots", "seq", "highs", "lows"]
+
+    def __init__(self):
+        # side：持仓方向，多头为1，空头为-1，无持仓为0
+        self.side = 0
+        self.lots = deque()
+        self.seq = 0
+
+        # highs、lows：FIFO方式下，(批次序号, 区间极值)的单调递减、单调递增队列
+        self.highs = deque()
+        self.lows = deque()
+
+    def push_extreme(self, seq_: int, price_: float) -> None:
+        """
+        push_extreme：FIFO方式下，将给定批次区间内的价格加入单调队列
+        @seq_(int)：批次序号
+        @price_(float)：价格
+        @return(None)
+        """
+
+        highs, lows = self.highs, self.lows
+        while highs and highs[-1][1] <= price_:
+            highs.pop()
+        highs.append((seq_, price_))
+        while lows and lows[-1][1] >= price_:
+            lows.pop()
+        lows.append((seq_, price_))
+
+    def pop_extreme(self, seq_: int) -> None:
+        """
+        pop_extreme：FIFO方式下，移除给定批次及更早批次的区间极值
+        @seq_(int)：批次序号
+        @return(None)
+        """
+
+        while self.highs and self.highs[0][0] <= seq_:
+            self.highs.popleft()
+        while self.lows and self.lows[0][0] <= seq_:
+            self.lows.popleft()
+
+
+class TradeLedger(PriceHandler, FillHandler, FillBatchHandler, ENDHandler):
+    """
+    TradeLedger(PriceHandler, FillHandler, FillBatchHandler, ENDHandler)：
+    回测框架中，根据Fill、FillBatch事件还原成交回合（开仓至平仓）的交易记录模块
+    可处理事件：Price、Fill、FillBatch、END
+    每个标的的持仓批次按FIFO、LIFO或AVG方式匹配，平仓时记录一个成交回合的盈亏、持仓时间和持仓期间最大不利/有利变动（MAE/MFE）；
+    每个Fill、Price事件的处理为均摊O(1)，记录结果以列为单位保存
+    """
+
+    __slots__ = ["method", "book", "books", "data"]
+    _name = "TradeLedger"
+
+    def __init__(self, method_: str = "FIFO", book_: int = 0):
+        """
+        @method_(str)：持仓批次的匹配方式，FIFO、LIFO或AVG，默认为FIFO
+        @book_(int)：投资组合编号，仅处理相同编号的Fill、FillBatch事件，默认为0
+        """
+
+        if method_ not in MATCH_METHOD:
+            raise ValueError("match method {:s} not supported".format(str(method_)))
+
+        EVENT_QUEUE.register("Price", self.on_price)
+        EVENT_QUEUE.register("Fill", self.on_fill)
+        EVENT_QUEUE.register("FillBatch", self.on_fill_batch)
+        EVENT_QUEUE.register("END", self.on_end)
+
+        self.method = method_
+        self.book = book_
+
+        # books：标的代码到持仓批次的映射；data：成交回合记录，列名见TRADE_COLUMN
+        self.books = dict()
+        self.data = {name: list() for name in TRADE_COLUMN}
+
+    def on_price(self, event: Event) -> None:
+        """
+        on_price：接收并处理Price事件，更新给定标的最后一个持仓批次的区间极值
+        @event(Event)：接收的Price事件
+        @return(None)
+        """
+
+        lots = self.books.get(event.info.symbol)
+        if lots is None or not lots.lots:
+            return
+
+        price_ = event.info.crt_price
+        self.update_extreme(lots=lots, price_=price_)
+
+    def update_extreme(self, lots: LotBook, price_: float) -> None:
+        """
+        update_extreme：以给定价格更新给定标的最后一个持仓批次的区间极值
+        @lots(LotBook)：给定标的的持仓批次
+        @price_(float)：给定价格
+        @return(None)
+        """
+
+        last = lots.lots[-1]
+        if price_ > last.high:
+            last.high = price_
+        elif price_ < last.low:
+            last.low = price_
+        if self.method == "FIFO":
+            lots.push_extreme(seq_=last.seq, price_=price_)
+
+    def on_fill(self, event: Event) -> None:
+        """
+        on_fill：接收并处理Fill事件
+        @event(Event)：接收的Fill事件
+        @return(None)
+        """
+
+        fill: Info.FillInfo = event.info
+        if fill.book != self.book:
+            return
+
+        self.process(symbol_=fill.symbol, datetime_=fill.datetime, direction_=fill.direction,
+                     price_=fill.filled_price, volume_=fill.volume)
+
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        on_fill_batch：接收并处理FillBatch事件，依次处理其中的每笔成交
+        @event(Event)：接收的FillBatch事件
+        @return(None)
+        """
+
+        batch: Info.FillBatchInfo = event.info
+        if batch.book != self.book:
+            return
+
+        for price_, volume_ in zip(batch.filled_prices.tolist(), batch.volumes.tolist()):
+            self.process(symbol_=batch.symbol, datetime_=batch.datetime, direction_=batch.direction,
+                         price_=price_, volume_=volume_)
+
+    def process(self, symbol_: str, datetime_, direction_: int, price_: float, volume_: float) -> None:
+        """
+        process：处理一笔成交：与持仓方向相反时按匹配方式平仓，剩余数量按成交方向开仓
+        @symbol_(str)：标的代码
+        @datetime_(pandas.Timestamp)：成交时间戳
+        @direction_(int)：成交方向，买入为1，卖出为-1
+        @price_(float)：成交价格
+        @volume_(float)：成交数量
+        @return(None)
+        """
+
+        lots = self.books.get(symbol_)
+        if lots is None:
+            lots = self.books[symbol_] = LotBook()
+
+        if lots.lots:
+            self.update_extreme(lots=lots, price_=price_)
+
+        # 与持仓方向相反的成交，按匹配方式逐个平仓
+        while volume_ > 0 and lots.lots and lots.side == -direction_:
+            lot = lots.lots[0] if self.method == "FIFO" else lots.lots[-1]
+            matched = min(volume_, lot.volume)
+            self.record(symbol_=symbol_, lots=lots, lot=lot, volume_=matched, price_=price_, datetime_=datetime_)
+            lot.volume -= matched
+            volume_ -= matched
+
+            if lot.volume <= 0:
+                if self.method == "FIFO":
+                    lots.lots.popleft()
+                    lots.pop_extreme(seq_=lot.seq)
+                else:
+                    lots.lots.pop()
+                    # 最后一个批次全部平仓后，其区间极值并入前一批次
+                    if lots.lots:
+                        prev = lots.lots[-1]
+                        prev.high = max(prev.high, lot.high)
+                        prev.low = min(prev.low, lot.low)
+
+        if not lots.lots:
+            lots.side = 0
+
+        if volume_ <= 0:
+            return
+
+        # 剩余数量按成交方向开仓；AVG方式下并入唯一的持仓批次
+        lots.side = direction_
+        if self.method == "AVG" and lots.lots:
+            lot = lots.lots[-1]
+            lot.price = (lot.price * lot.volume + price_ * volume_) / (lot.volume + volume_)
+            lot.volume += volume_
+        else:
+            lots.seq += 1
+            lots.lots.append(Lot(seq_=lots.seq, volume_=volume_, price_=price_, datetime_=datetime_))
+            if self.method == "FIFO":
+                lots.push_extreme(seq_=lots.seq, price_=price_)
+
+    def record(self, symbol_: str, lots: LotBook, lot: Lot, volume_: float, price_: float, datetime_) -> None:
+        """
+        record：记录给定持仓批次的一个成交回合（不含费用和税费）
+        @symbol_(str)：标的代码
+        @lots(LotBook)：标的的持仓批次
+        @lot(Lot)：平仓的持仓批次
+        @volume_(float)：平仓数量
+        @price_(float)：平仓价格
+        @datetime_(pandas.Timestamp)：平仓时间戳
+        @return(None)
+        """
+
+        # FIFO方式下最早批次的区间极值为单调队列的队首，LIFO、AVG方式下为最后一个批次的区间极值
+        if self.method == "FIFO":
+            high, low = lots.highs[0][1], lots.lows[0][1]
+        else:
+            high, low = lot.high, lot.low
+
+        side = lots.side
+        adverse, favorable = (low, high) if side == 1 else (high, low)
+
+        data = self.data
+        data["symbol"].append(symbol_)
+        data["side"].append(side)
+        data["open_datetime"].append(lot.datetime)
+        data["close_datetime"].append(datetime_)
+        data["volume"].append(volume_)
+        data["open_price"].append(lot.price)
+        data["close_price"].append(price_)
+        data["pnl"].append(side * (price_ - lot.price) * volume_)
+        data["holding_period"].append(datetime_ - lot.datetime)
+        data["mae"].append(side * (adverse - lot.price) / lot.price if lot.price else 0.0)
+        data["mfe"].append(side * (favorable - lot.price) / lot.price if lot.price else 0.0)
+
+    def __len__(self):
+        return len(self.data["symbol"])
+
+    def to_frame(self) -> pandas.DataFrame:
+        """
+        to_frame：将成交回合记录转换为pandas.DataFrame
+        @return(pandas.DataFrame)：成交回合记录
+        """
+
+        return pandas.DataFrame(self.data, columns=TRADE_COLUMN)
+
+    def to_file(self, path_: str = CONST["TRADE_PATH"], encoding_: str = "GB2312") -> None:
+        """
+        to_file：将成交回合记录输出到给定的.csv或.parquet文件
+        @path_(str)：给定输出文件地址，默认为CONST["TRADE_PATH"]，.parquet文件需要安装pyarrow或fastparquet
+        @encoding_(str)：给定.csv输出文件编码方式，默认为GB2312
+        @return(None)
+        """
+
+        if path_.endswith((".parquet", ".pq")):
+            self.to_frame().to_parquet(path=path_)
+        else:
+            self.to_frame().to_csv(path_or_buf=path_, encoding=encoding_, index_label="index")
+
+    def on_end(self, event: Event) -> None:
+        """
+        on_end：接收并处理END事件，未平仓的持仓批次保留在books中，不记录成交回合
+        @event(Event)：接收的END事件
+        @return(None)
+        """
+
+        pass
@@ -3,7 +3,7 @@ from BaseType.ExchangeRate import (amount_to_cny, amount_from_cny)
 from collections import defaultdict
 from typing import Optional
 import Information.Info as Info
-import uuid
+import numpy
 
 
 class Wallet(object):
@@ -12,6 +12,7 @@ class Wallet(object):
     Wallet类中管理的现金统一以人民币（CNY）的形式存在
     对于其他货币的现金流入，以即时的结汇汇率进行结汇
     对于其他货币的现金流出，以即时的购汇汇率进行购汇
+    冻结资金以委托ID（整数）为键记录，每个委托ID仅对应一个标的代码
     """
 
     def __init__(self):
@@ -64,11 +65,10 @@ class Wallet(object):
         else:
             return None
 
-    def freeze(self, uid_: uuid.UUID, symbol_: str, currency_: str, amount_: float) -> None:
+    def freeze(self, uid_: int, currency_: str, amount_: float) -> None:
         """
-        freeze：根据给定的委托ID、标的代码、货币代码和委托金额，冻结可用的人民币（CNY）
-        @uid_(uuid.UUID)：委托ID
-        @symbol_(str)：标的代码
+        freeze：根据给定的委托ID、货币代码和委托金额，冻结可用的人民币（CNY）
+        @uid_(int)：委托ID
         @currency_(str)：货币代码
         @amount_(float)：给定金额
         @return(None)
@@ -76,19 +76,27 @@ class Wallet(object):
 
         tmp_amount = amount_to_cny(currency_=currency_, amount_=amount_)
         self.cash_available -= tmp_amount
-        self.cash_frozen[(uid_, symbol_)] += tmp_amount
+        self.cash_frozen[uid_] += tmp_amount
 
-    def release(self, uid_: uuid.UUID, symbol_: str) -> None:
+    def release(self, uid_: int) -> None:
         """
-        release：根据给定的委托ID、标的代码，释放对应的冻结资金
-        @uid_(uuid.UUID)：委托ID
-        @symbol_(str)：标的代码
+        release：根据给定的委托ID，释放对应的冻结资金
+        @uid_(int)：委托ID
         @return(None)
         """
 
-        # 如果委托ID、标的代码不存在对应的冻结资金，则不作处理
-        if (uid_, symbol_) in self.cash_frozen.keys():
-            self.cash_available += self.cash_frozen.pop((uid_, symbol_))
+        # 如果委托ID不存在对应的冻结资金，则不作处理
+        if uid_ in self.cash_frozen:
+            self.cash_available += self.cash_frozen.pop(uid_)
+
+    def release_orders(self, uids_: list) -> None:
+        """
+        release_orders：根据给定的一组委托ID，一次性释放对应的冻结资金
+        @uids_(list)：委托ID
+        @return(None)
+        """
+
+        self.cash_available += sum(self.cash_frozen.pop(uid_, 0.0) for uid_ in uids_)
 
     def release_all(self) -> None:
         """
@@ -109,9 +117,9 @@ class Wallet(object):
 
         amount_ = cash_flow_.to_cny()
 
-        # 如果部分成交的是买入委托，且存在委托ID、标的代码对应的冻结资金，则直接扣减冻结资金
-        if fill.direction == 1 and (fill.uid, fill.symbol) in self.cash_frozen:
-            self.cash_frozen[(fill.uid, fill.symbol)] -= amount_
+        # 如果部分成交的是买入委托，且存在委托ID对应的冻结资金，则直接扣减冻结资金
+        if fill.direction == 1 and fill.uid in self.cash_frozen:
+            self.cash_frozen[fill.uid] -= amount_
 
         # 否则，直接增减可用资金
         else:
@@ -125,9 +133,34 @@ class Wallet(object):
         @return(None)
         """
 
-        # 如果成交的是买入委托，且存在委托ID、标的代码对应的冻结资金，则先释放冻结资金
-        if fill.direction == 1 and (fill.uid, fill.symbol) in self.cash_frozen:
-            self.release(uid_=fill.uid, symbol_=fill.symbol)
+        # 如果成交的是买入委托，且存在委托ID对应的冻结资金，则先释放冻结资金
+        if fill.direction == 1 and fill.uid in self.cash_frozen:
+            self.release(uid_=fill.uid)
 
         amount_ = cash_flow_.to_cny()
         self.cash_available -= (amount_ * fill.direction)
+
+    def process_fill_batch(self, batch: Info.FillBatchInfo, amounts_: numpy.ndarray) -> None:
+        """
+        process_fill_batch：根据给定的FillBatch信息、各委托成交对应的人民币（CNY）金额，一次性处理资金变动
+        买入委托部分成交时扣减冻结资金，完全成交时释放冻结资金，可用资金的变动按数组汇总后一次计入
+        @batch(Info.FillBatchInfo)：给定的FillBatch信息
+        @amounts_(numpy.ndarray)：与委托ID相同下标的成交金额（人民币）
+        @return(None)
+        """
+
+        amounts_ = numpy.asarray(amounts_, dtype=numpy.float64)
+        released = 0.0
+
+        # 买入委托存在委托ID对应的冻结资金时，部分成交直接扣减冻结资金，完全成交先释放冻结资金
+        if batch.direction == 1 and self.cash_frozen:
+            frozen = numpy.fromiter((uid_ in self.cash_frozen for uid_ in batch.uids), dtype=bool,
+                                    count=len(batch.uids))
+            deduct = frozen & batch.partials
+            for i in numpy.flatnonzero(deduct).tolist():
+                self.cash_frozen[batch.uids[i]] -= float(amounts_[i])
+            released = sum(self.cash_frozen.pop(batch.uids[i])
+                           for i in numpy.flatnonzero(frozen & ~deduct).tolist())
+            amounts_ = amounts_[~deduct]
+
+        self.cash_available += released - float(amounts_.sum()) * batch.direction
@@ -0,0 +1,491 @@
+from Event.Event import Event
+from abc import (ABCMeta, abstractmethod)
+from Event.EventQueue import EVENT_QUEUE
+from BaseType.Const import CONST
+from collections import OrderedDict
+import Information.Info as Info
+import math
+
+# INDICATOR_CAPACITY（指标模块默认容量）：所有指标保存的数值总数上限，超出时移除不再被引用的指标
+CONST["INDICATOR_CAPACITY"] = 1000000
+
+
+class RingBuffer(object):
+    """
+    RingBuffer(object)：固定长度的环形缓冲区，写入新值时返回被覆盖的旧值，未写满时旧值为0
+    """
+
+    __slots__ = ["values", "size", "idx", "count"]
+
+    def __init__(self, size_: int):
+        """
+        @size_(int)：缓冲区长度
+        """
+
+        self.values = [0.0] * size_
+        self.size = size_
+        self.idx = 0
+        self.count = 0
+
+    def push(self, value_: float) -> float:
+        """
+        push：写入给定数值，覆盖最早写入的数值
+        @value_(float)：给定数值
+        @return(float)：被覆盖的数值，缓冲区未写满时为0
+        """
+
+        old = self.values[self.idx]
+        self.values[self.idx] = value_
+        self.idx = (self.idx + 1) % self.size
+        self.count += 1
+        return old
+
+    def is_full(self) -> bool:
+        """
+        is_full：判断缓冲区是否已写满
+        @return(bool)：缓冲区是否已写满
+        """
+
+        return self.count >= self.size
+
+
+class Indicator(object):
+    """
+    Indicator(object)：回测框架中，以标的为单位、增量更新的技术指标的基类
+    每次更新的计算量为O(1)；指标值（value）在累计数据达到周期（period）之前仅供参考，ready为False
+    此类为抽象类，子类需要实现update方法
+    """
+
+    __metaclass__ = ABCMeta
+
+    __slots__ = ["key", "period", "count", "value", "refs"]
+
+    def __init__(self, period_: int):
+        """
+        @period_(int)：指标周期
+        """
+
+        if period_ <= 0:
+            raise ValueError("period must be positive")
+
+        self.key = None
+        self.period = period_
+        self.count = 0
+        self.value = 0.0
+
+        # refs：引用当前指标的单位策略模块数量，由指标模块维护
+        self.refs = 0
+
+    @property
+    def ready(self) -> bool:
+        """
+        ready：累计数据是否已达到指标周期
+        """
+
+        return self.count >= self.period
+
+    def size(self) -> int:
+        """
+        size：指标保存的数值数量，用于指标模块计算容量
+        @return(int)：保存的数值数量
+        """
+
+        return 1
+
+    @abstractmethod
+    def update(self, price_: float) -> None:
+        """
+        强制要求子类实现update()方法
+        update：根据给定价格更新指标
+        @price_(float)：给定价格
+        @return(None)
+        """
+
+        raise NotImplementedError("update not implemented")
+
+    def update_bar(self, bar_: Info.BarInfo) -> None:
+        """
+        update_bar：根据给定的Bar信息更新指标，默认使用收盘价
+        @bar_(Info.BarInfo)：给定的Bar信息
+        @return(None)
+        """
+
+        self.update(bar_.close)
+
+
+class SMA(Indicator):
+    """
+    SMA(Indicator)：简单移动平均
+    """
+
+    __slots__ = ["ring", "sum"]
+
+    def __init__(self, period_: int):
+        super().__init__(period_=period_)
+        self.ring = RingBuffer(period_)
+        self.sum = 0.0
+
+    def size(self) -> int:
+        return self.period + 1
+
+    def update(self, price_: float) -> None:
+        self.sum = self.sum - self.ring.push(price_) + price_
+        self.count += 1
+        self.value = self.sum / self.period
+
+
+class EMA(Indicator):
+    """
+    EMA(Indicator)：指数移动平均，平滑系数为2 / (period + 1)，前period个价格的简单平均作为初始值
+    """
+
+    __slots__ = ["alpha", "sum"]
+
+    def __init__(self, period_: int):
+        super().__init__(period_=period_)
+        self.alpha = 2.0 / (period_ + 1)
+        self.sum = 0.0
+
+    def size(self) -> int:
+        return 2
+
+    def update(self, price_: float) -> None:
+        self.count += 1
+        if self.count <= self.period:
+            self.sum += price_
+            self.value = self.sum / self.count
+        else:
+            self.value += self.alpha * (price_ - self.value)
+
+
+class Variance(Indicator):
+    """
+    Variance(Indicator)：滚动方差（总体方差），以滑动窗口的Welford方法增量更新均值和离差平方和
+    """
+
+    __slots__ = ["ring", "mean", "m2"]
+
+    def __init__(self, period_: int):
+        super().__init__(period_=period_)
+        self.ring = RingBuffer(period_)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def size(self) -> int:
+        return self.period + 2
+
+    @property
+    def std(self) -> float:
+        """
+        std：滚动标准差
+        """
+
+        return math.sqrt(self.value)
+
+    def update(self, price_: float) -> None:
+        full = self.ring.is_full()
+        old = self.ring.push(price_)
+        self.count += 1
+
+        # 窗口未满时加入新值，窗口已满时以新值替换最早的值
+        if not full:
+            delta = price_ - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (price_ - self.mean)
+            n = self.count
+        else:
+            last_mean = self.mean
+            self.mean += (price_ - old) / self.period
+            self.m2 += (price_ - old) * (price_ - self.mean + old - last_mean)
+            n = self.period
+
+        # 浮点误差可能使离差平方和略小于0
+        self.value = max(self.m2, 0.0) / n
+
+
+class Bollinger(Variance):
+    """
+    Bollinger(Variance)：布林带，中轨为滚动均值，上下轨为中轨加减width倍滚动标准差，指标值（value）为中轨
+    """
+
+    __slots__ = ["width", "mid", "upper", "lower"]
+
+    def __init__(self, period_: int, width_: float = 2.0):
+        super().__init__(period_=period_)
+        self.width = width_
+        self.mid = 0.0
+        self.upper = 0.0
+        self.lower = 0.0
+
+    def size(self) -> int:
+        return self.period + 5
+
+    def update(self, price_: float) -> None:
+        super().update(price_)
+        band = self.width * math.sqrt(self.value)
+        self.mid = self.mean
+        self.upper = self.mean + band
+        self.lower = self.mean - band
+        self.value = self.mid
+
+
+class RSI(Indicator):
+    """
+    RSI(Indicator)：相对强弱指数（Wilder平滑），前period个价格变动的简单平均作为平均涨幅、平均跌幅的初始值
+    """
+
+    __slots__ = ["last", "gain", "loss"]
+
+    def __init__(self, period_: int):
+        super().__init__(period_=period_)
+        self.last = None
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def size(self) -> int:
+        return 4
+
+    @property
+    def ready(self) -> bool:
+        return self.count > self.period
+
+    def update(self, price_: float) -> None:
+        self.count += 1
+        if self.last is None:
+            self.last = price_
+            return
+
+        change = price_ - self.last
+        self.last = price_
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+
+        # 前period个价格变动取简单平均，此后按Wilder方法平滑
+        n = self.count - 1
+        if n <= self.period:
+            self.gain += (gain - self.gain) / n
+            self.loss += (loss - self.loss) / n
+        else:
+            self.gain += (gain - self.gain) / self.period
+            self.loss += (loss - self.loss) / self.period
+
+        self.value = 100.0 if self.loss == 0 else 100.0 - 100.0 / (1.0 + self.gain / self.loss)
+
+
+class ATR(Indicator):
+    """
+    ATR(Indicator)：平均真实波幅（Wilder平滑），前period个真实波幅的简单平均作为初始值
+    根据Price事件更新时，最高价、最低价、收盘价均为现价
+    """
+
+    __slots__ = ["last_close"]
+
+    def __init__(self, period_: int):
+        super().__init__(period_=period_)
+        self.last_close = None
+
+    def size(self) -> int:
+        return 3
+
+    def update(self, price_: float) -> None:
+        self.update_range(price_, price_, price_)
+
+    def update_bar(self, bar_: Info.BarInfo) -> None:
+        self.update_range(bar_.high, bar_.low, bar_.close)
+
+    def update_range(self, high_: float, low_: float, close_: float) -> None:
+        """
+        update_range：根据给定的最高价、最低价、收盘价更新指标
+        @high_(float)：最高价
+        @low_(float)：最低价
+        @close_(float)：收盘价
+        @return(None)
+        """
+
+        if self.last_close is None:
+            true_range = high_ - low_
+        else:
+            true_range = max(high_ - low_, abs(high_ - self.last_close), abs(low_ - self.last_close))
+        self.last_close = close_
+
+        self.count += 1
+        if self.count <= self.period:
+            self.value += (true_range - self.value) / self.count
+        else:
+            self.value += (true_range - self.value) / self.period
+
+
+# INDICATOR_TYPE：指标名称到指标类的映射
+INDICATOR_TYPE = {
+    "SMA": SMA,
+    "EMA": EMA,
+    "Variance": Variance,
+    "Bollinger": Bollinger,
+    "RSI": RSI,
+    "ATR": ATR,
+}
+
+
+class IndicatorService(object):
+    """
+    IndicatorService(object)：回测框架中，供多个单位策略模块共用的技术指标模块
+    指标按照（标的代码, 指标名称, 数据来源, 参数）去重，每个Price或Bar事件只更新一次，可由任意数量的单位策略模块读取；
+    指标模块在EVENT_QUEUE中注册不区分标的代码的处理方法，因此先于订阅了标的代码的单位策略模块处理同一事件；
+    不再被引用的指标暂不移除（再次订阅时无需重新积累数据），保存的数值总数超过容量时，按最早不再被引用的顺序移除
+    """
+
+    __slots__ = ["indicators", "sources", "idle", "capacity", "total", "registered"]
+    _name = "IndicatorService"
+
+    def __init__(self, capacity_: int = CONST["INDICATOR_CAPACITY"]):
+        """
+        @capacity_(int)：所有指标保存的数值总数上限，默认为CONST["INDICATOR_CAPACITY"]
+        """
+
+        # indicators：键到指标的映射；sources：数据来源（Price、Bar）到（标的代码 -> 指标列表）的映射
+        self.indicators = dict()
+        self.sources = {"Price": dict(), "Bar": dict()}
+
+        # idle：不再被引用的指标的键，按不再被引用的先后顺序排列
+        self.idle = OrderedDict()
+
+        self.capacity = capacity_
+        self.total = 0
+        self.registered = False
+
+    @staticmethod
+    def make_key(symbol_: str, name_: str, source_: str, params_: dict) -> tuple:
+        """
+        make_key：生成指标的键
+        @symbol_(str)：标的代码
+        @name_(str)：指标名称
+        @source_(str)：数据来源，Price或Bar
+        @params_(dict)：指标参数
+        @return(tuple)：指标的键
+        """
+
+        return symbol_, name_, source_, tuple(sorted(params_.items()))
+
+    def subscribe(self, symbol_: str, name_: str, source_: str = "Price", **params) -> Indicator:
+        """
+        subscribe：订阅给定标的代码、指标名称、数据来源和参数的指标，已有相同的指标时直接返回该指标
+        @symbol_(str)：标的代码
+        @name_(str)：指标名称，见INDICATOR_TYPE
+        @source_(str)：数据来源，Price（按现价更新）或Bar（按Bar信息更新），默认为Price
+        @params：指标参数，如period_=20
+        @return(Indicator)：订阅的指标
+        """
+
+        if name_ not in INDICATOR_TYPE:
+            raise ValueError("indicator {:s} not defined".format(str(name_)))
+        if source_ not in self.sources:
+            raise ValueError("source {:s} not supported".format(str(source_)))
+
+        key = self.make_key(symbol_=symbol_, name_=name_, source_=source_, params_=params)
+        indicator = self.indicators.get(key)
+
+        # 如果没有相同的指标，则生成指标并加入对应标的代码的更新列表
+        if indicator is None:
+            indicator = INDICATOR_TYPE[name_](**params)
+            indicator.key = key
+            self.indicators[key] = indicator
+            self.sources[source_].setdefault(symbol_, []).append(indicator)
+            self.total += indicator.size()
+
+            # 首次订阅时，在EVENT_QUEUE中注册事件处理方法
+            if not self.registered:
+                EVENT_QUEUE.register("Price", self.on_price)
+                EVENT_QUEUE.register("Bar", self.on_bar)
+                self.registered = True
+
+        indicator.refs += 1
+        self.idle.pop(key, None)
+        self.evict()
+        return indicator
+
+    def release(self, indicator_: Indicator, keep_: bool = True) -> None:
+        """
+        release：解除对给定指标的一次引用，不再被引用的指标在超过容量时移除
+        @indicator_(Indicator)：给定的指标
+        @keep_(bool)：不再被引用时是否保留并继续更新，默认为True；为False时立即移除
+        @return(None)
+        """
+
+        if indicator_.refs <= 0 or self.indicators.get(indicator_.key) is not indicator_:
+            return
+
+        indicator_.refs -= 1
+        if indicator_.refs == 0:
+            if keep_:
+                self.idle[indicator_.key] = None
+                self.evict()
+            else:
+                self.remove(indicator_.key)
+
+    def evict(self) -> None:
+        """
+        evict：保存的数值总数超过容量时，按最早不再被引用的顺序移除指标；仍被引用的指标不移除
+        @return(None)
+        """
+
+        while self.total > self.capacity and self.idle:
+            key, _ = self.idle.popitem(last=False)
+            self.remove(key)
+
+    def remove(self, key_: tuple) -> None:
+        """
+        remove：移除给定键对应的指标
+        @key_(tuple)：给定的键
+        @return(None)
+        """
+
+        indicator = self.indicators.pop(key_)
+        self.total -= indicator.size()
+        symbol_, _, source_, _ = key_
+        indicators = self.sources[source_][symbol_]
+        indicators.remove(indicator)
+        if not indicators:
+            del self.sources[source_][symbol_]
+
+    def clear(self) -> None:
+        """
+        clear：移除所有指标，用于在同一进程中开始新的回测
+        @return(None)
+        """
+
+        self.indicators = dict()
+        self.sources = {"Price": dict(), "Bar": dict()}
+        self.idle = OrderedDict()
+        self.total = 0
+
+    def __len__(self):
+        return len(self.indicators)
+
+    def on_price(self, event: Event) -> None:
+        """
+        on_price：接收并处理Price事件，更新给定标的代码以Price为数据来源的指标
+        @event(Event)：接收的Price事件
+        @return(None)
+        """
+
+        indicators = self.sources["Price"].get(event.info.symbol)
+        if indicators is not None:
+            price_ = event.info.crt_price
+            for indicator in indicators:
+                indicator.update(price_)
+
+    def on_bar(self, event: Event) -> None:
+        """
+        on_bar：接收并处理Bar事件，更新给定标的代码以Bar为数据来源的指标
+        @event(Event)：接收的Bar事件
+        @return(None)
+        """
+
+        indicators = self.sources["Bar"].get(event.info.symbol)
+        if indicators is not None:
+            for indicator in indicators:
+                indicator.update_bar(event.info)
+
+
+# INDICATOR_SERVICE：回测框架使用的全局技术指标模块
+INDICATOR_SERVICE = IndicatorService()
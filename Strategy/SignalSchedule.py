@@ -0,0 +1,69 @@
+from Event.Event import Event
+from Event.EventQueue import EVENT_QUEUE
+import pandas
+import numpy
+
+# 所有信号均已发出后的下一个信号时间
+_NEVER = numpy.iinfo(numpy.int64).max
+
+
+class SignalSchedule(object):
+    """
+    SignalSchedule(object)：回测框架中，保存单位策略模块预先以向量化方式计算得到的交易信号的时间表
+    替代单位策略模块订阅给定标的代码的Price事件：Price事件的时间戳到达下一个信号的时间时，才由单位策略模块生成Signal事件；
+    其余Price事件仅需一次时间戳比较
+    """
+
+    __slots__ = ["strategy", "datetimes", "prices", "times", "directions", "cursor", "next_time"]
+
+    def __init__(self, strategy_, datetimes_, prices_, indices_, directions_):
+        """
+        @strategy_(PseudoStrategyUnit)：生成信号的单位策略模块
+        @datetimes_(array-like)：价格序列的时间戳，以时间顺序排列
+        @prices_(numpy.ndarray)：价格序列
+        @indices_(numpy.ndarray)：发出信号的价格序列下标，以时间顺序排列
+        @directions_(numpy.ndarray)：对应的交易方向，买入为1，卖出为-1
+        """
+
+        self.strategy = strategy_
+        self.datetimes = pandas.to_datetime(numpy.asarray(datetimes_)).values.astype(numpy.int64)
+        self.prices = numpy.asarray(prices_, dtype=numpy.float64)
+
+        indices_ = numpy.asarray(indices_, dtype=numpy.int64)
+        self.times = self.datetimes[indices_].tolist()
+        self.directions = numpy.asarray(directions_, dtype=numpy.int64).tolist()
+
+        self.cursor = 0
+        self.next_time = self.times[0] if self.times else _NEVER
+
+    def __len__(self):
+        return len(self.times)
+
+    def index_at(self, datetime_) -> int:
+        """
+        index_at：查询价格序列中不晚于给定时间戳的最后一个价格的下标
+        @datetime_(pandas.Timestamp)：给定时间戳
+        @return(int)：价格序列下标，给定时间戳早于价格序列时为-1
+        """
+
+        return int(numpy.searchsorted(self.datetimes, datetime_.value, side="right")) - 1
+
+    def on_price(self, event: Event) -> None:
+        """
+        on_price：接收并处理Price事件，时间戳到达下一个信号的时间时，由单位策略模块生成Signal事件并放入事件队列
+        @event(Event)：接收的Price事件
+        @return(None)
+        """
+
+        value = event.info.datetime.value
+        if value < self.next_time:
+            return
+
+        price = event.info
+        while self.cursor < len(self.times) and self.times[self.cursor] <= value:
+            signal = self.strategy.make_signal(price_=price, direction_=self.directions[self.cursor])
+            if signal is not None:
+                EVENT_QUEUE.put(Event(type_="Signal", datetime_=signal.datetime, info_=signal))
+            self.cursor += 1
+
+        self.next_time = self.times[self.cursor] if self.cursor < len(self.times) else _NEVER
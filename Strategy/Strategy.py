@@ -1,17 +1,21 @@
 from BaseType.Subject import Subject
 from Event.Event import Event
-from Event.EventHandler import (BarHandler, PriceHandler, FillHandler, ClearHandler, ENDHandler)
+from Event.EventHandler import (BarHandler, PriceHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler)
 from Event.EventQueue import EVENT_QUEUE
 from BaseType.Const import CONST
+from Logger.Logger import LoggerColumnUnit
+from Logger.LogPolicy import LOG_POLICY
+from Strategy.SignalSchedule import SignalSchedule
 from abc import (abstractmethod)
 import Information.Info as Info
+import numpy
 
 
-class PseudoStrategyUnit(Subject, PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHandler):
+class PseudoStrategyUnit(Subject, PriceHandler, BarHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler):
     """
-    PseudoStrategyUnit(Subject, PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHandler)：
+    PseudoStrategyUnit(Subject, PriceHandler, BarHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler)：
     回测框架中，交易策略（Strategy）体系中使用的以单一策略为单位的交易模块
-    可处理事件：Bar、Price、Fill、Clear、END
+    可处理事件：Bar、Price、Fill、FillBatch、Clear、END
     除了常规的通过参数进行初始化的方式外，提供了通过FillInfo进行初始化的简化方式
     可以视为一个抽象类，回测中使用的交易策略可以装入继承这个类的子类中，并实现各种方法
     """
@@ -80,6 +84,66 @@ class PseudoStrategyUnit(Subject, PriceHandler, BarHandler, FillHandler, ClearHa
                              net_price_=net_price_, book_value_=book_value_, volume_=init_fill.volume,
                              multiplier_=multiplier_, margin_rate_=margin_rate_, currency_=currency_)
 
+        # 混合方式下预先计算的信号时间表，见StrategyUnion.schedule_signals
+        self.schedule = None
+
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        on_fill_batch：接收并处理FillBatch事件，默认将其拆分为逐笔的Fill事件交给on_fill方法处理
+        需要一次性处理多个委托成交的子类可以重写此方法
+        @event(Event)：接收的FillBatch事件
+        @return(None)
+        """
+
+        for fill in event.info:
+            self.on_fill(Event(type_="Fill", datetime_=event.datetime, info_=fill))
+
+    def get_info(self):
+        """
+        get_info：提取当前单位策略模块的信息，用于投资顾问/基金经理模块记录快照，默认为None即不记录
+        @return(Info.Info)：提取的单位策略模块的信息
+        """
+
+        return None
+
+    def compute_signals(self, prices_: numpy.ndarray) -> (numpy.ndarray, numpy.ndarray):
+        """
+        compute_signals：仅依赖价格序列的单位策略模块，可以实现此方法，以向量化方式一次性计算整个价格序列上的交易信号
+        实现此方法的单位策略模块可以由投资顾问/基金经理模块的schedule_signals方法以混合方式运行
+        @prices_(numpy.ndarray)：价格序列
+        @return(numpy.ndarray, numpy.ndarray)：发出信号的价格序列下标（升序），以及对应的交易方向（买入为1，卖出为-1），
+        默认为None，即不支持混合方式
+        """
+
+        return None
+
+    def lookback(self) -> int:
+        """
+        lookback：分段计算交易信号时，每段之前需要额外提供的价格数量，默认为0
+        @return(int)：额外提供的价格数量
+        """
+
+        return 0
+
+    def make_signal(self, price_: Info.PriceInfo, direction_: int):
+        """
+        make_signal：混合方式下，根据预先计算的交易方向和触发信号的价格信息，生成交易信号
+        @price_(Info.PriceInfo)：触发信号的价格信息
+        @direction_(int)：交易方向，买入为1，卖出为-1
+        @return(Info.SignalInfo)：生成的交易信号，为None时不发出信号，默认为None
+        """
+
+        return None
+
+    def set_schedule(self, schedule_: SignalSchedule) -> None:
+        """
+        set_schedule：混合方式下，接收预先计算的信号时间表，此后不再接收Price事件，子类可以在此释放逐笔计算所需的资源
+        @schedule_(SignalSchedule)：信号时间表
+        @return(None)
+        """
+
+        self.schedule = schedule_
+
     @abstractmethod
     def put_signals(self) -> None:
         """
@@ -90,51 +154,106 @@ class PseudoStrategyUnit(Subject, PriceHandler, BarHandler, FillHandler, ClearHa
         raise NotImplementedError("on_bar not implemented")
 
 
-class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHandler):
+class StrategyUnion(PriceHandler, BarHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler):
     """
-    StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHandler)：
+    StrategyUnion(PriceHandler, BarHandler, FillHandler, FillBatchHandler, ClearHandler, ENDHandler)：
     回测框架中，交易策略（Strategy）体系中使用的以投资顾问/基金经理为单位的交易模块
-    可处理事件：Bar、Price、Fill、Clear、END
+    可处理事件：Bar、Price、Fill、FillBatch、Clear、END
     如果有继承PseudoStrategyUnit类的自定义单位策略模块，初始化时需要提交单位策略模块的初始化方法
     """
 
     _name = "StrategyUnion"
 
-    def __init__(self, factory_=PseudoStrategyUnit):
+    def __init__(self, factory_=PseudoStrategyUnit, snapshot_logger_: LoggerColumnUnit = None, book_: int = 0):
         """
         @factory_(单位策略模块初始化方法)：继承PseudoStrategyUnit类的自定义单位策略模块，默认为PseudoStrategyUnit
+        @snapshot_logger_(LoggerColumnUnit)：快照记录模块，默认为None
+        提供快照记录模块时，Clear事件不再交给单位策略模块处理，而是提取发生变动的单位策略模块的信息，记录为一个快照
+        @book_(int)：接收成交回报的投资组合编号，默认为0
+        多个投资组合共用同一策略事件流时，仅接收给定编号的投资组合的Fill、FillBatch事件
         """
 
         # 在EVENT_QUEUE中注册交易策略（Strategy）体系中的事件处理方法
-        EVENT_QUEUE.register("Price", self.on_price)
-        EVENT_QUEUE.register("Bar", self.on_bar)
+        # Price事件、Bar事件由单位策略模块通过订阅直接处理，不经过当前模块
         EVENT_QUEUE.register("Fill", self.on_fill)
+        EVENT_QUEUE.register("FillBatch", self.on_fill_batch)
         EVENT_QUEUE.register("Clear", self.on_clear)
         EVENT_QUEUE.register("END", self.on_end)
 
         self.strategies = dict()
-        self.handlers = dict()
 
         self.strategy_factory = factory_
+        self.snapshot_logger = snapshot_logger_
+        self.book = book_
+
+        # 当前交易日内发生变动（接收过Price、Fill事件）的标的代码，Clear事件仅交给这些标的代码对应的单位策略模块处理
+        # 集合的迭代顺序随字符串哈希变化，处理Clear事件时按标的代码排序，使得各次运行的记录顺序相同
+        self.dirty_symbols = set()
 
     def register(self, strategy: PseudoStrategyUnit):
         """
         register：当前的投资顾问/基金经理模块中，注册给定的单位策略模块
+        单位策略模块直接在EVENT_QUEUE中订阅其标的代码（symbol）的Price事件和Bar事件
         @strategy(PseudoStrategyUnit)：给定的单位策略模块
         @return(None)
         """
 
         if strategy.symbol not in self.strategies:
             self.strategies[strategy.symbol] = strategy
-            self.handlers[(strategy.symbol, "Price")] = strategy.on_price
-            self.handlers[(strategy.symbol, "Bar")] = strategy.on_bar
-            self.handlers[(strategy.symbol, "Fill")] = strategy.on_fill
-            self.handlers[(strategy.symbol, "Clear")] = strategy.on_clear
-            self.handlers[(strategy.symbol, "END")] = strategy.on_end
+            EVENT_QUEUE.register("Price", strategy.on_price, symbol_=strategy.symbol)
+            EVENT_QUEUE.register("Bar", strategy.on_bar, symbol_=strategy.symbol)
+            EVENT_QUEUE.track("Price", strategy.symbol, self.dirty_symbols)
+
+    def schedule_signals(self, symbol_: str, datetimes_, prices_, chunk_: int = None) -> int:
+        """
+        schedule_signals：以混合方式运行给定标的代码的单位策略模块：
+        以向量化方式计算给定价格序列上的交易信号，此后该标的代码的Price事件仅在到达信号时间时生成Signal事件，
+        委托撮合、持仓和资金处理仍然逐个事件进行；给定价格序列应当与回测中该标的代码的Price事件一致
+        @symbol_(str)：标的代码，对应的单位策略模块应当已注册并实现compute_signals、make_signal方法
+        @datetimes_(array-like)：价格序列的时间戳，以时间顺序排列
+        @prices_(array-like)：价格序列
+        @chunk_(int)：分段计算时每段的价格数量，默认为None（整体计算）
+        @return(int)：预先计算的信号数量
+        """
+
+        strategy = self.strategies[symbol_]
+        prices_ = numpy.asarray(prices_, dtype=numpy.float64)
+
+        # 整体计算，或分段计算：每段之前额外提供lookback个价格，仅保留落在本段内的信号
+        # compute_signals返回None时，单位策略模块不支持混合方式
+        if chunk_ is None:
+            computed = strategy.compute_signals(prices_)
+            if computed is None:
+                raise RuntimeError("strategy {:s} does not support compute_signals".format(symbol_))
+            indices, directions = computed
+        else:
+            lookback = strategy.lookback()
+            index_list, direction_list = list(), list()
+            for start in range(0, len(prices_), chunk_):
+                low = max(0, start - lookback)
+                computed = strategy.compute_signals(prices_[low:start + chunk_])
+                if computed is None:
+                    raise RuntimeError("strategy {:s} does not support compute_signals".format(symbol_))
+                chunk_indices, chunk_directions = computed
+                chunk_indices = numpy.asarray(chunk_indices, dtype=numpy.int64) + low
+                mask = chunk_indices >= start
+                index_list.append(chunk_indices[mask])
+                direction_list.append(numpy.asarray(chunk_directions, dtype=numpy.int64)[mask])
+            indices = numpy.concatenate(index_list) if index_list else numpy.zeros(0, dtype=numpy.int64)
+            directions = numpy.concatenate(direction_list) if direction_list else numpy.zeros(0, dtype=numpy.int64)
+
+        # 以信号时间表替代单位策略模块订阅Price事件
+        schedule = SignalSchedule(strategy_=strategy, datetimes_=datetimes_, prices_=prices_,
+                                  indices_=indices, directions_=directions)
+        EVENT_QUEUE.unregister("Price", strategy.on_price, symbol_=symbol_)
+        EVENT_QUEUE.register("Price", schedule.on_price, symbol_=symbol_)
+        strategy.set_schedule(schedule)
+
+        return len(schedule)
 
     def on_price(self, event: Event) -> None:
         """
-        on_price：接收并处理Price事件
+        on_price：接收并处理Price事件，仅用于直接调用，事件队列中的Price事件由单位策略模块通过订阅直接处理
         @event(Event)：接收的Price事件
         @return(None)
         """
@@ -142,12 +261,13 @@ class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHand
         price: Info.PriceInfo = event.info
 
         # 将Price事件交给标的代码（symbol）对应的单位策略模块处理
-        if price.symbol in self.strategies:
-            self.handlers[(price.symbol, "Price")](event)
+        strategy = self.strategies.get(price.symbol)
+        if strategy is not None:
+            strategy.on_price(event)
 
     def on_bar(self, event: Event) -> None:
         """
-        on_bar：接收并处理Bar事件
+        on_bar：接收并处理Bar事件，仅用于直接调用，事件队列中的Bar事件由单位策略模块通过订阅直接处理
         @event(Event)：接收的Bar事件
         @return(None)
         """
@@ -155,8 +275,9 @@ class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHand
         bar: Info.BarInfo = event.info
 
         # 将Bar事件交给标的代码（symbol）对应的单位策略模块处理
-        if bar.symbol in self.strategies:
-            self.handlers[(bar.symbol, "Bar")](event)
+        strategy = self.strategies.get(bar.symbol)
+        if strategy is not None:
+            strategy.on_bar(event)
 
     def on_fill(self, event: Event) -> None:
         """
@@ -167,6 +288,10 @@ class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHand
 
         fill: Info.FillInfo = event.info
 
+        # 不处理其他投资组合的Fill事件
+        if fill.book != self.book:
+            return
+
         # 如果标的代码（symbol）未注册，且Fill事件为买入开仓委托成交，则通过事件中的FillInfo生成单位策略模块并注册
         if fill.symbol not in self.strategies and (
                 fill.direction == 1 and fill.open_or_close == 1
@@ -174,8 +299,36 @@ class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHand
             self.register(self.strategy_factory(init_fill=fill))
 
         # 将Fill事件交给标的代码（symbol）对应的单位策略模块处理
-        if fill.symbol in self.strategies:
-            self.handlers[(fill.symbol, "Fill")](event)
+        strategy = self.strategies.get(fill.symbol)
+        if strategy is not None:
+            self.dirty_symbols.add(fill.symbol)
+            strategy.on_fill(event)
+
+    def on_fill_batch(self, event: Event) -> None:
+        """
+        on_fill_batch：接收并处理FillBatch事件
+        @event(Event)：接收的FillBatch事件
+        @return(None)
+        """
+
+        batch: Info.FillBatchInfo = event.info
+
+        # 不处理其他投资组合的FillBatch事件
+        if batch.book != self.book:
+            return
+
+        # 如果标的代码（symbol）未注册，且FillBatch事件包含买入开仓委托成交，则通过首个买入开仓的FillInfo生成单位策略模块并注册
+        if batch.symbol not in self.strategies and batch.direction == 1:
+            for fill in batch:
+                if fill.open_or_close == 1:
+                    self.register(self.strategy_factory(init_fill=fill))
+                    break
+
+        # 将FillBatch事件交给标的代码（symbol）对应的单位策略模块处理
+        strategy = self.strategies.get(batch.symbol)
+        if strategy is not None:
+            self.dirty_symbols.add(batch.symbol)
+            strategy.on_fill_batch(event)
 
     def on_clear(self, event: Event) -> None:
         """
@@ -184,9 +337,21 @@ class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHand
         @return(None)
         """
 
-        # 将Clear事件交给已注册的所有单位策略模块处理
-        for symbol in self.strategies.keys():
-            self.handlers[(symbol, "Clear")](event)
+        # 如果提供了快照记录模块，则在记录规则允许时，将发生变动的单位策略模块的信息记录为一个快照
+        if self.snapshot_logger is not None:
+            if LOG_POLICY.allow("Strategy", event.datetime):
+                infos = dict()
+                for symbol in sorted(self.dirty_symbols):
+                    info = self.strategies[symbol].get_info()
+                    if info is not None:
+                        infos[symbol] = info
+                self.snapshot_logger.log_snapshot(objs=infos, committer=self._name, datetime_=event.datetime)
+
+        # 否则，将Clear事件交给当前交易日内发生变动的单位策略模块处理
+        else:
+            for symbol in sorted(self.dirty_symbols):
+                self.strategies[symbol].on_clear(event)
+        self.dirty_symbols.clear()
 
     def on_end(self, event: Event) -> None:
         """
@@ -196,5 +361,5 @@ class StrategyUnion(PriceHandler, BarHandler, FillHandler, ClearHandler, ENDHand
         """
 
         # 将END事件交给已注册的所有单位策略模块处理
-        for symbol in self.strategies.keys():
-            self.handlers[(symbol, "END")](event)
+        for strategy in self.strategies.values():
+            strategy.on_end(event)